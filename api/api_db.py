@@ -1,10 +1,19 @@
-from typing import Any, Dict, List
-
-import pyodbc
-from fastapi import APIRouter, FastAPI, HTTPException
-
-from db.db_connection import create_db_manager
-from db.db_manager import ConexionParams, GenerateDoctype, Payload
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+
+from api.api_utils import quiere_stream, respuesta_archivo, respuesta_ndjson
+from config import get_output_dir
+from db.backends import DB_ERRORS
+from db.db_cache import invalidar_cache, result_cache
+from db.db_connection import (DatabaseManager, get_pool_stats,
+                              metadata_cache)
+from db.db_executor import db_executor, ejecutar_extractor
+from db.db_manager import (ConexionParams, GenerateDoctype, Payload,
+                           StructureRequest)
+from utils.compression import find_output_file
+from utils.sinks import MEDIA_TYPES
 
 # from db.doctype_generator import generate_frappe_doctype
 
@@ -16,13 +25,62 @@ async def hello():
     return {"message": "Hello, FastAPI + NiceGUI"}
 
 
+@router.get("/pool-stats", tags=["Database"])
+async def get_pool_stats_endpoint():
+    return get_pool_stats()
+
+
+@router.get("/executor-stats", tags=["Database"])
+async def get_executor_stats_endpoint():
+    return db_executor.stats()
+
+
+@router.get("/cache-stats", tags=["Database"])
+async def get_cache_stats_endpoint():
+    return result_cache.stats()
+
+
+@router.get("/metadata-stats", tags=["Database"])
+async def get_metadata_stats_endpoint():
+    return metadata_cache.stats()
+
+
+# Sin parametros vacia toda la cache; con host y/o database solo esas entradas
+@router.post("/cache/invalidate", tags=["Database"])
+async def invalidate_cache_endpoint(host: Optional[str] = None,
+                                    database: Optional[str] = None):
+    return {"invalidadas": invalidar_cache(host, database)}
+
+
+# Descarga el archivo ya exportado de una tabla (p. ej. SCPTRABAJADORES o
+# SCPTRABAJADORES.csv; sin extensión se busca el JSON y luego los demás
+# formatos), comprimido o no según JSON_COMPRESSION. Las exportaciones por
+# partes se piden por separado: SCPTRABAJADORES/manifest.json,
+# SCPTRABAJADORES/part-0000
+@router.get("/archivos/{nombre:path}", tags=["Database"])
+async def descargar_archivo_endpoint(nombre: str, request: Request):
+    output_dir = os.path.realpath(get_output_dir())
+    base_path = os.path.realpath(os.path.join(output_dir, nombre))
+    if os.path.commonpath([output_dir, base_path]) != output_dir:
+        raise HTTPException(status_code=400, detail="Ruta no válida")
+    if os.path.splitext(base_path)[1] in MEDIA_TYPES:
+        file_path = find_output_file(base_path)
+    else:
+        file_path = next(filter(None, (find_output_file(base_path + ext)
+                                       for ext in MEDIA_TYPES)), None)
+    if file_path is None:
+        raise HTTPException(status_code=404,
+                            detail=f"No hay archivo exportado {nombre}")
+    return respuesta_archivo(request, file_path)
+
+
 @router.post("/conectar-params", tags=["Database"])
 async def conectar_parametros(params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            tables = db.get_all_tables()
-            table_count = len(tables)
-            return {"tables": tables, "table_count": table_count}
+        tables = await ejecutar_extractor(params,
+                                          DatabaseManager.get_all_tables)
+        table_count = len(tables)
+        return {"tables": tables, "table_count": table_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -30,8 +88,7 @@ async def conectar_parametros(params: ConexionParams):
 @router.post("/tables", tags=["Database"], response_model=Dict[str, Any])
 async def get_tables_endpoint(params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            return db.get_all_tables()
+        return await ejecutar_extractor(params, DatabaseManager.get_all_tables)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -39,11 +96,30 @@ async def get_tables_endpoint(params: ConexionParams):
 @router.post("/table-structure/{table_name}", tags=["Database"])
 async def get_table_structure_endpoint(table_name: str, params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            structure = db.get_table_structure(table_name)
-            if not structure:
-                raise HTTPException(status_code=404, detail="Tabla no encontrada")
-            return {"table_name": table_name, "columns": structure}
+        structure = await ejecutar_extractor(
+            params, DatabaseManager.get_table_structure, table_name)
+        if not structure:
+            raise HTTPException(status_code=404, detail="Tabla no encontrada")
+        return {"table_name": table_name, "columns": structure}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Estructura de todas las tablas (o de las indicadas) en una sola consulta al
+# catálogo, agrupada por tabla. Con ?stream=1 o Accept: application/x-ndjson
+# devuelve una tabla por línea.
+@router.post("/tables-structure", tags=["Database"])
+async def get_tables_structure_endpoint(request: Request,
+                                        payload: StructureRequest,
+                                        stream: bool = False):
+    try:
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(
+                payload.params, DatabaseManager.get_tables_structure,
+                payload.tables)
+        return await ejecutar_extractor(
+            payload.params, DatabaseManager.get_tables_structure,
+            payload.tables)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -51,9 +127,10 @@ async def get_table_structure_endpoint(table_name: str, params: ConexionParams):
 @router.post("/table-data/{table_name}", tags=["Database"])
 async def get_table_data_endpoint(table_name: str, payload: Payload):
     try:
-        with create_db_manager(payload.params) as db:
-            fields = [field.nombre_campo for field in payload.fields]
-            return db.export_table_to_json(table_name=table_name, fields=fields)
+        fields = [field.nombre_campo for field in payload.fields]
+        return await ejecutar_extractor(
+            payload.params, DatabaseManager.export_table_to_json,
+            table_name=table_name, fields=fields)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error al procesar la tabla {table_name}: {str(e)}"
@@ -67,10 +144,10 @@ async def get_table_data_endpoint(table_name: str, payload: Payload):
 )
 async def get_table_relation_endpoint(table_name: str, params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            relations = db.get_table_relations(table_name)
-            return relations or []
-    except pyodbc.Error as e:
+        relations = await ejecutar_extractor(
+            params, DatabaseManager.get_table_relations, table_name)
+        return relations or []
+    except DB_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Error de base de datos: {str(e)}")
     except Exception as e:
         raise HTTPException(
@@ -82,8 +159,8 @@ async def get_table_relation_endpoint(table_name: str, params: ConexionParams):
 @router.post("/all-relation", tags=["Database"], response_model=List[Dict])
 async def get_all_relation_endpoint(params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            return db.get_all_relations()
+        return await ejecutar_extractor(params,
+                                        DatabaseManager.get_all_relations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
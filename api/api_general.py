@@ -1,13 +1,16 @@
 import json
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
 
+from api.api_utils import (AppJSONResponse, quiere_stream, respuesta_json,
+                           respuesta_ndjson)
 from db import db_general as general
-from db.db_connection import create_db_manager
-from db.db_manager import ConexionParams
+from db.db_cache import ejecutar_con_cache
+from db.db_executor import ejecutar_lote, ejecutar_pagina
+from db.db_manager import ConexionParams, LoteRequest, PaginaParams
 from db.db_nomina import (get_categorias_ocupacionales,
                           get_relaciones_trabajadores, get_trabajadores)
+from utils.timings import ExportTimings
 
 router = APIRouter()
 
@@ -18,14 +21,75 @@ router = APIRouter()
     description="Muestra listado de las unidades de medida",
     tags=["GENERAL"],
 )
-async def get_unidad_medida_endpoint(params: ConexionParams):
+async def get_unidad_medida_endpoint(request: Request, params: ConexionParams,
+                                     solo_archivo: bool = False,
+                                     stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = general.get_unidad_medida(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, general.get_unidad_medida)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, general.get_unidad_medida,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener datos de SMGNOMENCLADORUNIDADMEDIDA:"
                    f" {str(e)}",
         )
+
+
+# Una página de cualquier extractor del módulo para la tabla de "Visualizar
+# datos": el servidor ordena, filtra y recorta, y solo viajan esas filas
+@router.post(
+    "/{endpoint}/pagina",
+    summary="Una página de los datos de un extractor",
+    description="Página ordenada y filtrada en el servidor (page, size, "
+                "sort, descending, filtro)",
+    tags=["GENERAL"],
+)
+async def get_pagina_endpoint(endpoint: str, params: ConexionParams,
+                              pagina: PaginaParams = Depends()):
+    extractor = general.EXTRACTORES_GENERAL.get(endpoint)
+    if extractor is None:
+        raise HTTPException(status_code=404,
+                            detail=f"Extractor desconocido: {endpoint}")
+    try:
+        return await ejecutar_pagina(params, extractor, pagina)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener la página de {endpoint}: {str(e)}",
+        )
+
+
+# Varios extractores (todos si no se indican) en una sola conexión y dentro
+# de una transacción SNAPSHOT: las tablas salen del mismo momento de la base.
+# Con solo_archivo se escriben los archivos y se devuelven sus resúmenes
+@router.post(
+    "/lote",
+    summary="Varios extractores con una misma vista de la base",
+    description="Ejecuta los extractores indicados (o todos) en una sola "
+                "conexión y transacción SNAPSHOT",
+    tags=["GENERAL"],
+)
+async def get_lote_endpoint(payload: LoteRequest, solo_archivo: bool = False):
+    endpoints = payload.endpoints or list(general.EXTRACTORES_GENERAL)
+    desconocidos = [e for e in endpoints if e not in general.EXTRACTORES_GENERAL]
+    if desconocidos:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Extractores desconocidos: {', '.join(desconocidos)}")
+    try:
+        data = await ejecutar_lote(
+            payload.params, {e: general.EXTRACTORES_GENERAL[e] for e in endpoints},
+            collect=not solo_archivo)
+        return AppJSONResponse(content=data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al ejecutar el lote: {str(e)}",
+        )
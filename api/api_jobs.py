@@ -0,0 +1,65 @@
+# api/api_jobs.py
+# exportaciones en segundo plano: se crean con POST y se consulta su estado
+# y se descarga el resultado con el id devuelto
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from api.api_utils import respuesta_archivo
+from db.db_manager import JobRequest
+from services.jobs import TERMINADOS, ArchivosModificados, job_manager
+
+router = APIRouter()
+
+
+def _get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+@router.post("", tags=["Jobs"], status_code=202)
+async def crear_job_endpoint(payload: JobRequest):
+    try:
+        job = await job_manager.submit(payload.params, payload.modulo,
+                                       payload.endpoints, payload.formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job["id"], "estado": job["estado"]}
+
+
+@router.get("", tags=["Jobs"])
+async def listar_jobs_endpoint():
+    return job_manager.list_jobs()
+
+
+@router.get("/{job_id}", tags=["Jobs"])
+async def estado_job_endpoint(job_id: str):
+    return _get_job(job_id)
+
+
+# Un solo archivo se descarga tal cual (comprimido con Content-Encoding si el
+# cliente lo acepta); varios, en un .zip. Si otra exportación sobrescribió o
+# borró los archivos desde que terminó el trabajo, se responde 409
+@router.get("/{job_id}/download", tags=["Jobs"])
+async def descargar_job_endpoint(job_id: str, request: Request):
+    job = _get_job(job_id)
+    if job["estado"] not in TERMINADOS:
+        raise HTTPException(status_code=409,
+                            detail=f"El trabajo está {job['estado']}")
+    try:
+        files = await job_manager.files(job_id)
+    except ArchivosModificados as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not files:
+        raise HTTPException(status_code=404,
+                            detail="El trabajo no produjo archivos")
+    if len(files) == 1:
+        return respuesta_archivo(request, files[0])
+    try:
+        zip_path = await job_manager.archive(job_id)
+    except ArchivosModificados as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(zip_path, media_type="application/zip",
+                        filename=f"export-{job_id}.zip")
@@ -1,13 +1,17 @@
 import json
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
 
+from api.api_utils import (AppJSONResponse, quiere_stream,
+                           respuesta_json, respuesta_ndjson)
 from db import db_nomina as nomina
-from db.db_connection import create_db_manager
-from db.db_manager import ConexionParams
+from db.db_cache import ejecutar_con_cache, ejecutar_incremental
+from db.db_executor import (ejecutar_extractor, ejecutar_lote,
+                            ejecutar_pagina)
+from db.db_manager import ConexionParams, LoteRequest, PaginaParams
 from db.db_nomina import (get_categorias_ocupacionales,
                           get_relaciones_trabajadores, get_trabajadores)
+from utils.timings import ExportTimings
 
 router = APIRouter()
 
@@ -18,11 +22,17 @@ router = APIRouter()
     description="Muestra listado de los trabajadores segun campos seleccionados",
     tags=["Nómina"],
 )
-async def get_trabajadores_endpoint(params: ConexionParams):
+async def get_trabajadores_endpoint(request: Request, params: ConexionParams,
+                                    solo_archivo: bool = False,
+                                    stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_trabajadores(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_trabajadores)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_trabajadores,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -38,9 +48,8 @@ async def get_trabajadores_endpoint(params: ConexionParams):
 )
 async def get_relaciones_trabajadores_endpoint(params: ConexionParams):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_relaciones_trabajadores(db)
-            return JSONResponse(content=data)
+        data = await ejecutar_extractor(params, nomina.get_relaciones_trabajadores)
+        return AppJSONResponse(content=data)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -54,11 +63,17 @@ async def get_relaciones_trabajadores_endpoint(params: ConexionParams):
     description="Muestra las categorías ocupacionales activas",
     tags=["Nómina"],
 )
-async def get_categorias_endpoint(params: ConexionParams):
+async def get_categorias_endpoint(request: Request, params: ConexionParams,
+                                  solo_archivo: bool = False,
+                                  stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_categorias_ocupacionales(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_categorias_ocupacionales)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_categorias_ocupacionales,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -72,11 +87,17 @@ async def get_categorias_endpoint(params: ConexionParams):
     description="Muestra los cargos de los trabajadores",
     tags=["Nómina"],
 )
-async def get_cargos_trabajadores_endpoint(params: ConexionParams):
+async def get_cargos_trabajadores_endpoint(request: Request, params: ConexionParams,
+                                           solo_archivo: bool = False,
+                                           stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_cargos_trabajadores(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_cargos_trabajadores)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_cargos_trabajadores,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -90,11 +111,17 @@ async def get_cargos_trabajadores_endpoint(params: ConexionParams):
     description="Muestra los tipos de los trabajadores",
     tags=["Nómina"],
 )
-async def get_tipos_trabajadores_endpoint(params: ConexionParams):
+async def get_tipos_trabajadores_endpoint(request: Request, params: ConexionParams,
+                                          solo_archivo: bool = False,
+                                          stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_tipos_trabajadores(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_tipos_trabajadores)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_tipos_trabajadores,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -108,11 +135,17 @@ async def get_tipos_trabajadores_endpoint(params: ConexionParams):
     description="Muestra los tipos de los retenciones",
     tags=["Nómina"],
 )
-async def get_tipos_retenciones_endpoint(params: ConexionParams):
+async def get_tipos_retenciones_endpoint(request: Request, params: ConexionParams,
+                                         solo_archivo: bool = False,
+                                         stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_tipos_retenciones(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_tipos_retenciones)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_tipos_retenciones,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -126,11 +159,17 @@ async def get_tipos_retenciones_endpoint(params: ConexionParams):
     description="Muestra los pensionados",
     tags=["Nómina"],
 )
-async def get_pensionados_endpoint(params: ConexionParams):
+async def get_pensionados_endpoint(request: Request, params: ConexionParams,
+                                   solo_archivo: bool = False,
+                                   stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_pensionados(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_pensionados)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_pensionados,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -144,11 +183,17 @@ async def get_pensionados_endpoint(params: ConexionParams):
     description="Muestra las tasas de destajos",
     tags=["Nómina"],
 )
-async def get_tasas_destajos_endpoint(params: ConexionParams):
+async def get_tasas_destajos_endpoint(request: Request, params: ConexionParams,
+                                      solo_archivo: bool = False,
+                                      stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_tasas_destajos(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_tasas_destajos)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_tasas_destajos,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -162,11 +207,17 @@ async def get_tasas_destajos_endpoint(params: ConexionParams):
     description="Muestra los colectivos",
     tags=["Nómina"],
 )
-async def get_colectivos_endpoint(params: ConexionParams):
+async def get_colectivos_endpoint(request: Request, params: ConexionParams,
+                                  solo_archivo: bool = False,
+                                  stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_colectivos(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_colectivos)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_colectivos,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -180,11 +231,17 @@ async def get_colectivos_endpoint(params: ConexionParams):
     description="Muestra los departamentos",
     tags=["Nómina"],
 )
-async def get_departamentos_endpoint(params: ConexionParams):
+async def get_departamentos_endpoint(request: Request, params: ConexionParams,
+                                     solo_archivo: bool = False,
+                                     stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_departamentos(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_departamentos)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_departamentos,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -198,11 +255,25 @@ async def get_departamentos_endpoint(params: ConexionParams):
     description="Muestra Submayor de Vacaciones",
     tags=["Nómina"],
 )
-async def get_submayor_vacaciones_endpoint(params: ConexionParams):
+async def get_submayor_vacaciones_endpoint(request: Request, params: ConexionParams,
+                                           solo_archivo: bool = False,
+                                           stream: bool = False,
+                                           incremental: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_submayor_vacaciones(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_submayor_vacaciones)
+        timings = ExportTimings()
+        # Incremental siempre consulta la base de datos y luego invalida la
+        # cache de ese extractor
+        if incremental:
+            data = await ejecutar_incremental(params, nomina.get_submayor_vacaciones,
+                                              collect=not solo_archivo,
+                                              timings=timings)
+        else:
+            data = await ejecutar_con_cache(params, nomina.get_submayor_vacaciones,
+                                            solo_archivo=solo_archivo,
+                                            timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -217,11 +288,25 @@ async def get_submayor_vacaciones_endpoint(params: ConexionParams):
     description="Muestra Submayor de Salarios No Reclamados",
     tags=["Nómina"],
 )
-async def get_submayor_salarios_no_reclamados_endpoint(params: ConexionParams):
+async def get_submayor_salarios_no_reclamados_endpoint(request: Request, params: ConexionParams,
+                                                       solo_archivo: bool = False,
+                                                       stream: bool = False,
+                                                       incremental: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_submayor_salarios_no_reclamados(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_submayor_salarios_no_reclamados)
+        timings = ExportTimings()
+        # Incremental siempre consulta la base de datos y luego invalida la
+        # cache de ese extractor
+        if incremental:
+            data = await ejecutar_incremental(params, nomina.get_submayor_salarios_no_reclamados,
+                                              collect=not solo_archivo,
+                                              timings=timings)
+        else:
+            data = await ejecutar_con_cache(params, nomina.get_submayor_salarios_no_reclamados,
+                                            solo_archivo=solo_archivo,
+                                            timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -237,14 +322,75 @@ async def get_submayor_salarios_no_reclamados_endpoint(params: ConexionParams):
     description="Muestra Pagos de los trabajadores SC408",
     tags=["Nómina"],
 )
-async def get_corte_sc408_endpoint(params: ConexionParams):
+async def get_corte_sc408_endpoint(request: Request, params: ConexionParams,
+                                   solo_archivo: bool = False,
+                                   stream: bool = False):
     try:
-        with create_db_manager(params) as db:
-            data = nomina.get_corte_sc408(db)
-            return JSONResponse(content=data)
+        if quiere_stream(request, stream):
+            return await respuesta_ndjson(params, nomina.get_corte_sc408)
+        timings = ExportTimings()
+        data = await ejecutar_con_cache(params, nomina.get_corte_sc408,
+                                        solo_archivo=solo_archivo,
+                                        timings=timings)
+        return respuesta_json(data, timings)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener los datos del pago de los trabajadores"
                    f" {str(e)}",
-        )
\ No newline at end of file
+        )
+
+
+# Una página de cualquier extractor del módulo para la tabla de "Visualizar
+# datos": el servidor ordena, filtra y recorta, y solo viajan esas filas
+@router.post(
+    "/{endpoint}/pagina",
+    summary="Una página de los datos de un extractor",
+    description="Página ordenada y filtrada en el servidor (page, size, "
+                "sort, descending, filtro)",
+    tags=["Nómina"],
+)
+async def get_pagina_endpoint(endpoint: str, params: ConexionParams,
+                              pagina: PaginaParams = Depends()):
+    extractor = nomina.EXTRACTORES_NOMINA.get(endpoint)
+    if extractor is None:
+        raise HTTPException(status_code=404,
+                            detail=f"Extractor desconocido: {endpoint}")
+    try:
+        return await ejecutar_pagina(params, extractor, pagina)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener la página de {endpoint}: {str(e)}",
+        )
+
+
+# Varios extractores (todos si no se indican) en una sola conexión y dentro
+# de una transacción SNAPSHOT: las tablas salen del mismo momento de la base.
+# Con solo_archivo se escriben los archivos y se devuelven sus resúmenes
+@router.post(
+    "/lote",
+    summary="Varios extractores con una misma vista de la base",
+    description="Ejecuta los extractores indicados (o todos) en una sola "
+                "conexión y transacción SNAPSHOT",
+    tags=["Nómina"],
+)
+async def get_lote_endpoint(payload: LoteRequest, solo_archivo: bool = False):
+    endpoints = payload.endpoints or list(nomina.EXTRACTORES_NOMINA)
+    desconocidos = [e for e in endpoints if e not in nomina.EXTRACTORES_NOMINA]
+    if desconocidos:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Extractores desconocidos: {', '.join(desconocidos)}")
+    try:
+        data = await ejecutar_lote(
+            payload.params, {e: nomina.EXTRACTORES_NOMINA[e] for e in endpoints},
+            collect=not solo_archivo)
+        return AppJSONResponse(content=data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al ejecutar el lote: {str(e)}",
+        )
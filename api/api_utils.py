@@ -0,0 +1,122 @@
+# api/api_utils.py
+# helpers compartidos por los routers de los modulos
+
+import os
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse, Response, \
+    StreamingResponse
+
+from db.db_executor import iterar_extractor
+from db.db_manager import ConexionParams
+from utils.compression import codec_for_path, open_output_file
+from utils.json_encoder import dumps
+from utils.jsons_utils import rows_to_ndjson
+from utils.sinks import MEDIA_TYPES
+from utils.timings import ExportTimings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+# JSONResponse codificada con la capa de utils/json_encoder (orjson, con
+# soporte nativo de fechas y Decimal)
+class AppJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Respuesta JSON con los tiempos por fase de la exportación en la cabecera
+# Server-Timing (visibles en las herramientas de desarrollo del navegador)
+def respuesta_json(data: Any, timings: ExportTimings) -> AppJSONResponse:
+    return AppJSONResponse(content=data,
+                           headers={"Server-Timing": timings.header()})
+
+
+# El cliente pide streaming con ?stream=1 o con Accept: application/x-ndjson
+def quiere_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+# StreamingResponse que cierra el generador de lotes al terminar de servirse,
+# también si el cliente se desconecta o la petición se cancela antes de
+# empezar a leerlo: así el cursor se cierra y la conexión vuelve al pool en
+# ese momento y no cuando pase el recolector de basura
+class NdjsonStreamingResponse(StreamingResponse):
+    def __init__(self, chunks: AsyncIterator[bytes], first_chunk: bytes):
+        self._chunks = chunks
+
+        async def body():
+            try:
+                yield first_chunk
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+        super().__init__(body(), media_type=NDJSON_MEDIA_TYPE)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._chunks.aclose()
+
+
+# Respuesta NDJSON (una fila por línea, transferencia chunked) que va leyendo
+# del cursor mientras se envía. El primer lote se pide antes de responder para
+# que los errores de conexión o de la consulta lleguen como HTTP 500.
+async def respuesta_ndjson(params: ConexionParams, extractor: Callable,
+                           *args, **kwargs) -> StreamingResponse:
+    chunks = iterar_extractor(params, extractor, *args,
+                              formatter=rows_to_ndjson, **kwargs)
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except BaseException:
+        await chunks.aclose()
+        raise
+
+    return NdjsonStreamingResponse(chunks, first_chunk)
+
+
+# True si la cabecera Accept-Encoding admite ``encoding`` (sin q=0)
+def acepta_codificacion(request: Request, encoding: str) -> bool:
+    for item in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = item.strip().partition(";")
+        if token.strip().lower() in (encoding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def _iter_descomprimido(file_path: str):
+    with open_output_file(file_path) as f:
+        while chunk := f.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+# Sirve un archivo exportado (JSON, CSV, Arrow o Parquet). Si está
+# comprimido (.gz/.zst) y el cliente acepta esa codificación se envía tal
+# cual con Content-Encoding, y el cliente lo descomprime al recibirlo; si no,
+# se descomprime al enviarlo.
+def respuesta_archivo(request: Request, file_path: str) -> Response:
+    codec = codec_for_path(file_path)
+    filename = os.path.basename(file_path)
+    if codec.extension:
+        filename = filename[:-len(codec.extension)]
+    media_type = MEDIA_TYPES.get(os.path.splitext(filename)[1],
+                                 "application/octet-stream")
+    if codec.content_encoding is None:
+        return FileResponse(file_path, media_type=media_type,
+                            filename=filename)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if acepta_codificacion(request, codec.content_encoding):
+        headers["Content-Encoding"] = codec.content_encoding
+        return FileResponse(file_path, media_type=media_type,
+                            filename=filename, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(_iter_descomprimido(file_path),
+                             media_type=media_type, headers=headers)
@@ -0,0 +1,157 @@
+# benchmarks/bench_exportacion.py
+# Rendimiento de punta a punta de las exportaciones (consulta, conversión y
+# escritura del JSON) de los extractores get_trabajadores y get_corte_sc408
+# contra la base SQLite de db/fixtures con datos sintéticos, sin SQL Server.
+# Cada caso corre en un subproceso para medir su pico de memoria (RSS) por
+# separado. Ejecutar desde la raíz del proyecto:
+#   python -m benchmarks.bench_exportacion [trabajadores ...]
+# (por defecto 10000 100000 1000000)
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from db.backends import SqliteBackend
+from db.db_connection import DatabaseManager
+from db.db_nomina import get_corte_sc408, get_trabajadores
+from db.fixtures.seed import create_database
+
+# Meses de SC408 por trabajador en la base del benchmark: get_corte_sc408
+# agrupa los dos últimos años, así que cada trabajador sale una vez
+SC408_MESES = 2
+
+CASOS = {
+    "export_table_to_json": "get_trabajadores, archivo sin acumular filas",
+    "export_table_to_json_collect": "get_trabajadores, devolviendo las filas",
+    "export_table_to_json_paginated": "get_corte_sc408 agrupado, keyset",
+    "export_paginated_particionado":
+        "get_corte_sc408 agrupado, 4 rangos en paralelo",
+    "save_json_file": "get_trabajadores ya en memoria, solo escritura",
+    "export_csv": "get_trabajadores a CSV, archivo sin acumular filas",
+    "export_parquet": "get_trabajadores a Parquet (requiere pyarrow)",
+}
+# Formato de salida de cada caso (JSON si no aparece)
+FORMATO_CASO = {"export_csv": "csv", "export_parquet": "parquet"}
+
+
+# --- Base SQLite con los datos sintéticos ---------------------------------
+# Es la misma base de desarrollo del backend "sqlite": esquema de
+# db/fixtures/siscont_sqlite.sql y datos de db/fixtures/seed.py
+
+def crear_base(path: str, filas: int):
+    """Crea la base con ``filas`` trabajadores (y sus tablas relacionadas)."""
+    create_database(path, trabajadores=filas, meses=SC408_MESES)
+
+
+# Sin pool ni executor: mide solo la exportación, con los extractores y el
+# DatabaseManager de la aplicación sobre el backend "sqlite"
+def abrir_base(path: str) -> DatabaseManager:
+    return DatabaseManager(host="bench", password="",
+                           database=os.path.basename(path), port="",
+                           user="bench", backend=SqliteBackend(path, 0))
+
+
+# --- Un caso, dentro del subproceso ---------------------------------------
+
+def ejecutar_caso(caso: str, db_path: str):
+    from utils.jsons_utils import (get_output_path, output_extension,
+                                   save_json_file)
+    from utils.timings import ExportTimings
+
+    timings = ExportTimings()
+    formato = FORMATO_CASO.get(caso, "json")
+
+    with abrir_base(db_path) as db:
+        if caso == "save_json_file":
+            data = get_trabajadores(db)
+            inicio = time.perf_counter()
+            save_json_file("Employee", data, "Setup", "SCPTRABAJADORES")
+            segundos = time.perf_counter() - inicio
+            filas = len(data)
+            archivo = "SCPTRABAJADORES"
+        elif caso in ("export_table_to_json_paginated",
+                      "export_paginated_particionado"):
+            particiones = 4 if caso == "export_paginated_particionado" else 1
+            inicio = time.perf_counter()
+            resumen = get_corte_sc408(db, collect=False, timings=timings,
+                                      particiones=particiones)
+            segundos = time.perf_counter() - inicio
+            filas = resumen["total_registros"]
+            archivo = "SNOMODSC408CORTE"
+        else:
+            collect = caso == "export_table_to_json_collect"
+            inicio = time.perf_counter()
+            resultado = get_trabajadores(db, collect=collect,
+                                         timings=timings, formato=formato)
+            segundos = time.perf_counter() - inicio
+            filas = (len(resultado) if collect
+                     else resultado["total_registros"])
+            archivo = "SCPTRABAJADORES"
+
+    return {
+        "caso": caso,
+        "filas": filas,
+        "segundos": segundos,
+        "filas_s": filas / segundos if segundos else 0.0,
+        "bytes": os.path.getsize(
+            get_output_path(archivo, output_extension(formato))),
+        # ru_maxrss está en KB en Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "fases": timings.as_dict(),
+    }
+
+
+# --- Orquestación ---------------------------------------------------------
+
+def _correr_subproceso(caso: str, db_path: str, output_dir: str):
+    env = dict(os.environ, JSON_OUTPUT_DIR=output_dir)
+    salida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_exportacion",
+         "--caso", caso, "--db", db_path],
+        env=env, check=True, capture_output=True, text=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(tamanos, casos):
+    with tempfile.TemporaryDirectory(prefix="bench_siscont_") as tmp:
+        for filas in tamanos:
+            db_path = os.path.join(tmp, f"siscont_{filas}.sqlite")
+            inicio = time.perf_counter()
+            crear_base(db_path, filas)
+            print(f"\n{filas:,} trabajadores (base creada en "
+                  f"{time.perf_counter() - inicio:.1f}s)")
+            for caso in casos:
+                r = _correr_subproceso(caso, db_path, tmp)
+                fases = r["fases"]
+                print(f"  {caso:<32} {r['filas']:>9,} filas "
+                      f"{r['filas_s']:>11,.0f} filas/s "
+                      f"{r['rss_mb']:>8.1f} MB RSS "
+                      f"{r['bytes'] / 1024 / 1024:>8.1f} MB archivo"
+                      + ("" if not fases["rows"] else
+                         f"  [sql {fases['sql_ms']:.0f} / fetch "
+                         f"{fases['fetch_ms']:.0f} / serialize "
+                         f"{fases['serialize_ms']:.0f} / write "
+                         f"{fases['write_ms']:.0f} ms]"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("filas", nargs="*", type=int,
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--casos", nargs="+", choices=sorted(CASOS),
+                        default=list(CASOS))
+    # Uso interno: ejecuta un solo caso e imprime el resultado en JSON
+    parser.add_argument("--caso", choices=sorted(CASOS),
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        print(json.dumps(ejecutar_caso(args.caso, args.db)))
+    else:
+        main(args.filas, args.casos)
@@ -0,0 +1,86 @@
+# benchmarks/bench_serializacion.py
+# Compara la serialización celda a celda (serialize_value) con los planes
+# compilados por columna. Ejecutar desde la raíz del proyecto:
+#   python -m benchmarks.bench_serializacion [filas]
+
+import datetime
+import decimal
+import sys
+import time
+
+from utils.jsons_utils import (compile_field_converters, compile_row_plan,
+                               serialize_value)
+
+# Filas con la forma de SCPTRABAJADORES (casi todo texto)
+TRABAJADORES_MAPPING = [
+    (f"campo_{i}", (f"T.Campo{i}", 'string')) for i in range(17)
+] + [
+    ("salary_mode", ("T.TrabFormaCobro", 'numeric')),
+    ("date_of_joining", ("T.TrabFechaAlta", 'date')),
+]
+
+# Filas con la forma del corte SC408 (agregados numéricos)
+SC408_MAPPING = [
+    ("employee", ("s2.CPTrabConsecutivoID", 'string')),
+    ("employee_name", ("MAX(...)", 'string')),
+    ("year_to_date", ("MAX(...)", 'integer')),
+    ("month_to_date", ("MAX(...)", 'integer')),
+] + [(f"importe_{i}", ("SUM(...)", 'float')) for i in range(6)]
+
+
+def _trabajador(i):
+    return tuple(f"valor {i}-{c}" if c % 5 else "  " for c in range(17)) + (
+        i % 3, datetime.datetime(2020, 1, 1) + datetime.timedelta(days=i))
+
+
+def _sc408(i):
+    return (f"{i:06d}", f"Nombre {i}", 2024, i % 12 + 1) + tuple(
+        decimal.Decimal(f"{i}.{c}5") for c in range(6))
+
+
+# Versión anterior: despacho por tipo en cada celda
+def _celda_a_celda(columns, rows, field_mapping):
+    field_type_map = {alias: field_type for alias, (_, field_type) in
+                      field_mapping}
+    return [
+        {
+            key: serialize_value(value, field_type_map.get(key, 'auto'))
+            for key, value in zip(columns, row)
+        }
+        for row in rows
+    ]
+
+
+def _plan_compilado(columns, rows, field_mapping):
+    converters = compile_field_converters(field_mapping)
+    return compile_row_plan(columns, converters)(rows)
+
+
+def _medir(func, columns, rows, field_mapping, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = func(columns, rows, field_mapping)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(rows) / mejor, resultado
+
+
+def main(filas: int = 100_000):
+    for nombre, mapping, fabrica in (
+            ("SCPTRABAJADORES", TRABAJADORES_MAPPING, _trabajador),
+            ("SNOMODSC408CORTE", SC408_MAPPING, _sc408),
+    ):
+        columns = [alias for alias, _ in mapping]
+        rows = [fabrica(i) for i in range(filas)]
+
+        antes, esperado = _medir(_celda_a_celda, columns, rows, mapping)
+        despues, obtenido = _medir(_plan_compilado, columns, rows, mapping)
+        assert obtenido == esperado, f"{nombre}: resultados distintos"
+
+        print(f"{nombre:<18} {filas} filas | serialize_value: "
+              f"{antes:,.0f} filas/s | plan compilado: {despues:,.0f} "
+              f"filas/s | x{despues / antes:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -17,6 +17,92 @@ PAGINATION_THRESHOLD = (
     5000  # Número de registros a partir del cual se activa la paginación
 )
 DEFAULT_PAGE_SIZE = 1000
+FETCH_BATCH_SIZE = 1000  # filas por fetchmany al volcar al archivo JSON
+# Conexiones con que se leen en paralelo las tablas grandes paginadas por
+# clave (rangos de la clave keyset, uno por conexion). 1 = una sola conexion
+EXPORT_PARTITIONS = int(os.getenv("EXPORT_PARTITIONS", 1))
+
+# Codificador JSON ("orjson" o "json") y formato de los archivos exportados
+# ("pretty" con sangria o "compact" sin espacios, mas pequeño). En pretty,
+# orjson sangra con 2 espacios y json con 4: cambiar de codificador cambia
+# los bytes de los archivos (ver utils/json_encoder.py)
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson")
+JSON_OUTPUT_MODE = os.getenv("JSON_OUTPUT_MODE", "pretty")
+# Compresion de los archivos exportados: "none", "gzip" o "zstd" (requiere el
+# paquete zstandard; sin el se usa gzip). Se añade .gz/.zst al nombre.
+JSON_COMPRESSION = os.getenv("JSON_COMPRESSION", "none")
+# Nivel de compresion (vacio = el del formato: 6 en gzip, 3 en zstd)
+JSON_COMPRESSION_LEVEL = (int(os.getenv("JSON_COMPRESSION_LEVEL"))
+                          if os.getenv("JSON_COMPRESSION_LEVEL") else None)
+# Formato de los archivos exportados: "json", "csv", o "arrow" / "parquet"
+# (columnas tipadas segun el field_mapping; requieren el paquete pyarrow)
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "json")
+# Filas por archivo al exportar en partes: con un valor > 0 cada tabla se
+# escribe en <tabla>/part-0000.json, part-0001.json... mas un manifest.json
+# (0 = un unico <tabla>.json)
+JSON_SHARD_ROWS = int(os.getenv("JSON_SHARD_ROWS", 0))
+
+# Pool de conexiones a SQL Server (por host, base de datos y usuario)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))  # conexiones que se
+# abren al crear el pool y se mantienen calientes aunque esten ociosas
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_IDLE_TIMEOUT = 300  # segundos ociosa antes de cerrarla
+DB_POOL_ACQUIRE_TIMEOUT = 30  # segundos esperando una conexion libre
+DB_POOL_HEALTHCHECK_AFTER = 30  # si estuvo ociosa mas de esto se valida
+# con SELECT 1 antes de prestarla (0 = validar siempre)
+
+# Motor de base de datos: "sqlserver" (produccion) o "sqlite" (una base
+# local sembrada con datos sinteticos, para desarrollo y pruebas de carga)
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlserver")
+# Trabajadores sintéticos al crear la base SQLite (ver db/fixtures/seed.py)
+SQLITE_SEED_TRABAJADORES = int(os.getenv("SQLITE_SEED_TRABAJADORES", 1000))
+
+# Metadatos (tablas, columnas, FKs) en memoria por base de datos. Antes de
+# servirlos se comprueba si cambió el esquema, como mucho cada tantos segundos
+METADATA_RECHECK_INTERVAL = int(os.getenv("METADATA_RECHECK_INTERVAL", 60))
+
+# Hilos dedicados al trabajo bloqueante de pyodbc y escritura de los JSON.
+# Conviene que no supere DB_POOL_MAX_SIZE para no esperar por conexiones.
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", 8))
+
+# Tablas que "Exportar todas las tablas" exporta a la vez contra un mismo
+# servidor SQL Server
+BULK_EXPORT_CONCURRENCY_PER_HOST = int(
+    os.getenv("BULK_EXPORT_CONCURRENCY_PER_HOST", 4))
+
+# Como llaman los clientes de services a los extractores: "local" los ejecuta
+# en este mismo proceso; "http" hace POST a API_BASE_URL (despliegue remoto)
+SERVICES_TRANSPORT = os.getenv("SERVICES_TRANSPORT", "local")
+
+# Cliente HTTP compartido (modo "http"): pool de conexiones keep-alive
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 60  # segundos que una conexion ociosa sigue abierta
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_DEFAULT_TIMEOUT = 120  # segundos de lectura por defecto
+# Las exportaciones grandes necesitan mas tiempo de lectura
+HTTP_ENDPOINT_TIMEOUTS = {
+    "trabajadores": 300,
+    "submayor_vacaciones": 600,
+    "submayor_salarios_no_reclamados": 600,
+    "pagos_trabajadores": 900,
+}
+
+# Tabla de "Visualizar datos": filas por pagina al abrirla y maximo que se
+# puede pedir en una pagina (las paginas se consultan al servidor una a una)
+GRID_PAGE_SIZE = 10
+GRID_MAX_PAGE_SIZE = 500
+
+# Cola de exportaciones en segundo plano (api/api_jobs.py): trabajos que se
+# ejecutan a la vez y cuántos terminados se conservan
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", 2))
+JOBS_MAX_HISTORY = int(os.getenv("JOBS_MAX_HISTORY", 200))
+
+# Cache de resultados de los extractores que devuelven todas las filas (las
+# rutas de la API; ver db/db_cache.py). El limite se mide en bytes del JSON
+# de las filas.
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 300))  # segundos
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", 256))
 
 # UI Modules Config(modulo:icon)
 MODULES = {
@@ -68,6 +154,17 @@ def get_output_dir():
     return default_dir
 
 
+# Ruta de la base SQLite del backend "sqlite"; por defecto junto a
+# archivos_json
+def get_sqlite_path():
+    sqlite_path = os.getenv("SQLITE_PATH")
+    if sqlite_path:
+        return sqlite_path
+
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return os.path.join(base_dir, "siscont_dev.sqlite")
+
+
 # funcion utilitaria para obtener la url segun el modulo
 def get_module_api_url(module_name: str) -> str:
     settings = get_settings()
@@ -0,0 +1,371 @@
+# db/backends.py
+# motores de base de datos detras de DatabaseManager: como abrir una
+# conexion, como adaptar al motor el SQL (escrito para SQL Server) y como
+# leer los metadatos del esquema. "sqlserver" es el de produccion; "sqlite"
+# es una base local con el esquema de SISCONT (db/fixtures) para desarrollo,
+# CI y pruebas de carga sin SQL Server.
+
+import abc
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+try:
+    import pyodbc
+except ImportError:  # sin el driver ODBC del sistema solo queda "sqlite"
+    pyodbc = None
+
+from config import (DB_BACKEND, SQLITE_SEED_TRABAJADORES, get_sqlite_path)
+
+# Errores de los drivers: con ellos la conexión no se devuelve al pool
+DB_ERRORS = ((pyodbc.Error,) if pyodbc else ()) + (sqlite3.Error,)
+
+# Filas de columnas de load_schema: (tabla, columna, tipo, longitud máxima,
+# admite nulos 'YES'/'NO', es clave primaria, es identidad)
+ColumnRow = Tuple[str, str, str, Any, str, bool, bool]
+
+
+class DatabaseBackend(abc.ABC):
+    """
+    Interfaz de un motor. El SQL de los extractores y de utils/jsons_utils.py
+    es T-SQL; ``translate`` lo adapta al motor (identidad en SQL Server).
+    """
+
+    name: str = ""
+
+    @abc.abstractmethod
+    def connect(self, connection_params: Dict[str, str]):
+        ...
+
+    def translate(self, query: str) -> str:
+        return query
+
+    def wrap_cursor(self, cursor):
+        return cursor
+
+    # Abre en ``conn`` una transacción de solo lectura en la que todas las
+    # consultas ven la base tal como estaba al empezar. Devuelve False si el
+    # motor o la base no lo permiten (las consultas ven cada una su momento)
+    def begin_snapshot(self, conn) -> bool:
+        return False
+
+    # Cierra la transacción de begin_snapshot y deja la sesión como estaba
+    def end_snapshot(self, conn):
+        conn.rollback()
+
+    # Valor que cambia cuando cambia el esquema (ver db/db_metadata.py)
+    @abc.abstractmethod
+    def schema_version(self, cursor) -> Tuple:
+        ...
+
+    # (tablas, filas de columnas, relaciones) de todo el esquema
+    @abc.abstractmethod
+    def load_schema(self, cursor
+                    ) -> Tuple[List[str], List[ColumnRow], List[Dict]]:
+        ...
+
+
+class SqlServerBackend(DatabaseBackend):
+    name = "sqlserver"
+
+    # Cambia al crear, alterar o borrar tablas, columnas o FKs
+    SCHEMA_VERSION_QUERY = """
+        SELECT MAX(modify_date), COUNT(*)
+        FROM sys.objects
+        WHERE is_ms_shipped = 0
+    """
+
+    TABLES_QUERY = """
+        SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_TYPE = 'BASE TABLE'
+    """
+
+    # Todas las columnas de todas las tablas en una consulta, con si forman
+    # parte de la clave primaria y si son identidad
+    COLUMNS_QUERY = """
+        SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE,
+            c.CHARACTER_MAXIMUM_LENGTH, c.IS_NULLABLE,
+            CASE WHEN pk.COLUMN_NAME IS NULL THEN 0 ELSE 1 END
+                AS IS_PRIMARY_KEY,
+            COLUMNPROPERTY(OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' +
+                QUOTENAME(c.TABLE_NAME)), c.COLUMN_NAME, 'IsIdentity')
+                AS IS_IDENTITY
+        FROM INFORMATION_SCHEMA.COLUMNS c
+        LEFT JOIN (
+            SELECT ku.TABLE_SCHEMA, ku.TABLE_NAME, ku.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE ku
+                ON tc.CONSTRAINT_SCHEMA = ku.CONSTRAINT_SCHEMA
+                AND tc.CONSTRAINT_NAME = ku.CONSTRAINT_NAME
+            WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+        ) pk ON pk.TABLE_SCHEMA = c.TABLE_SCHEMA
+            AND pk.TABLE_NAME = c.TABLE_NAME
+            AND pk.COLUMN_NAME = c.COLUMN_NAME
+        ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+
+    RELATIONS_QUERY = """
+        SELECT
+            OBJECT_NAME(f.parent_object_id) AS tabla_padre,
+            COL_NAME(fc.parent_object_id, fc.parent_column_id) AS
+            columna_padre,
+            OBJECT_NAME(f.referenced_object_id) AS tabla_hija,
+            COL_NAME(fc.referenced_object_id,
+            fc.referenced_column_id) AS columna_hija
+        FROM
+            sys.foreign_keys f
+        INNER JOIN
+            sys.foreign_key_columns fc ON f.object_id =
+            fc.constraint_object_id
+    """
+
+    def connect(self, connection_params: Dict[str, str]):
+        if pyodbc is None:
+            raise RuntimeError("pyodbc no está disponible (falta el driver "
+                               "ODBC del sistema)")
+        url = (
+            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+            f"SERVER={connection_params['host']};"
+            f"PORT={connection_params['port']};"
+            f"DATABASE={connection_params['database']};"
+            f"UID={connection_params['user']};"
+            f"PWD={connection_params['password']};"
+            f"Timeout=0"
+        )
+        try:
+            return pyodbc.connect(url)
+        except pyodbc.Error as ex:
+            error_msg = str(ex)
+            code = ex.args[0] if len(ex.args) > 0 else None
+
+            # Mapeo por código o texto conocido
+            if "Cannot open database" in error_msg:
+                raise Exception(
+                    "La base de datos especificada no existe o no se puede "
+                    "acceder.")
+            elif "Login failed for user" in error_msg:
+                raise Exception(
+                    "Error de autenticación: usuario o contraseña "
+                    "incorrectos.")
+            elif code == '08001':
+                raise Exception(
+                    "No se puede conectar al servidor. Verifique la IP y el "
+                    "puerto.")
+            else:
+                raise Exception(
+                    f"Error de conexión a la base de datos: {error_msg}")
+
+    # 1 si la base tiene ALLOW_SNAPSHOT_ISOLATION ON
+    SNAPSHOT_STATE_QUERY = """
+        SELECT snapshot_isolation_state FROM sys.databases
+        WHERE name = DB_NAME()
+    """
+
+    def begin_snapshot(self, conn) -> bool:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self.SNAPSHOT_STATE_QUERY)
+            row = cursor.fetchone()
+            # La consulta abrió una transacción (autocommit desactivado) y
+            # SNAPSHOT tiene que fijarse antes de la primera lectura
+            conn.rollback()
+            if not row or row[0] != 1:
+                return False
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL SNAPSHOT")
+            return True
+        finally:
+            cursor.close()
+
+    def end_snapshot(self, conn):
+        # El nivel de aislamiento es de la sesión: la conexión vuelve al pool
+        # con el de por defecto
+        conn.rollback()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        finally:
+            cursor.close()
+
+    def schema_version(self, cursor) -> Tuple:
+        cursor.execute(self.SCHEMA_VERSION_QUERY)
+        return tuple(cursor.fetchone())
+
+    def load_schema(self, cursor):
+        cursor.execute(self.TABLES_QUERY)
+        tables = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(self.COLUMNS_QUERY)
+        columns = [tuple(row) for row in cursor.fetchall()]
+
+        cursor.execute(self.RELATIONS_QUERY)
+        names = [column[0] for column in cursor.description]
+        relations = [dict(zip(names, row)) for row in cursor.fetchall()]
+        return tables, columns, relations
+
+
+# --- SQLite ---------------------------------------------------------------
+
+_THREE_PART_NAME = re.compile(r"\b\w+\.dbo\.", re.IGNORECASE)
+_DBO_NAME = re.compile(r"\bdbo\.", re.IGNORECASE)
+_TOP = re.compile(r"\bSELECT\s+TOP\s*\(\s*(\d+)\s*\)\s*", re.IGNORECASE)
+_OFFSET_FETCH = re.compile(
+    r"\bOFFSET\s+(\d+)\s+ROWS\s+FETCH\s+NEXT\s+(\d+)\s+ROWS\s+ONLY",
+    re.IGNORECASE)
+_OFFSET = re.compile(r"\bOFFSET\s+(\d+)\s+ROWS\s*;?\s*$", re.IGNORECASE)
+# "+" junto a un literal de texto es concatenación en T-SQL
+_STRING_CONCAT = re.compile(r"'\s*\+|\+\s*'")
+_FUNCTIONS = (
+    (re.compile(r"\bISNULL\s*\(", re.IGNORECASE), "IFNULL("),
+    (re.compile(r"\bLEN\s*\(", re.IGNORECASE), "LENGTH("),
+    (re.compile(r"\bGETDATE\s*\(\s*\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+)
+
+
+def translate_tsql_to_sqlite(query: str) -> str:
+    """
+    Traduce el T-SQL que genera esta aplicación a SQLite: nombres de tres
+    partes (``S5Principal.dbo.X``), ``TOP (n)`` de la consulta exterior,
+    ``OFFSET ... FETCH NEXT``, concatenación con ``+`` junto a literales y
+    algunas funciones. No es un traductor general de T-SQL.
+    """
+    query = _THREE_PART_NAME.sub("", query)
+    query = _DBO_NAME.sub("", query)
+
+    top = _TOP.search(query)
+    if top:
+        query = (_TOP.sub("SELECT ", query, count=1).rstrip().rstrip(";")
+                 + f" LIMIT {top.group(1)}")
+    query = _OFFSET_FETCH.sub(r"LIMIT \2 OFFSET \1", query)
+    query = _OFFSET.sub(r"LIMIT -1 OFFSET \1", query)
+
+    query = _STRING_CONCAT.sub(
+        lambda m: "' ||" if m.group(0).startswith("'") else "|| '", query)
+    for pattern, replacement in _FUNCTIONS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+class _SqliteCursor:
+    """Cursor sqlite3 con la interfaz de pyodbc que usa la aplicación."""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, *params):
+        self._cursor.execute(translate_tsql_to_sqlite(query), params)
+        return self
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SqliteBackend(DatabaseBackend):
+    """
+    Base SQLite en ``path``. Si no existe se crea con el esquema de
+    db/fixtures/siscont_sqlite.sql y ``seed_trabajadores`` trabajadores
+    sintéticos. Los parámetros de conexión (host, usuario...) se ignoran,
+    salvo para separar los pools.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, seed_trabajadores: int):
+        self.path = path
+        self.seed_trabajadores = seed_trabajadores
+        self._init_lock = threading.Lock()
+
+    def _ensure_database(self):
+        # Importado aquí: el seeder solo hace falta al crear la base
+        from db.fixtures.seed import create_database
+        with self._init_lock:
+            if not os.path.exists(self.path):
+                tmp_path = f"{self.path}.tmp"
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                create_database(tmp_path, self.seed_trabajadores)
+                os.replace(tmp_path, self.path)
+
+    def connect(self, connection_params: Dict[str, str]):
+        self._ensure_database()
+        # Las conexiones del pool se usan desde los hilos del executor
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def translate(self, query: str) -> str:
+        return translate_tsql_to_sqlite(query)
+
+    def wrap_cursor(self, cursor):
+        return _SqliteCursor(cursor)
+
+    # Una transacción diferida fija su vista en la primera lectura y la
+    # mantiene hasta el rollback
+    def begin_snapshot(self, conn) -> bool:
+        conn.execute("BEGIN")
+        return True
+
+    def schema_version(self, cursor) -> Tuple:
+        cursor.execute("PRAGMA schema_version")
+        return tuple(cursor.fetchone())
+
+    def load_schema(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                       "AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        tables = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT m.name, p.name, p.type, NULL,
+                CASE WHEN p."notnull" THEN 'NO' ELSE 'YES' END,
+                p.pk > 0,
+                p.pk > 0 AND UPPER(p.type) = 'INTEGER'
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.name, p.cid
+        """)
+        columns = [(table, column, data_type, max_length, nullable,
+                    bool(primary_key), bool(identity))
+                   for (table, column, data_type, max_length, nullable,
+                        primary_key, identity) in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT m.name AS tabla_padre, f."from" AS columna_padre,
+                f."table" AS tabla_hija, f."to" AS columna_hija
+            FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+            WHERE m.type = 'table'
+        """)
+        names = [column[0] for column in cursor.description]
+        relations = [dict(zip(names, row)) for row in cursor.fetchall()]
+        return tables, columns, relations
+
+
+_backends: Dict[str, DatabaseBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = None) -> DatabaseBackend:
+    """Motor configurado en DB_BACKEND (o el indicado), uno por proceso."""
+    name = name or DB_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            if name == "sqlserver":
+                _backends[name] = SqlServerBackend()
+            elif name == "sqlite":
+                _backends[name] = SqliteBackend(get_sqlite_path(),
+                                                SQLITE_SEED_TRABAJADORES)
+            else:
+                raise ValueError(f"Motor de base de datos desconocido: "
+                                 f"{name}")
+        return _backends[name]
@@ -0,0 +1,211 @@
+# db/db_cache.py
+# cache en memoria de las salidas de los extractores: pedir de nuevo por la
+# API las mismas filas, o exportar a archivo una tabla cuyas filas ya se
+# pidieron, no vuelve a lanzar la misma consulta al SQL Server. La tabla de
+# "Visualizar datos" no pasa por aquí: pide al servidor solo la página
+# visible (ver utils.jsons_utils.fetch_page), así que no llena la cache
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL
+from db.db_connection import password_fingerprint, settings
+from db.db_executor import ejecutar_extractor
+from db.db_manager import ConexionParams
+from utils.json_encoder import dumps
+from utils.watermarks import file_signature
+
+
+# Filas que se codifican para estimar el tamaño de un resultado
+MUESTRA_TAMANO = 100
+
+
+class ResultCache:
+    """
+    Cache LRU con TTL y presupuesto de memoria. Cada entrada se mide por el
+    tamaño estimado de sus filas codificadas en JSON (ver estimar_bytes);
+    cuando se supera ``max_bytes`` se expulsan las menos usadas
+    recientemente.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = \
+            OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any, size: int) -> bool:
+        # Una entrada mayor que todo el presupuesto no se guarda
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, match: Callable[[Hashable], bool] = None) -> int:
+        """Elimina las entradas que cumplen ``match`` (todas si es None)."""
+        with self._lock:
+            keys = [k for k in self._entries if match is None or match(k)]
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3)
+                if lookups else None,
+                **self._stats,
+            }
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+result_cache = ResultCache(RESULT_CACHE_TTL, RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+
+# Opciones que cambian cómo se entrega el resultado, no cuál es
+OPCIONES_SALIDA = frozenset(("collect", "stream", "on_progress", "on_saved",
+                             "timings"))
+
+
+# La clave es (host, base de datos, extractor, usuario, huella de la
+# contraseña, parametros). Un acierto no abre conexión, así que sin las
+# credenciales en la clave otra contraseña (o una incorrecta) recibiría lo
+# que guardó una petición autenticada. Las opciones de salida (collect,
+# stream, on_progress...) no forman parte de ella
+def clave_cache(params: ConexionParams, extractor: Callable,
+                args: tuple, kwargs: Dict[str, Any]) -> Tuple:
+    nombre = _nombre_extractor(extractor)
+    parametros = sorted((k, v) for k, v in kwargs.items()
+                        if k not in OPCIONES_SALIDA)
+    return (params.host, params.database, nombre, settings.SQL_USER,
+            password_fingerprint(params.password),
+            repr(args), repr(parametros))
+
+
+def _nombre_extractor(extractor: Callable) -> str:
+    return f"{extractor.__module__}.{extractor.__qualname__}"
+
+
+def invalidar_cache(host: Optional[str] = None,
+                    database: Optional[str] = None) -> int:
+    """Invalida las entradas de un host/base de datos (o todas)."""
+    return result_cache.invalidate(
+        lambda k: (host is None or k[0] == host)
+        and (database is None or k[1] == database))
+
+
+# Tamaño aproximado de las filas en JSON: se codifica una muestra repartida
+# por todo el resultado y se extrapola. Codificarlas todas bloquearía el
+# event loop varios segundos con las tablas grandes.
+def estimar_bytes(rows: Any) -> int:
+    if not isinstance(rows, list) or len(rows) <= MUESTRA_TAMANO:
+        return len(dumps(rows))
+    paso = len(rows) / MUESTRA_TAMANO
+    muestra = [rows[int(i * paso)] for i in range(MUESTRA_TAMANO)]
+    return len(dumps(muestra)) * len(rows) // MUESTRA_TAMANO
+
+
+# Server-Timing indica "cache hit" solo si se devuelve lo guardado
+def _marcar_cache_hit(kwargs: Dict[str, Any]):
+    if kwargs.get("timings") is not None:
+        kwargs["timings"].cache_hit = True
+
+
+# Ejecuta el extractor pasando por la cache. Solo se guardan las filas
+# recogidas en memoria junto con el resumen del archivo que se escribio al
+# obtenerlas; una peticion ``solo_archivo`` con la entrada ya en cache
+# devuelve ese resumen sin repetir la consulta ni reescribir el JSON, siempre
+# que el archivo siga siendo el mismo (el nombre es por tabla y lo comparten
+# todas las bases de datos: otra exportación puede haberlo reemplazado).
+async def ejecutar_con_cache(params: ConexionParams, extractor: Callable,
+                             *args, solo_archivo: bool = False,
+                             **kwargs) -> Any:
+    key = clave_cache(params, extractor, args, kwargs)
+    found, value = result_cache.get(key)
+    if found:
+        rows, resumen, firma = value
+        if not solo_archivo:
+            _marcar_cache_hit(kwargs)
+            return rows
+        if resumen.get("archivo") and \
+                file_signature(resumen["archivo"]) == firma:
+            _marcar_cache_hit(kwargs)
+            return {**resumen, "desde_cache": True}
+
+    if solo_archivo:
+        return await ejecutar_extractor(params, extractor, *args,
+                                        collect=False, **kwargs)
+
+    resumen: Dict[str, Any] = {}
+    firma: Dict[str, Any] = {}
+
+    # Se llama en el hilo del executor nada más escribir el archivo
+    def on_saved(summary: Dict[str, Any]):
+        resumen.update(summary)
+        if summary.get("archivo"):
+            firma["archivo"] = file_signature(summary["archivo"])
+
+    rows = await ejecutar_extractor(params, extractor, *args,
+                                    on_saved=on_saved, **kwargs)
+    result_cache.put(key, (rows, resumen, firma.get("archivo")),
+                     estimar_bytes(rows))
+    return rows
+
+
+# Exportación incremental: siempre consulta la base de datos y, como
+# reescribe el archivo, descarta después lo que la cache tuviera de ese
+# extractor para esta conexión (filas y resumen ya no coinciden). Solo se
+# hace en JSON, así que no depende de EXPORT_FORMAT
+async def ejecutar_incremental(params: ConexionParams, extractor: Callable,
+                               *args, **kwargs) -> Any:
+    kwargs.setdefault("formato", "json")
+    data = await ejecutar_extractor(params, extractor, *args,
+                                    incremental=True, **kwargs)
+    nombre = _nombre_extractor(extractor)
+    result_cache.invalidate(
+        lambda k: k[:3] == (params.host, params.database, nombre))
+    return data
@@ -1,23 +1,278 @@
 # db/db_connection.py
 # conexion a la base de datos sqlserver
 
-import json
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 from os import makedirs, path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import pyodbc
-
-from config import get_settings
+from config import (DB_POOL_ACQUIRE_TIMEOUT, DB_POOL_HEALTHCHECK_AFTER,
+                    DB_POOL_IDLE_TIMEOUT, DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE,
+                    METADATA_RECHECK_INTERVAL, get_settings)
+from db.backends import DB_ERRORS, DatabaseBackend, get_backend
 from db.db_manager import ConexionParams
-from utils.serializations import is_serializable, serialize_value
+from db.db_metadata import MetadataCache, iter_structure_batches
+from utils.compression import get_codec
+from utils.json_encoder import file_encoder
 
 settings = get_settings()
 
+metadata_cache = MetadataCache(METADATA_RECHECK_INTERVAL)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones para un mismo (motor, host, database, user).
+
+    Mantiene hasta ``max_size`` conexiones abiertas, cierra las que llevan más
+    de ``idle_timeout`` segundos ociosas (sin bajar de ``min_size``) y valida
+    con ``SELECT 1`` las que se prestan tras estar ociosas un rato. ``fill()``
+    abre las ``min_size`` primeras al crearlo.
+    """
+
+    def __init__(self, factory: Callable[[], Any], min_size: int,
+                 max_size: int, idle_timeout: float, acquire_timeout: float,
+                 healthcheck_after: float):
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.healthcheck_after = healthcheck_after
+
+        self._idle = deque()  # (conexion, momento en que se devolvió)
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "released": 0,
+            "evicted_idle": 0,
+            "discarded_unhealthy": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    # Con block=False no espera a que se libere una: devuelve None si todas
+    # están prestadas
+    def acquire(self, block: bool = True):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("El pool de conexiones está cerrado.")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    conn, released_at = None, None
+                    self._in_use += 1
+                    break
+                if not block:
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise Exception(
+                        "No hay conexiones libres en el pool "
+                        f"(máximo {self.max_size}).")
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # Abrir o validar la conexión fuera del lock
+        try:
+            if conn is not None:
+                idle_for = time.monotonic() - released_at
+                if idle_for < self.healthcheck_after or self._is_healthy(conn):
+                    self._count("reused")
+                    return conn
+                self._count("discarded_unhealthy")
+                self._close_quietly(conn)
+            conn = self._factory()
+            self._count("created")
+            return conn
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    # Abre ``min_size`` conexiones (al menos una) y las deja ociosas. Si la
+    # primera falla se propaga el error: así se comprueban las credenciales
+    def fill(self):
+        conns = [self.acquire()]
+        try:
+            for _ in range(self.min_size - 1):
+                conns.append(self.acquire(block=False))
+        except Exception:
+            pass
+        finally:
+            for conn in conns:
+                if conn is not None:
+                    self.release(conn)
+
+    def release(self, conn, discard: bool = False):
+        if not discard:
+            try:
+                # Deshacer cualquier transacción abierta antes de reutilizarla
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            self._stats["released"] += 1
+            if discard or self._closed:
+                to_close = [conn]
+            else:
+                self._idle.append((conn, time.monotonic()))
+                to_close = self._pop_expired()
+            self._cond.notify()
+
+        for old in to_close:
+            self._close_quietly(old)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            to_close = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in to_close:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    def _pop_expired(self) -> List[Any]:
+        # Las más antiguas están a la izquierda (se presta por la derecha)
+        now = time.monotonic()
+        expired = []
+        while (self._idle
+               and len(self._idle) + self._in_use > self.min_size
+               and now - self._idle[0][1] > self.idle_timeout):
+            expired.append(self._idle.popleft()[0])
+        self._stats["evicted_idle"] += len(expired)
+        return expired
+
+    def _count(self, key: str):
+        with self._cond:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# Pools compartidos por (host, database, user). Se guarda también una huella
+# de la contraseña para no prestar sesiones abiertas con otras credenciales.
+_pools: Dict[Tuple[str, str, str, str], Tuple[str, ConnectionPool]] = {}
+_pools_lock = threading.Lock()
+
+
+# Huella de la contraseña: distingue credenciales sin guardarlas en claro
+def password_fingerprint(password: str) -> str:
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+def get_pool(connection_params: Dict[str, str],
+             backend: DatabaseBackend = None) -> ConnectionPool:
+    backend = backend or get_backend()
+    key = (
+        backend.name,
+        connection_params["host"],
+        connection_params["database"],
+        connection_params["user"],
+    )
+    fingerprint = password_fingerprint(connection_params["password"])
+
+    with _pools_lock:
+        entry = _pools.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+    # Credenciales nuevas o distintas: el pool se crea y se llena fuera del
+    # lock, y solo sustituye al existente si se pudo conectar con ellas. Una
+    # contraseña incorrecta falla aquí sin tocar las sesiones de los demás.
+    params = dict(connection_params)
+    pool = ConnectionPool(
+        factory=lambda: backend.connect(params),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        healthcheck_after=DB_POOL_HEALTHCHECK_AFTER,
+    )
+    pool.fill()
+
+    with _pools_lock:
+        entry = _pools.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            # Otro hilo instaló antes el mismo pool
+            winner = entry[1]
+        else:
+            _pools[key] = (fingerprint, pool)
+            winner = pool
+
+    if winner is not pool:
+        pool.close()
+    elif entry is not None:
+        # Las credenciales cambiaron: las sesiones viejas no se vuelven a
+        # prestar
+        entry[1].close()
+    return winner
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        f"{backend}://{host}/{database}/{user}": pool.stats()
+        for (backend, host, database, user), (_, pool) in pools
+    }
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
 
 class DatabaseManager:
     def __init__(self, host: str, password: str, database: str, port: str,
-                 user: str):
+                 user: str, pool: Optional[ConnectionPool] = None,
+                 backend: DatabaseBackend = None):
         self.connection_params = {
             "host": host,
             "password": password,
@@ -25,145 +280,133 @@ class DatabaseManager:
             "port": port,
             "user": user,
         }
+        self._pool = pool
         self._conn = None
+        self.backend = backend or get_backend()
+        # Dentro de snapshot(): otras conexiones no verían la misma vista
+        self.in_snapshot = False
+
+    @property
+    def host(self) -> str:
+        return self.connection_params["host"]
+
+    @property
+    def database(self) -> str:
+        return self.connection_params["database"]
 
     def __enter__(self):
         self.connect()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        self.close(discard=isinstance(exc_val, DB_ERRORS))
 
     def connect(self):
         if self._conn is None:
-            print(f"Conectando con parámetros: {self.connection_params}")
-            self._conn = self._create_connection()
+            if self._pool is not None:
+                self._conn = self._pool.acquire()
+            else:
+                print(f"Conectando a {self.connection_params['host']}/"
+                      f"{self.connection_params['database']}")
+                self._conn = self._create_connection()
         return self._conn
 
-    def close(self):
+    def close(self, discard: bool = False):
         if self._conn:
-            self._conn.close()
+            if self._pool is not None:
+                # Devuelve la conexión al pool en lugar de cerrarla
+                self._pool.release(self._conn, discard=discard)
+            else:
+                self._conn.close()
             self._conn = None
 
     def _create_connection(self):
-        url = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={self.connection_params['host']};"
-            f"PORT={self.connection_params['port']};"
-            f"DATABASE={self.connection_params['database']};"
-            f"UID={self.connection_params['user']};"
-            f"PWD={self.connection_params['password']};"
-            f"Timeout=0"
-        )
-        try:
-            return pyodbc.connect(url)
-        except pyodbc.Error as ex:
-            error_msg = str(ex)
-            code = ex.args[0] if len(ex.args) > 0 else None
-
-            # Mapeo por código o texto conocido
-            if "Cannot open database" in error_msg:
-                raise Exception(
-                    "La base de datos especificada no existe o no se puede acceder.")
-            elif "Login failed for user" in error_msg:
-                raise Exception(
-                    "Error de autenticación: usuario o contraseña incorrectos.")
-            elif code == '08001':
-                raise Exception(
-                    "No se puede conectar al servidor. Verifique la IP y el puerto.")
-            else:
-                raise Exception(
-                    f"Error de conexión a la base de datos: {error_msg}")
+        return self.backend.connect(self.connection_params)
 
+    # El cursor que se entrega adapta el SQL al motor (ver db/backends.py)
     @contextmanager
     def cursor(self):
         conn = self.connect()
-        cursor = conn.cursor()
+        cursor = self.backend.wrap_cursor(conn.cursor())
         try:
             yield cursor
         finally:
             cursor.close()
 
+    # Todas las consultas dentro del bloque leen la misma versión de la base
+    # (SNAPSHOT en SQL Server). Si la base no tiene ALLOW_SNAPSHOT_ISOLATION
+    # se sigue sin ella, con un aviso; el valor indica cuál de los dos casos
+    @contextmanager
+    def snapshot(self):
+        conn = self.connect()
+        snapshot = self.backend.begin_snapshot(conn)
+        if not snapshot:
+            logging.warning(
+                f"{self.database}: sin aislamiento SNAPSHOT (activar "
+                f"ALLOW_SNAPSHOT_ISOLATION); las consultas no comparten vista")
+        self.in_snapshot = True
+        try:
+            yield snapshot
+        finally:
+            self.in_snapshot = False
+            self.backend.end_snapshot(conn)
+
+    # Otro DatabaseManager con las mismas credenciales y el mismo pool, para
+    # leer en paralelo por otra conexión
+    def sibling(self) -> "DatabaseManager":
+        return DatabaseManager(**self.connection_params, pool=self._pool,
+                               backend=self.backend)
+
+    # sibling() ya conectado, o None si el pool no tiene ahora mismo una
+    # conexión libre (no espera: las esperas largas son para quien solo
+    # necesita una)
+    def try_sibling(self) -> Optional["DatabaseManager"]:
+        sibling = self.sibling()
+        if self._pool is None:
+            sibling.connect()
+            return sibling
+        conn = self._pool.acquire(block=False)
+        if conn is None:
+            return None
+        sibling._conn = conn
+        return sibling
+
+    # Los metadatos salen de la cache por base de datos (db/db_metadata.py),
+    # que solo vuelve a consultar el catálogo si cambió el esquema
     def get_all_tables(self) -> Dict[str, Any]:
-        with self.cursor() as cursor:
-            cursor.execute(
-                "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE "
-                "TABLE_TYPE = 'BASE TABLE'"
-            )
-            tables = [row.TABLE_NAME for row in cursor.fetchall()]
-            return {"tables": tables, "total_tables": len(tables)}
+        tables = list(metadata_cache.snapshot(self).tables)
+        return {"tables": tables, "total_tables": len(tables)}
 
     def get_table_structure(self, table_name: str) -> List[Dict]:
-        with self.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, 
-                IS_NULLABLE
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = ?
-                """,
-                table_name,
-            )
-            return [
-                {
-                    "column_name": column.COLUMN_NAME,
-                    "data_type": column.DATA_TYPE,
-                    "max_length": column.CHARACTER_MAXIMUM_LENGTH,
-                    "is_nullable": column.IS_NULLABLE,
-                }
-                for column in cursor.fetchall()
-            ]
+        return metadata_cache.snapshot(self).table_structure(table_name)
+
+    # Estructura de todas las tablas (o de ``tables``) agrupada por tabla, con
+    # clave primaria e identidad. Con stream=True devuelve lotes para NDJSON
+    def get_tables_structure(self, tables: Optional[List[str]] = None,
+                             stream: bool = False):
+        snapshot = metadata_cache.snapshot(self)
+        if stream:
+            return iter_structure_batches(snapshot, tables)
+        structure = {item["table_name"]: item["columns"]
+                     for item in snapshot.tables_structure(tables)}
+        found = {name.lower() for name in structure}
+        return {
+            "tables": structure,
+            "total_tables": len(structure),
+            "not_found": [name for name in tables or []
+                          if name.lower() not in found],
+        }
 
     def get_table_relations(self, table_name: str) -> List[Dict[str, Any]]:
         try:
-            with self.cursor() as cursor:
-                cursor.execute(
-                    f"""
-                    SELECT
-                        OBJECT_NAME(f.parent_object_id) AS tabla_padre,
-                        COL_NAME(fc.parent_object_id, fc.parent_column_id) AS 
-                        columna_padre,
-                        OBJECT_NAME(f.referenced_object_id) AS tabla_hija,
-                        COL_NAME(fc.referenced_object_id, 
-                        fc.referenced_column_id) AS columna_hija
-                    FROM
-                        sys.foreign_keys f
-                    INNER JOIN
-                        sys.foreign_key_columns fc ON f.object_id = 
-                        fc.constraint_object_id
-                    WHERE
-                        OBJECT_NAME(f.parent_object_id) = '{table_name}'
-                    OR
-                        OBJECT_NAME(f.referenced_object_id) = '{table_name}'
-                """
-                )
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return metadata_cache.snapshot(self).table_relations(table_name)
         except Exception as e:
             print(f"Error al obtener relaciones de {table_name}: {e}")
             raise
 
     def get_all_relations(self) -> List[Dict]:
         try:
-            with self.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT
-                        OBJECT_NAME(f.parent_object_id) AS tabla_padre,
-                        COL_NAME(fc.parent_object_id, fc.parent_column_id) AS 
-                        columna_padre,
-                        OBJECT_NAME(f.referenced_object_id) AS tabla_hija,
-                        COL_NAME(fc.referenced_object_id, 
-                        fc.referenced_column_id) AS columna_hija
-                    FROM
-                        sys.foreign_keys f
-                    INNER JOIN
-                        sys.foreign_key_columns fc ON f.object_id = 
-                        fc.constraint_object_id
-                """
-                )
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return list(metadata_cache.snapshot(self).relations)
         except Exception as e:
             print(f"Error al obtener relaciones: {e}")
             raise
@@ -180,36 +423,29 @@ class DatabaseManager:
             cursor.execute(query)
 
             columns = [column[0] for column in cursor.description]
-            table_data = []
-
-            for row in cursor.fetchall():
-                row_data = {
-                    columns[i]: (
-                        serialize_value(row[i])
-                        if not is_serializable(row[i])
-                        else row[i]
-                    )
-                    for i in range(len(columns))
-                }
-                table_data.append(row_data)
-
-        file_path = path.join(output_folder, f"{table_name}.json")
-        with open(file_path, "w", encoding="utf-8") as json_file:
-            json.dump(
-                {"table_name": table_name, "data": table_data},
-                json_file,
-                indent=4,
-                ensure_ascii=False,
-            )
-
-        return {"table_name": table_name, "data": table_data}
+            # Fechas y Decimal los resuelve el codificador (file_encoder)
+            table_data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        content = {"table_name": table_name, "data": table_data}
+        codec = get_codec()
+        file_path = path.join(output_folder,
+                              f"{table_name}.json{codec.extension}")
+        with codec.open_write(file_path) as json_file:
+            json_file.write(file_encoder.dumps(content))
 
+        return content
 
+
+# Crea un DatabaseManager que toma sus conexiones del pool compartido
 def create_db_manager(params: ConexionParams) -> DatabaseManager:
-    return DatabaseManager(
-        host=params.host,
-        password=params.password,
-        database=params.database,
-        port=str(settings.SQL_PORT),
-        user=settings.SQL_USER,
-    )
+    connection_params = {
+        "host": params.host,
+        "password": params.password,
+        "database": params.database,
+        "port": str(settings.SQL_PORT),
+        "user": settings.SQL_USER,
+    }
+    backend = get_backend()
+    return DatabaseManager(**connection_params,
+                           pool=get_pool(connection_params, backend),
+                           backend=backend)
@@ -0,0 +1,189 @@
+# db/db_executor.py
+# ejecuta el trabajo bloqueante (pyodbc, escritura de los JSON) en un pool
+# de hilos acotado para no congelar el event loop de uvicorn/NiceGUI
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+
+from config import DB_EXECUTOR_MAX_WORKERS
+from db.backends import DB_ERRORS
+from db.db_connection import create_db_manager
+from db.db_manager import ConexionParams, PaginaParams
+
+
+class DBExecutor:
+    """
+    ThreadPoolExecutor con métricas de cola: cuántas tareas esperan hilo,
+    cuántas se están ejecutando y cuánto tiempo esperaron antes de empezar.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="db-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "total_run_s": 0.0,
+        }
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._queued)
+
+        def task():
+            started_at = time.perf_counter()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._stats["total_wait_s"] += wait
+                self._stats["max_wait_s"] = max(self._stats["max_wait_s"],
+                                                wait)
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._stats["completed" if ok else "failed"] += 1
+                    self._stats["total_run_s"] += (time.perf_counter()
+                                                   - started_at)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, task)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._stats["completed"] + self._stats["failed"]
+            started = finished + self._active
+            return {
+                **self._stats,
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "active": self._active,
+                "avg_wait_s": (self._stats["total_wait_s"] / started
+                               if started else 0.0),
+                "avg_run_s": (self._stats["total_run_s"] / finished
+                              if finished else 0.0),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+db_executor = DBExecutor(DB_EXECUTOR_MAX_WORKERS)
+
+
+# Ejecuta cualquier función bloqueante en el executor de base de datos
+async def ejecutar_en_db(func: Callable, *args, **kwargs) -> Any:
+    return await db_executor.run(func, *args, **kwargs)
+
+
+# Abre una conexión (del pool), ejecuta el extractor y la devuelve, todo
+# dentro de un hilo del executor. Sirve tanto para los extractores de
+# db_nomina/db_general como para métodos de DatabaseManager.
+async def ejecutar_extractor(params: ConexionParams, extractor: Callable,
+                             *args, **kwargs) -> Any:
+    def _run():
+        with create_db_manager(params) as db:
+            return extractor(db, *args, **kwargs)
+
+    return await db_executor.run(_run)
+
+
+# Varios extractores sobre una sola conexión y dentro de una misma
+# transacción SNAPSHOT, de modo que todas las tablas salen del mismo momento
+# de la base (ver DatabaseManager.snapshot). Todo corre en un único hilo del
+# executor, un extractor tras otro. Un fallo en uno no detiene los demás:
+# cada resultado lleva ``ok`` y ``datos`` o ``error``.
+async def ejecutar_lote(params: ConexionParams,
+                        extractores: Dict[str, Callable],
+                        **kwargs) -> Dict[str, Any]:
+    def _run():
+        resultados = {}
+        discard = False
+        inicio = time.perf_counter()
+        with create_db_manager(params) as db:
+            with db.snapshot() as snapshot:
+                for nombre, extractor in extractores.items():
+                    inicio_extractor = time.perf_counter()
+                    try:
+                        resultado = {"ok": True,
+                                     "datos": extractor(db, **kwargs)}
+                    except Exception as e:
+                        # Con un error del driver la sesión puede haber
+                        # quedado mal: no se devuelve al pool
+                        discard = discard or isinstance(e, DB_ERRORS)
+                        resultado = {"ok": False, "error": str(e)}
+                    resultado["segundos"] = round(
+                        time.perf_counter() - inicio_extractor, 2)
+                    resultados[nombre] = resultado
+            if discard:
+                db.close(discard=True)
+        return {"snapshot": snapshot, "resultados": resultados,
+                "segundos": round(time.perf_counter() - inicio, 2)}
+
+    return await db_executor.run(_run)
+
+
+# Una página de un extractor para la tabla de "Visualizar datos" (ver
+# utils.jsons_utils.fetch_page). Los extractores que no pasan por
+# export_table_to_json* (p. ej. relaciones-trabajadores) no saben paginar.
+async def ejecutar_pagina(params: ConexionParams, extractor: Callable,
+                          pagina: PaginaParams) -> Dict[str, Any]:
+    data = await ejecutar_extractor(params, extractor, pagina=pagina)
+    if not isinstance(data, dict) or "rows" not in data:
+        raise ValueError(f"{extractor.__name__} no admite paginación")
+    return data
+
+
+# Versión en streaming de ejecutar_extractor: el extractor se llama con
+# stream=True y cada lote se lee del cursor en un hilo del executor. La
+# conexión se mantiene prestada hasta que se consume (o se cierra) el
+# generador. ``formatter`` convierte cada lote antes de salir del hilo.
+# Si se cancela con una lectura en curso, el cierre espera a que termine: un
+# generador no se puede cerrar mientras otro hilo lo está ejecutando.
+async def iterar_extractor(params: ConexionParams, extractor: Callable,
+                           *args, formatter: Callable = None,
+                           **kwargs) -> AsyncIterator[Any]:
+    def _batches():
+        with create_db_manager(params) as db:
+            for batch in extractor(db, *args, stream=True, **kwargs):
+                yield formatter(batch) if formatter else batch
+
+    batches = _batches()
+    lock = threading.Lock()
+
+    def _next():
+        with lock:
+            return next(batches, None)
+
+    def _close():
+        with lock:
+            batches.close()
+
+    try:
+        while True:
+            batch = await db_executor.run(_next)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        await asyncio.shield(db_executor.run(_close))
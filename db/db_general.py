@@ -8,7 +8,7 @@ from utils.jsons_utils import export_table_to_json, \
 
 # Para obtener las unidades de medida y poniendo alias con el nombre
 # del campo en el doctype
-def get_unidad_medida(db):
+def get_unidad_medida(db, **opciones):
     doctype_name = "UOM"
     sqlserver_name = "SMGNOMENCLADORUNIDADMEDIDA"
     module_name = "Setup"
@@ -36,5 +36,13 @@ def get_unidad_medida(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
+
+
+# Registro de extractores por endpoint (mismo nombre que la ruta en
+# api/api_general.py)
+EXTRACTORES_GENERAL = {
+    "unidad_medida": get_unidad_medida,
+}
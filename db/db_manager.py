@@ -3,7 +3,9 @@
 
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from config import GRID_MAX_PAGE_SIZE, GRID_PAGE_SIZE
 
 
 class ConexionParams(BaseModel):
@@ -67,6 +69,38 @@ class Payload(BaseModel):
     fields: List[Campo]
 
 
+# Estructura de varias tablas de una vez; sin ``tables`` se devuelven todas
+class StructureRequest(BaseModel):
+    params: ConexionParams
+    tables: Optional[List[str]] = None
+
+
+# Una página de un extractor para la tabla de "Visualizar datos": número de
+# página (desde 1), filas, alias por el que ordenar y texto a buscar
+class PaginaParams(BaseModel):
+    page: int = Field(1, ge=1)
+    size: int = Field(GRID_PAGE_SIZE, ge=1, le=GRID_MAX_PAGE_SIZE)
+    sort: Optional[str] = None
+    descending: bool = False
+    filtro: Optional[str] = None
+
+
+# Exportación en segundo plano de uno o varios extractores de un módulo
+# (los nombres son los de las rutas, p. ej. "trabajadores")
+class JobRequest(BaseModel):
+    params: ConexionParams
+    modulo: str
+    endpoints: List[str]
+    formato: Optional[str] = None  # json, csv, arrow o parquet
+
+
+# Varios extractores de un módulo leídos en una sola conexión y transacción
+# SNAPSHOT; sin ``endpoints`` se leen todos los del módulo
+class LoteRequest(BaseModel):
+    params: ConexionParams
+    endpoints: Optional[List[str]] = None
+
+
 # Modelo para el endpoint de generar Doctype JSON
 class GenerateDoctype(BaseModel):
     params: ConexionParams
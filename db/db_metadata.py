@@ -0,0 +1,137 @@
+# db/db_metadata.py
+# cache de los metadatos del esquema (tablas, columnas y claves foraneas)
+# por base de datos. Se cargan una vez y solo se recargan cuando cambia la
+# version del esquema (en SQL Server, ultima modify_date y numero de objetos
+# de sys.objects)
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Tablas por línea en la salida NDJSON de la estructura
+STRUCTURE_BATCH_SIZE = 50
+
+
+class SchemaSnapshot:
+    """
+    Metadatos de una base de datos en un momento dado. Las búsquedas por
+    nombre de tabla no distinguen mayúsculas, como la intercalación por
+    defecto de SQL Server.
+    """
+
+    def __init__(self, version: Tuple, tables: List[str],
+                 columns: Dict[str, List[Dict]], names: Dict[str, str],
+                 relations: List[Dict[str, Any]]):
+        self.version = version
+        self.tables = tables
+        # columnas por nombre de tabla en minúsculas; ``names`` guarda el
+        # nombre original
+        self.columns = columns
+        self.names = names
+        self.relations = relations
+        self.checked_at = time.monotonic()
+
+    def table_structure(self, table_name: str) -> List[Dict]:
+        return list(self.columns.get(table_name.lower(), []))
+
+    def tables_structure(self, table_names: Optional[List[str]] = None
+                         ) -> Iterator[Dict[str, Any]]:
+        """Estructura de todas las tablas (o de ``table_names``) en orden."""
+        keys = (self.columns.keys() if table_names is None
+                else dict.fromkeys(n.lower() for n in table_names))
+        for key in keys:
+            if key in self.columns:
+                yield {"table_name": self.names[key],
+                       "columns": list(self.columns[key])}
+
+    def table_relations(self, table_name: str) -> List[Dict[str, Any]]:
+        name = table_name.lower()
+        return [r for r in self.relations
+                if (r["tabla_padre"] or "").lower() == name
+                or (r["tabla_hija"] or "").lower() == name]
+
+
+# Las consultas al catálogo dependen del motor (db/backends.py)
+def _schema_version(db) -> Tuple:
+    with db.cursor() as cursor:
+        return db.backend.schema_version(cursor)
+
+
+def _load_snapshot(db, version: Tuple) -> SchemaSnapshot:
+    with db.cursor() as cursor:
+        tables, column_rows, relations = db.backend.load_schema(cursor)
+
+    columns: Dict[str, List[Dict]] = {}
+    names: Dict[str, str] = {}
+    for (table, column, data_type, max_length, nullable, primary_key,
+         identity) in column_rows:
+        names.setdefault(table.lower(), table)
+        columns.setdefault(table.lower(), []).append({
+            "column_name": column,
+            "data_type": data_type,
+            "max_length": max_length,
+            "is_nullable": nullable,
+            "is_primary_key": bool(primary_key),
+            "is_identity": bool(identity),
+        })
+
+    return SchemaSnapshot(version, tables, columns, names, relations)
+
+
+# Agrupa la estructura de las tablas en lotes para la salida NDJSON
+def iter_structure_batches(snapshot: SchemaSnapshot,
+                           table_names: Optional[List[str]] = None):
+    structures = snapshot.tables_structure(table_names)
+    while True:
+        batch = list(itertools.islice(structures, STRUCTURE_BATCH_SIZE))
+        if not batch:
+            break
+        yield batch
+
+
+class MetadataCache:
+    """
+    Un SchemaSnapshot por (host, base de datos). Mientras no hayan pasado
+    ``recheck_interval`` segundos desde la última comprobación se sirve sin
+    consultar nada; después se lee la versión del esquema (una consulta
+    barata) y solo si cambió se recargan tablas, columnas y FKs.
+    """
+
+    def __init__(self, recheck_interval: float):
+        self.recheck_interval = recheck_interval
+        self._snapshots: Dict[Tuple[str, str], SchemaSnapshot] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "checks": 0, "reloads": 0}
+
+    def snapshot(self, db) -> SchemaSnapshot:
+        key = (db.host, db.database)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        now = time.monotonic()
+
+        if snapshot and now - snapshot.checked_at < self.recheck_interval:
+            with self._lock:
+                self._stats["hits"] += 1
+            return snapshot
+
+        version = _schema_version(db)
+        if snapshot and snapshot.version == version:
+            snapshot.checked_at = now
+            with self._lock:
+                self._stats["checks"] += 1
+            return snapshot
+
+        snapshot = _load_snapshot(db, version)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._stats["reloads"] += 1
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "databases": [f"{h}/{d}" for h, d in self._snapshots],
+                "recheck_interval_s": self.recheck_interval,
+                **self._stats,
+            }
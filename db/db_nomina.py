@@ -5,10 +5,14 @@ from typing import Dict, List
 from utils.jsons_utils import export_table_to_json, \
     export_table_to_json_paginated
 
+# Los extractores reciben **opciones y las pasan tal cual a
+# export_table_to_json / export_table_to_json_paginated (p. ej. collect=False
+# para escribir solo el archivo sin devolver las filas)
+
 
 # Funcion para obtener los datos de SCPTrabajadores segun el query necesario
 # para el JSON
-def get_trabajadores(db) -> List[Dict]:
+def get_trabajadores(db, **opciones) -> List[Dict]:
     doctype_name = "Employee"
     sqlserver_name = "SCPTRABAJADORES"
     module_name = "Setup"
@@ -64,13 +68,15 @@ def get_trabajadores(db) -> List[Dict]:
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Prepara la relacion entre las tablas con SCPTrabajadores y las muestra en
 # el frontend
-def get_relaciones_trabajadores(db) -> List[Dict]:
+# No escribe archivo, así que las opciones de exportación se ignoran
+def get_relaciones_trabajadores(db, **opciones) -> List[Dict]:
     query = """
     SELECT
         fk.table_name AS source_table,
@@ -157,7 +163,7 @@ def construir_tree_trabajadores(relaciones):
 
 # Para obtener las categorias ocupacionales y poniendo alias con el nombre
 # del campo en el doctype
-def get_categorias_ocupacionales(db):
+def get_categorias_ocupacionales(db, **opciones):
     doctype_name = "Occupational Category"
     sqlserver_name = "SNOCATEGOCUP"
     module_name = "Cuba"
@@ -185,13 +191,14 @@ def get_categorias_ocupacionales(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener los cargos de los trabajadores
 # No le pongo field_mapping por ser un solo campo tipo texto
-def get_cargos_trabajadores(db):
+def get_cargos_trabajadores(db, **opciones):
     doctype_name = "Designation"
     sqlserver_name = "SNOCARGOS"
     module_name = "Setup"
@@ -218,13 +225,14 @@ def get_cargos_trabajadores(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener los tipos de trabajadores
 # No field_mapping por ser solo campo tipo texto
-def get_tipos_trabajadores(db):
+def get_tipos_trabajadores(db, **opciones):
     doctype_name = "Employment Type"
     sqlserver_name = "SNOCTIPOTRABAJADOR"
     module_name = "HR"
@@ -251,12 +259,13 @@ def get_tipos_trabajadores(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener los tipos de  retenciones
-def get_tipos_retenciones(db):
+def get_tipos_retenciones(db, **opciones):
     doctype_name = "Withholding Type"
     sqlserver_name = "SCPCONRETPAGAR"
     module_name = "Cuba"
@@ -289,12 +298,13 @@ def get_tipos_retenciones(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener maestro de  retenciones
-def get_maestro_retenciones(db):
+def get_maestro_retenciones(db, **opciones):
     doctype_name = "XXXXXX"
     sqlserver_name = "SCPMAESTRORETENCION"
     module_name = "XXXXXX"
@@ -339,12 +349,13 @@ def get_maestro_retenciones(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener loa pensionados
-def get_pensionados(db):
+def get_pensionados(db, **opciones):
     doctype_name = "Customer"
     sqlserver_name = "SNOMANTPENS"
     module_name = "Selling"
@@ -373,12 +384,13 @@ def get_pensionados(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener tasas de destajo
-def get_tasas_destajos(db):
+def get_tasas_destajos(db, **opciones):
     doctype_name = "Item Price"
     sqlserver_name = "SNONOMENCLADORTASASDESTAJO"
     module_name = "Stock"
@@ -405,12 +417,13 @@ def get_tasas_destajos(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener colectivos
-def get_colectivos(db):
+def get_colectivos(db, **opciones):
     doctype_name = "Employee Group"
     sqlserver_name = "SNONOMENCLADORCOLECTIVOS"
     module_name = "Setup"
@@ -437,12 +450,13 @@ def get_colectivos(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para obtener departamentos
-def get_departamentos(db):
+def get_departamentos(db, **opciones):
     doctype_name = "Department"
     sqlserver_name = "SMGAREASUBAREA"
     module_name = "Setup"
@@ -477,12 +491,13 @@ def get_departamentos(db):
         sqlserver_name=sqlserver_name,
         module_name=module_name,
         field_mapping=field_mapping,
-        table_query=query
+        table_query=query,
+        **opciones
     )
 
 
 # Para submayor de vacaciones
-def get_submayor_vacaciones(db):
+def get_submayor_vacaciones(db, **opciones):
     doctype_name = "Employee Opening Vacation Subledger"
     sqlserver_name = "SNOSMVACACIONES"
     module_name = "Cuba"
@@ -507,8 +522,15 @@ def get_submayor_vacaciones(db):
         GROUP BY s.CPTrabConsecutivoID
     """
 
+    # Se ordena por un agregado, así que no hay clave keyset que SQL Server
+    # pueda filtrar antes del GROUP BY: pagina con OFFSET/FETCH
     order_clause = "ORDER BY MAX(s.SMVacId) DESC"
 
+    # En modo incremental vuelve a leer los trabajadores con un movimiento de
+    # vacaciones posterior al último exportado y los reemplaza en el archivo
+    watermark_column = "MAX(s.SMVacId)"
+    merge_key = "expediente_laboral"
+
     return export_table_to_json_paginated(
         db=db,
         doctype_name=doctype_name,
@@ -516,12 +538,15 @@ def get_submayor_vacaciones(db):
         module_name=module_name,
         field_mapping=field_mapping,
         base_query_from=base_query_from,
-        order_clause=order_clause
+        order_clause=order_clause,
+        watermark_column=watermark_column,
+        merge_key=merge_key,
+        **opciones
     )
 
 
 # Para submayor de salarios no reclamados
-def get_submayor_salarios_no_reclamados(db):
+def get_submayor_salarios_no_reclamados(db, **opciones):
     doctype_name = "Opening of the Unclaimed Salary Subledger"
     sqlserver_name = "SNOSMREINTEGRONR"
     module_name = "Cuba"
@@ -551,11 +576,15 @@ def get_submayor_salarios_no_reclamados(db):
         module_name=module_name,
         field_mapping=field_mapping,
         base_query_from=base_query_from,
-        order_clause=order_clause
+        order_clause=order_clause,
+        keyset_column="s.SMrnrIdentificador",
+        # Identidad creciente: en modo incremental solo se añaden las nuevas
+        watermark_column="s.SMrnrIdentificador",
+        **opciones
     )
 
 
-def get_corte_sc408(db, current_year=None):
+def get_corte_sc408(db, current_year=None, **opciones):
     doctype_name = "sc408 model"
     sqlserver_name = "SNOMODSC408CORTE"
     module_name = "Cuba"
@@ -585,16 +614,6 @@ def get_corte_sc408(db, current_year=None):
          ("SUM(s.sccorteSubsidioImporte)", 'float'))
     ]
 
-    # Consulta para contar el total de registros (número de empleados distintos)
-    count_query = f"""
-        SELECT COUNT(DISTINCT s2.CPTrabConsecutivoID)
-        FROM SNOMODSC408CORTE s
-        JOIN SCPTRABAJADORES s2 ON s.CPTrabConsecutivoID = 
-        s2.CPTrabConsecutivoID
-        WHERE (s2.TrabDesactivado = '' OR s2.TrabDesactivado IS NULL)
-          AND s.sccorteanoCalendario IN ({current_year}, {previous_year})
-    """
-
     # Consulta base con GROUP BY para obtener los datos agregados
     base_query_from = f"""
         FROM SNOMODSC408CORTE s
@@ -606,24 +625,11 @@ def get_corte_sc408(db, current_year=None):
     """
 
     order_clause = "ORDER BY s2.CPTrabConsecutivoID"
+    # Es la columna del GROUP BY: única por fila, sirve de clave keyset
+    keyset_column = "s2.CPTrabConsecutivoID"
 
-    # Obtenemos el total de registros primero
-    with db.cursor() as cursor:
-        cursor.execute(count_query)
-        total_items = cursor.fetchone()[0]
-
-    if total_items == 0:
-        logging.warning(
-            f"No hay datos de Corte para los años {current_year} o "
-            f"{previous_year}")
-        return []
-
-    # Construimos la consulta SELECT completa con alias y funciones agregadas
-    select_clauses = [f"{sql_field} AS {alias}" for alias, (sql_field, _) in
-                      field_mapping]
-    select_query = (f"SELECT {', '.join(select_clauses)} {base_query_from} "
-                    f"{order_clause}")
-
+    # El total de empleados sale de la primera página (COUNT(*) OVER()), sin
+    # agregar SC408 una vez más solo para contar
     return export_table_to_json_paginated(
         db=db,
         doctype_name=doctype_name,
@@ -631,5 +637,27 @@ def get_corte_sc408(db, current_year=None):
         module_name=module_name,
         field_mapping=field_mapping,
         base_query_from=base_query_from,
-        order_clause=order_clause
+        order_clause=order_clause,
+        keyset_column=keyset_column,
+        **opciones
     )
+
+
+# Registro de extractores por endpoint (mismo nombre que la ruta en
+# api/api_nomina.py). Lo usan los clientes de services para llamarlos en
+# proceso sin pasar por HTTP.
+EXTRACTORES_NOMINA = {
+    "trabajadores": get_trabajadores,
+    "relaciones-trabajadores": get_relaciones_trabajadores,
+    "categorias-ocupacionales": get_categorias_ocupacionales,
+    "cargos-trabajadores": get_cargos_trabajadores,
+    "tipos-trabajadores": get_tipos_trabajadores,
+    "tipos-retenciones": get_tipos_retenciones,
+    "pensionados": get_pensionados,
+    "tasas_destajos": get_tasas_destajos,
+    "colectivos": get_colectivos,
+    "departamentos": get_departamentos,
+    "submayor_vacaciones": get_submayor_vacaciones,
+    "submayor_salarios_no_reclamados": get_submayor_salarios_no_reclamados,
+    "pagos_trabajadores": get_corte_sc408,
+}
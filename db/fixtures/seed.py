@@ -0,0 +1,153 @@
+# db/fixtures/seed.py
+# crea una base SQLite con el esquema de siscont_sqlite.sql y la llena con
+# datos sinteticos (deterministas) del tamaño pedido. Ejecutar desde la raíz
+# del proyecto:
+#   python -m db.fixtures.seed ruta.sqlite [--trabajadores N] [--meses M]
+
+import argparse
+import datetime
+import os
+import sqlite3
+
+DDL_PATH = os.path.join(os.path.dirname(__file__), "siscont_sqlite.sql")
+
+CARGOS = 150
+CATEGORIAS = 12
+TIPOS_TRABAJADOR = 4
+AREAS = 40
+REPARTOS = 168
+CUENTAS = 30
+RETENCIONES = 20
+PENSIONADOS_POR_MIL = 50
+TASAS_DESTAJO = 300
+COLECTIVOS = 25
+UNIDADES_MEDIDA = 60
+
+
+def create_schema(conn: sqlite3.Connection):
+    with open(DDL_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+
+
+def _insert(conn: sqlite3.Connection, table: str, rows):
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    marks = ", ".join("?" * len(first))
+    conn.execute(f"INSERT INTO {table} VALUES ({marks})", first)
+    conn.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+
+
+def _fecha(dias: int) -> str:
+    return (datetime.date(2015, 1, 1)
+            + datetime.timedelta(days=dias)).isoformat()
+
+
+def _trabajador_id(i: int) -> str:
+    return f"{i:08d}"
+
+
+def seed(conn: sqlite3.Connection, trabajadores: int = 1000,
+         meses: int = 24, anio: int = None):
+    """
+    Llena las tablas con ``trabajadores`` trabajadores y, por cada uno, un
+    registro SC408 por mes (``meses`` meses hasta diciembre de ``anio``), un
+    saldo de vacaciones, dos reintegros y una retención cada tres.
+    """
+    anio = anio or datetime.date.today().year
+
+    _insert(conn, "SNOCARGOS",
+            ((i, f"Cargo {i}", "") for i in range(1, CARGOS + 1)))
+    # SQL Server ignora los espacios finales al comparar ('' = ' ') y SQLite
+    # no: los valores se eligen para que los filtros de los extractores
+    # devuelvan filas en los dos motores
+    _insert(conn, "SNOCATEGOCUP",
+            ((i, f"Categoría {i}", " ") for i in range(1, CATEGORIAS + 1)))
+    _insert(conn, "SNOTIPOTRABAJADOR",
+            ((i, f"Tipo {i}", "") for i in range(1, TIPOS_TRABAJADOR + 1)))
+    _insert(conn, "SMGAREASUBAREA",
+            ((f"A{i:03d}", f"Área {i}") for i in range(AREAS)))
+    _insert(conn, "SMGAREASUBAREA1",
+            ((f"A{i:03d}", f"Subárea {i}") for i in range(0, AREAS, 2)))
+    _insert(conn, "TEREPARTOS",
+            ((f"R{i:03d}", f"{i % 16:02d}", f"{i:03d}")
+             for i in range(REPARTOS)))
+    _insert(conn, "SCGCLASIFICADORDECUENTAS",
+            ((i, f"Cuenta {i}") for i in range(1, CUENTAS + 1)))
+    _insert(conn, "SCPCONRETPAGAR",
+            ((f"RT{i:02d}", f"Retención {i}", i % 3, i % CUENTAS + 1, i,
+              int(i % 7 == 0), i % 2, "")
+             for i in range(1, RETENCIONES + 1)))
+
+    _insert(conn, "SCPTRABAJADORES", (
+        (_trabajador_id(i), f"Nombre{i % 997}", f"Apellido{i % 389}",
+         f"Segundo{i % 211}", f"EXP{i:06d}", "MF"[i % 2],
+         i % CARGOS + 1, i % CATEGORIAS + 1, i % TIPOS_TRABAJADOR + 1,
+         f"A{i % AREAS:03d}", _fecha(i % 3650), None, i % 3,
+         f"{i:016d}", f"trabajador{i}@empresa.cu", "1",
+         "" if i % 50 else "S")
+        for i in range(trabajadores)))
+    _insert(conn, "SRHPersonas",
+            ((_trabajador_id(i),) for i in range(trabajadores)))
+    _insert(conn, "SRHPersonasDireccion", (
+        (_trabajador_id(i), f"Calle {i % 500} No. {i % 90}",
+         f"Calle {i % 500} No. {i % 90}", f"R{i % REPARTOS:03d}")
+        for i in range(trabajadores)))
+
+    _insert(conn, "SCPMAESTRORETENCION", (
+        (i, _trabajador_id(i * 3), f"RT{i % RETENCIONES + 1:02d}",
+         1000 + i % 500, 100 + i % 50, i % 10, 1, i % 2 + 1, _fecha(i % 365))
+        for i in range(trabajadores // 3)))
+    _insert(conn, "SNOMANTPENS", (
+        (i, f"Pensionado{i}", f"Apellido{i % 389}", f"Segundo{i % 211}",
+         f"Calle {i % 500}", "")
+        for i in range(max(trabajadores * PENSIONADOS_POR_MIL // 1000, 1))))
+    _insert(conn, "SNONOMENCLADORTASASDESTAJO",
+            ((i, f"Tarea {i}", 1.5 + i % 40, "N" if i % 2 else "")
+             for i in range(TASAS_DESTAJO)))
+    _insert(conn, "SNONOMENCLADORCOLECTIVOS",
+            ((i, f"Colectivo {i}", "") for i in range(COLECTIVOS)))
+    _insert(conn, "SMGNOMENCLADORUNIDADMEDIDA",
+            ((i, f"Unidad {i}", int(i % 10 != 0))
+             for i in range(UNIDADES_MEDIDA)))
+
+    _insert(conn, "SNOSMVACACIONES", (
+        (i + 1, _trabajador_id(i), 500 + i % 300, 5 + i % 25, "")
+        for i in range(trabajadores)))
+    _insert(conn, "SNOSMREINTEGRONR", (
+        (i + 1, _trabajador_id(i // 2), 100 + i % 900, _fecha(i % 3650),
+         0, None if i % 4 else 1)
+        for i in range(trabajadores * 2)))
+
+    primer_mes = anio * 12 + 11 - (meses - 1)
+    _insert(conn, "SNOMODSC408CORTE", (
+        (t * meses + m + 1, _trabajador_id(t),
+         (primer_mes + m) // 12, (primer_mes + m) % 12 + 1,
+         22, 4500 + t % 1000, 2.5, 420.75, m % 3, m % 3 * 95.5)
+        for t in range(trabajadores) for m in range(meses)))
+    conn.commit()
+
+
+def create_database(path: str, trabajadores: int = 1000, meses: int = 24):
+    conn = sqlite3.connect(path)
+    try:
+        create_schema(conn)
+        seed(conn, trabajadores, meses)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Crea una base SQLite de SISCONT con datos sintéticos")
+    parser.add_argument("path")
+    parser.add_argument("--trabajadores", type=int, default=1000)
+    parser.add_argument("--meses", type=int, default=24)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} ya existe")
+    create_database(args.path, args.trabajadores, args.meses)
+    print(f"{args.path}: {args.trabajadores} trabajadores, "
+          f"{args.trabajadores * args.meses} registros SC408")
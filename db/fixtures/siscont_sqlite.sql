@@ -0,0 +1,163 @@
+-- db/fixtures/siscont_sqlite.sql
+-- Tablas de SISCONT que leen los extractores de db/db_nomina.py y
+-- db/db_general.py, solo con las columnas que usan. Las fechas se guardan
+-- como texto ISO 8601 y los "desactivado" con '' como en SQL Server.
+
+CREATE TABLE SNOCARGOS (
+    CargId INTEGER PRIMARY KEY,
+    CargDescripcion TEXT,
+    CargDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SNOCATEGOCUP (
+    CategId INTEGER PRIMARY KEY,
+    CategODescripcion TEXT,
+    CategDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SNOTIPOTRABAJADOR (
+    TipTrabId INTEGER PRIMARY KEY,
+    TipTrabDescripcion TEXT,
+    TipTrabDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SMGAREASUBAREA (
+    AreaCodigo TEXT PRIMARY KEY,
+    AreaDescrip TEXT
+);
+
+CREATE TABLE SMGAREASUBAREA1 (
+    AreaCodigo TEXT REFERENCES SMGAREASUBAREA (AreaCodigo),
+    sareaDescrip TEXT
+);
+
+CREATE TABLE TEREPARTOS (
+    TRepartosCodigo TEXT PRIMARY KEY,
+    ProvCod TEXT,
+    MunicCod TEXT
+);
+
+CREATE TABLE SCPTRABAJADORES (
+    CPTrabConsecutivoID TEXT PRIMARY KEY,
+    CPTrabNombre TEXT,
+    CPTrabPriApellido TEXT,
+    CPTrabSegApellido TEXT,
+    CPTrabExp TEXT,
+    TrabSexo TEXT,
+    CargId INTEGER REFERENCES SNOCARGOS (CargId),
+    CategId INTEGER REFERENCES SNOCATEGOCUP (CategId),
+    TipTrabId INTEGER REFERENCES SNOTIPOTRABAJADOR (TipTrabId),
+    AreaCodigo TEXT REFERENCES SMGAREASUBAREA (AreaCodigo),
+    TrabFechaAlta TEXT,
+    TrabFechaBaja TEXT,
+    TrabFormaCobro INTEGER,
+    TrabTmagnMN TEXT,
+    TrabCorreo TEXT,
+    TrabCPVacaciones TEXT,
+    TrabDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SRHPersonas (
+    SRHPersonasId TEXT PRIMARY KEY
+        REFERENCES SCPTRABAJADORES (CPTrabConsecutivoID)
+);
+
+CREATE TABLE SRHPersonasDireccion (
+    SRHPersonasId TEXT REFERENCES SRHPersonas (SRHPersonasId),
+    SRHPersDireccionDir TEXT,
+    SRHPersDireccionOficial TEXT,
+    TRepartosCodigo TEXT REFERENCES TEREPARTOS (TRepartosCodigo)
+);
+
+CREATE TABLE SCGCLASIFICADORDECUENTAS (
+    ClcuIDCuenta INTEGER PRIMARY KEY,
+    ClcuDescripcion TEXT
+);
+
+CREATE TABLE SCPCONRETPAGAR (
+    CPCRetPCodigo TEXT PRIMARY KEY,
+    CPCRetDescripcion TEXT,
+    CRetDeudaCon INTEGER,
+    ClcuIDCuenta INTEGER REFERENCES SCGCLASIFICADORDECUENTAS (ClcuIDCuenta),
+    CRetPPrioridad INTEGER,
+    CRetPPenAlimenticia INTEGER,
+    CRetPConPlazos INTEGER,
+    CRetPDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SCPMAESTRORETENCION (
+    RetId INTEGER PRIMARY KEY,
+    CPTrabConsecutivoID TEXT REFERENCES SCPTRABAJADORES (CPTrabConsecutivoID),
+    CPCRetPCodigo TEXT REFERENCES SCPCONRETPAGAR (CPCRetPCodigo),
+    RetDeuda NUMERIC,
+    RetPlazo NUMERIC,
+    RetCantPlazo INTEGER,
+    PeriCodigo INTEGER,
+    CorteCodigo INTEGER,
+    RetFechaAlta TEXT
+);
+
+CREATE TABLE SNOMANTPENS (
+    MantPensId INTEGER PRIMARY KEY,
+    MantPensNombre TEXT,
+    MantPensPriApe TEXT,
+    MantPensSegApe TEXT,
+    MantPensDir TEXT,
+    MantPensDesactivada TEXT DEFAULT ''
+);
+
+CREATE TABLE SNONOMENCLADORTASASDESTAJO (
+    TasaDId INTEGER PRIMARY KEY,
+    TasaDDescripcion TEXT,
+    TasaDTasa NUMERIC,
+    TasaDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SNONOMENCLADORCOLECTIVOS (
+    ColecId INTEGER PRIMARY KEY,
+    ColecDescripcion TEXT,
+    ColecDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SMGNOMENCLADORUNIDADMEDIDA (
+    UMedId INTEGER PRIMARY KEY,
+    UMedDescrip TEXT,
+    UMedactiva INTEGER
+);
+
+CREATE TABLE SNOSMVACACIONES (
+    SMVacId INTEGER PRIMARY KEY,
+    CPTrabConsecutivoID TEXT REFERENCES SCPTRABAJADORES (CPTrabConsecutivoID),
+    SMVacSaldoInicialI NUMERIC,
+    SMVacSaldoInicialD NUMERIC,
+    SMVacDesactivado TEXT DEFAULT ''
+);
+
+CREATE TABLE SNOSMREINTEGRONR (
+    SMrnrIdentificador INTEGER PRIMARY KEY,
+    CPTrabConsecutivoID TEXT REFERENCES SCPTRABAJADORES (CPTrabConsecutivoID),
+    SMrnrImporte NUMERIC,
+    SMrnrFecha TEXT,
+    SMrnrDebito INTEGER,
+    SMrnrIdenPaga INTEGER
+);
+
+CREATE TABLE SNOMODSC408CORTE (
+    sccorteId INTEGER PRIMARY KEY,
+    CPTrabConsecutivoID TEXT REFERENCES SCPTRABAJADORES (CPTrabConsecutivoID),
+    sccorteanoCalendario INTEGER,
+    sccorteMesCalendario INTEGER,
+    sccorteSalarioTiempoDias NUMERIC,
+    sccorteSalarioTiempoImporte NUMERIC,
+    sccorteVacacionesDias NUMERIC,
+    sccorteVacacionesImporte NUMERIC,
+    sccorteSubsidioDias NUMERIC,
+    sccorteSubsidioImporte NUMERIC
+);
+
+CREATE INDEX IX_SNOMODSC408CORTE_TRAB
+    ON SNOMODSC408CORTE (CPTrabConsecutivoID);
+CREATE INDEX IX_SNOSMVACACIONES_TRAB
+    ON SNOSMVACACIONES (CPTrabConsecutivoID);
+CREATE INDEX IX_SNOSMREINTEGRONR_TRAB
+    ON SNOSMREINTEGRONR (CPTrabConsecutivoID);
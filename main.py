@@ -4,7 +4,12 @@ from fastapi import FastAPI
 from nicegui import app, ui
 
 import config
-from api import api_db, api_nomina, api_general
+from api import api_db, api_general, api_jobs, api_nomina
+from api.api_utils import AppJSONResponse
+from db.db_connection import close_all_pools
+from db.db_executor import db_executor
+from services.http_client import cerrar_http_client, iniciar_http_client
+from services.jobs import detener_jobs, iniciar_jobs
 # from middleware.auth_middleware import AuthMiddleware
 from ui.pages import login, main_page
 
@@ -14,7 +19,8 @@ from ui.pages import login, main_page
 from state.store import store
 
 # Configuración FastAPI
-fastapi_app = FastAPI(title=config.APP_TITLE)
+fastapi_app = FastAPI(title=config.APP_TITLE,
+                      default_response_class=AppJSONResponse)
 
 # Montar APIs antes de la integracion de NiceGUI con FastAPI
 # porque sino no reconoce swagguer para los endpoints
@@ -22,6 +28,19 @@ fastapi_app = FastAPI(title=config.APP_TITLE)
 fastapi_app.include_router(api_db.router, prefix="/api")
 fastapi_app.include_router(api_nomina.router, prefix="/api/nomina")
 fastapi_app.include_router(api_general.router, prefix="/api/general")
+fastapi_app.include_router(api_jobs.router, prefix="/api/jobs")
+
+# Cliente HTTP compartido durante la vida de la aplicacion
+fastapi_app.add_event_handler("startup", iniciar_http_client)
+fastapi_app.add_event_handler("shutdown", cerrar_http_client)
+
+# Workers de la cola de exportaciones en segundo plano
+fastapi_app.add_event_handler("startup", iniciar_jobs)
+fastapi_app.add_event_handler("shutdown", detener_jobs)
+
+# Cerrar las conexiones del pool al apagar la aplicacion
+fastapi_app.add_event_handler("shutdown", close_all_pools)
+fastapi_app.add_event_handler("shutdown", db_executor.shutdown)
 
 # ⛔ Agregar middleware de autenticación
 # fastapi_app.add_middleware(AuthMiddleware)
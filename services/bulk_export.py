@@ -0,0 +1,65 @@
+# services/bulk_export.py
+# exportacion concurrente de varias tablas de un modulo, con un limite de
+# exportaciones simultaneas por servidor SQL Server
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config import BULK_EXPORT_CONCURRENCY_PER_HOST
+
+# Un semáforo por host: varias exportaciones masivas (de distintos módulos o
+# usuarios) contra el mismo servidor comparten el mismo límite
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _semaforo_host(host: str) -> asyncio.Semaphore:
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(
+            BULK_EXPORT_CONCURRENCY_PER_HOST)
+    return _host_semaphores[host]
+
+
+async def exportar_tablas(
+        tablas: Iterable[str],
+        exportar: Callable[[str], Awaitable[Any]],
+        host: str,
+        on_progress: Optional[Callable[[Dict[str, Any], int, int], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Exporta todas las tablas concurrentemente y devuelve un informe por tabla
+    (en el orden recibido) con ``ok``, ``registros``, ``archivo``, ``error``
+    y ``segundos``. Un fallo en una tabla no detiene las demás.
+
+    :param tablas: Nombres lógicos de las tablas (claves de TABLAS_*)
+    :param exportar: Corrutina que exporta una tabla y devuelve su resumen
+    :param host: Servidor SQL Server, para el límite de concurrencia
+    :param on_progress: Se llama con (informe, terminadas, total) al acabar
+        cada tabla
+    """
+    tablas = list(tablas)
+    semaforo = _semaforo_host(host)
+    terminadas = 0
+
+    async def _exportar_una(nombre: str) -> Dict[str, Any]:
+        nonlocal terminadas
+        informe = {"tabla": nombre, "ok": False, "registros": 0,
+                   "archivo": None, "error": None, "segundos": 0.0}
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                resumen = await exportar(nombre)
+                informe["ok"] = True
+                if isinstance(resumen, dict):
+                    informe["registros"] = resumen.get("total_registros", 0)
+                    informe["archivo"] = resumen.get("archivo")
+            except Exception as e:
+                informe["error"] = str(e)
+            informe["segundos"] = round(time.perf_counter() - inicio, 2)
+
+        terminadas += 1
+        if on_progress:
+            on_progress(informe, terminadas, len(tablas))
+        return informe
+
+    return list(await asyncio.gather(*(_exportar_una(t) for t in tablas)))
@@ -0,0 +1,54 @@
+# services/http_client.py
+# cliente httpx compartido por todos los clientes de modulos durante la vida
+# de la aplicacion (se abre en el startup y se cierra en el shutdown)
+
+from typing import Optional
+
+import httpx
+
+from config import (HTTP_CONNECT_TIMEOUT, HTTP_DEFAULT_TIMEOUT,
+                    HTTP_ENDPOINT_TIMEOUTS, HTTP_KEEPALIVE_EXPIRY,
+                    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _crear_cliente() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_DEFAULT_TIMEOUT,
+                              connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+async def iniciar_http_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _crear_cliente()
+
+
+async def cerrar_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Devuelve el cliente compartido; si se usa fuera del ciclo de vida de la
+# app (scripts, pruebas) lo crea en el momento
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _crear_cliente()
+    return _client
+
+
+# Timeout de lectura para un endpoint concreto
+def timeout_para(endpoint: str) -> httpx.Timeout:
+    return httpx.Timeout(
+        HTTP_ENDPOINT_TIMEOUTS.get(endpoint, HTTP_DEFAULT_TIMEOUT),
+        connect=HTTP_CONNECT_TIMEOUT)
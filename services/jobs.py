@@ -0,0 +1,350 @@
+# services/jobs.py
+# cola de exportaciones en segundo plano: cada trabajo exporta uno o varios
+# extractores de un modulo fuera de la peticion HTTP que lo crea, con un
+# numero acotado de trabajos a la vez. Los metadatos (sin la contraseña) se
+# guardan en get_output_dir()/_jobs para consultarlos tras un reinicio.
+# Todo el acceso a disco de la cola va por un hilo propio, en orden, para no
+# bloquear el event loop ni ocupar los hilos del executor de base de datos.
+
+import asyncio
+import datetime
+import logging
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from config import JOBS_MAX_HISTORY, JOBS_MAX_WORKERS, get_output_dir
+from db.db_executor import ejecutar_extractor
+from db.db_general import EXTRACTORES_GENERAL
+from db.db_manager import ConexionParams
+from db.db_nomina import EXTRACTORES_NOMINA
+from utils.compression import codec_for_path, unique_tmp_path
+from utils.json_encoder import file_encoder, loads
+from utils.jsons_utils import MANIFEST_NAME, resolve_formato
+from utils.timings import ExportTimings
+from utils.watermarks import file_signature
+
+JOBS_DIR = "_jobs"
+
+EXTRACTORES_POR_MODULO: Dict[str, Dict[str, Callable]] = {
+    "nomina": EXTRACTORES_NOMINA,
+    "general": EXTRACTORES_GENERAL,
+}
+
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+ERROR = "error"
+INTERRUMPIDO = "interrumpido"
+TERMINADOS = (COMPLETADO, ERROR, INTERRUMPIDO)
+
+
+def _ahora() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _jobs_dir() -> str:
+    path = os.path.join(get_output_dir(), JOBS_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ArchivosModificados(Exception):
+    """Los archivos de un trabajo ya no son los que escribió al terminar."""
+
+
+def _archivos_tarea(path: str) -> List[str]:
+    # Las tablas exportadas por partes aportan su manifest y sus partes
+    files = [path]
+    if os.path.basename(path) == MANIFEST_NAME:
+        with open(path, "rb") as f:
+            partes = loads(f.read())["partes"]
+        directory = os.path.dirname(path)
+        files.extend(os.path.join(directory, parte["archivo"])
+                     for parte in partes)
+    return files
+
+
+def _firmas_tarea(path: str) -> Dict[str, Any]:
+    return {file_path: file_signature(file_path)
+            for file_path in _archivos_tarea(path)}
+
+
+class JobManager:
+    """
+    Trabajos de exportación en memoria más su copia en disco. Los trabajos
+    esperan en una asyncio.Queue que atienden ``max_workers`` tareas; dentro
+    de cada trabajo los extractores se ejecutan uno tras otro en el executor
+    de base de datos con ``collect=False`` (las filas no se acumulan).
+
+    Al terminar cada tarea se guarda la firma (tamaño y mtime) de sus
+    archivos; la descarga se niega si ya no coinciden, p. ej. porque otra
+    exportación del mismo extractor los sobrescribió.
+    """
+
+    def __init__(self, max_workers: int, max_history: int):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._params: Dict[str, ConexionParams] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._io: Optional[ThreadPoolExecutor] = None
+
+    async def _en_disco(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, func, *args)
+
+    async def start(self):
+        # Un solo hilo: las escrituras de un mismo trabajo no se adelantan
+        self._io = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix="jobs-io")
+        await self._en_disco(self._load_persisted)
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i))
+                         for i in range(self.max_workers)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._io.shutdown(wait=True)
+
+    async def submit(self, params: ConexionParams, modulo: str,
+                     endpoints: List[str],
+                     formato: Optional[str] = None) -> Dict[str, Any]:
+        if self._queue is None:
+            raise RuntimeError("La cola de trabajos no está iniciada")
+        extractores = EXTRACTORES_POR_MODULO.get(modulo)
+        if extractores is None:
+            raise ValueError(f"Módulo desconocido: {modulo}")
+        desconocidos = [e for e in endpoints if e not in extractores]
+        if desconocidos or not endpoints:
+            raise ValueError(f"Extractores desconocidos en {modulo}: "
+                             f"{', '.join(desconocidos) or '(ninguno)'}")
+        formato = resolve_formato(formato)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "estado": PENDIENTE,
+            "modulo": modulo,
+            "formato": formato,
+            "host": params.host,
+            "database": params.database,
+            "creado": _ahora(),
+            "iniciado": None,
+            "terminado": None,
+            "segundos": None,
+            "filas": 0,
+            "total_estimado": None,
+            "error": None,
+            "tareas": [
+                {"endpoint": endpoint, "estado": PENDIENTE, "filas": 0,
+                 "total_estimado": None, "archivo": None, "firmas": None,
+                 "segundos": None, "fases": None, "error": None}
+                for endpoint in endpoints
+            ],
+        }
+        self._jobs[job_id] = job
+        self._params[job_id] = params
+        await self._persist(job)
+        self._prune()
+        self._queue.put_nowait(job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return sorted(self._jobs.values(), key=lambda j: j["creado"],
+                      reverse=True)
+
+    async def files(self, job_id: str) -> List[str]:
+        """
+        Archivos del trabajo. Lanza ArchivosModificados si alguno ya no
+        existe o no coincide con la firma guardada al terminar su tarea.
+        """
+        return await self._en_disco(self._files, self._jobs[job_id])
+
+    def _files(self, job: Dict[str, Any]) -> List[str]:
+        files = []
+        cambiados = []
+        for tarea in job["tareas"]:
+            path = tarea["archivo"]
+            firmas = tarea.get("firmas")
+            if not path:
+                continue
+            if firmas is None:
+                # Trabajos guardados antes de registrar las firmas
+                if os.path.exists(path):
+                    files.extend(_archivos_tarea(path))
+                continue
+            for file_path, firma in firmas.items():
+                if file_signature(file_path) != firma:
+                    cambiados.append(os.path.basename(file_path))
+            files.extend(firmas)
+        if cambiados:
+            raise ArchivosModificados(
+                "Los archivos del trabajo cambiaron o ya no existen: "
+                f"{', '.join(cambiados)}")
+        return files
+
+    async def archive(self, job_id: str) -> str:
+        """Ruta de un .zip con todos los archivos del trabajo."""
+        zip_path = os.path.join(_jobs_dir(), f"{job_id}.zip")
+        files = await self.files(job_id)
+
+        def _build():
+            if os.path.exists(zip_path):
+                return
+            tmp_path = unique_tmp_path(zip_path)
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                for file_path in files:
+                    # Los .gz/.zst ya van comprimidos: se guardan sin deflate
+                    compress_type = (zipfile.ZIP_STORED
+                                     if codec_for_path(file_path).extension
+                                     else zipfile.ZIP_DEFLATED)
+                    zf.write(file_path,
+                             os.path.relpath(file_path, get_output_dir()),
+                             compress_type=compress_type)
+            os.replace(tmp_path, zip_path)
+
+        await self._en_disco(_build)
+        return zip_path
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:  # no debe tumbar el worker
+                logging.error(f"Trabajo {job_id} falló: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self._jobs[job_id]
+        params = self._params.pop(job_id)
+        extractores = EXTRACTORES_POR_MODULO[job["modulo"]]
+        job["estado"] = EJECUTANDO
+        job["iniciado"] = _ahora()
+        await self._persist(job)
+        inicio = time.perf_counter()
+
+        for tarea in job["tareas"]:
+            await self._run_task(job, tarea, params,
+                                 extractores[tarea["endpoint"]])
+            await self._persist(job)
+
+        fallidas = [t["endpoint"] for t in job["tareas"]
+                    if t["estado"] == ERROR]
+        job["estado"] = ERROR if fallidas else COMPLETADO
+        job["error"] = (f"Fallaron: {', '.join(fallidas)}"
+                        if fallidas else None)
+        job["terminado"] = _ahora()
+        job["segundos"] = round(time.perf_counter() - inicio, 2)
+        await self._persist(job)
+
+    async def _run_task(self, job: Dict[str, Any], tarea: Dict[str, Any],
+                        params: ConexionParams, extractor: Callable):
+        filas_previas = job["filas"]
+        loop = asyncio.get_running_loop()
+
+        def aplicar_progreso(hechas: int, total: Optional[int]):
+            tarea["filas"] = hechas
+            tarea["total_estimado"] = total
+            job["filas"] = filas_previas + hechas
+            job["total_estimado"] = sum(
+                t["total_estimado"] or t["filas"] for t in job["tareas"])
+
+        # Se llama desde el hilo del executor tras cada lote: el trabajo solo
+        # se modifica en el loop, así _persist nunca lo ve a medias
+        def on_progress(hechas: int, total: Optional[int]):
+            loop.call_soon_threadsafe(aplicar_progreso, hechas, total)
+
+        tarea["estado"] = EJECUTANDO
+        timings = ExportTimings()
+        inicio = time.perf_counter()
+        try:
+            resumen = await ejecutar_extractor(
+                params, extractor, collect=False, on_progress=on_progress,
+                timings=timings, formato=job.get("formato"))
+            tarea["estado"] = COMPLETADO
+            if isinstance(resumen, dict):
+                tarea["filas"] = resumen.get("total_registros", 0)
+                tarea["archivo"] = resumen.get("archivo")
+            if tarea["archivo"]:
+                tarea["firmas"] = await self._en_disco(_firmas_tarea,
+                                                       tarea["archivo"])
+        except Exception as e:
+            tarea["estado"] = ERROR
+            tarea["error"] = str(e)
+        tarea["segundos"] = round(time.perf_counter() - inicio, 2)
+        tarea["fases"] = timings.as_dict()
+        job["filas"] = filas_previas + tarea["filas"]
+
+    async def _persist(self, job: Dict[str, Any]):
+        # Se serializa en el loop: todos los cambios del trabajo (también
+        # el progreso, ver _run_task) se hacen en él
+        await self._en_disco(self._write, job["id"], file_encoder.dumps(job))
+
+    @staticmethod
+    def _write(job_id: str, data: bytes):
+        path = os.path.join(_jobs_dir(), f"{job_id}.json")
+        tmp_path = unique_tmp_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_persisted(self):
+        # Los trabajos a medio hacer cuando se paró la aplicación no se
+        # pueden reanudar (no se guarda la contraseña): quedan interrumpidos
+        directory = _jobs_dir()
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), "rb") as f:
+                    job = loads(f.read())
+            except Exception as e:
+                logging.warning(f"No se pudo leer el trabajo {name}: {e}")
+                continue
+            if job["estado"] not in TERMINADOS:
+                job["estado"] = INTERRUMPIDO
+                job["terminado"] = job["terminado"] or _ahora()
+                self._write(job["id"], file_encoder.dumps(job))
+            self._jobs[job["id"]] = job
+        self._prune()
+
+    def _prune(self):
+        terminados = sorted((j for j in self._jobs.values()
+                             if j["estado"] in TERMINADOS),
+                            key=lambda j: j["creado"])
+        exceso = len(self._jobs) - self.max_history
+        for job in terminados[:max(exceso, 0)]:
+            del self._jobs[job["id"]]
+            # En el hilo de disco, detrás de la última escritura del trabajo
+            self._io.submit(self._remove, job["id"])
+
+    @staticmethod
+    def _remove(job_id: str):
+        for ext in (".json", ".zip"):
+            path = os.path.join(_jobs_dir(), f"{job_id}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+
+
+job_manager = JobManager(JOBS_MAX_WORKERS, JOBS_MAX_HISTORY)
+
+
+async def iniciar_jobs():
+    await job_manager.start()
+
+
+async def detener_jobs():
+    await job_manager.stop()
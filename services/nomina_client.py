@@ -1,9 +1,9 @@
-from typing import Any
+from typing import Any, Dict
 
-import httpx
-
-from config import get_module_api_url
-from db.db_manager import ConexionParams
+from db.db_manager import ConexionParams, PaginaParams
+from db.db_nomina import EXTRACTORES_NOMINA
+from services.transport import (invalidar_resultados, llamar_extractor,
+                                llamar_pagina)
 from state.store import \
     store  # Importas la instancia ya inicializada y compartida
 
@@ -40,17 +40,30 @@ def get_current_conexion_params() -> ConexionParams:
 
 ## Este helper consulta una tabla segun el endpoint para obtener sus datos
 # haciendo uso del diccionario que tiene la relacion de las tablas
+# Con solo_archivo=True el servidor escribe el JSON sin devolver las filas,
+# solo un resumen (doctype, archivo, total_registros)
 async def obtener_datos_tabla(nombre_tabla: str,
-                              modulo: str | None = None) -> Any:
+                              modulo: str | None = None,
+                              solo_archivo: bool = False) -> Any:
     modulo = modulo or store.selected_module or 'nomina'
     endpoint = TABLAS_NOMINA[nombre_tabla]
-    base_url = get_module_api_url(modulo)
-    url = f"{base_url}/{endpoint}"
+    conexion_params = get_current_conexion_params()
+    return await llamar_extractor(modulo, endpoint, EXTRACTORES_NOMINA,
+                                  conexion_params, solo_archivo=solo_archivo)
+
 
+# Una página de la tabla para la vista "Visualizar datos": solo las filas
+# visibles, con el total para el paginador
+async def obtener_pagina_tabla(nombre_tabla: str, pagina: PaginaParams,
+                               modulo: str | None = None) -> Dict[str, Any]:
+    modulo = modulo or store.selected_module or 'nomina'
+    endpoint = TABLAS_NOMINA[nombre_tabla]
     conexion_params = get_current_conexion_params()
-    payload = conexion_params.model_dump()
+    return await llamar_pagina(modulo, endpoint, EXTRACTORES_NOMINA,
+                               conexion_params, pagina)
+
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+# Descarta los resultados en cache de la conexion actual para que la proxima
+# consulta vuelva a leer de la base de datos
+async def refrescar_datos() -> int:
+    return await invalidar_resultados(get_current_conexion_params())
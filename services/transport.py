@@ -0,0 +1,69 @@
+# services/transport.py
+# como llegan los clientes de los modulos a los extractores: en proceso
+# (por defecto) o por HTTP contra la API cuando esta en otro servidor
+
+from typing import Any, Callable, Dict
+
+from config import SERVICES_TRANSPORT, get_module_api_url, get_settings
+from db.db_cache import ejecutar_con_cache, invalidar_cache
+from db.db_executor import ejecutar_pagina
+from db.db_manager import ConexionParams, PaginaParams
+from services.http_client import get_http_client, timeout_para
+
+
+# Llama al extractor registrado para ``endpoint``. En modo "local" se ejecuta
+# en el executor de base de datos y devuelve objetos Python directamente, sin
+# ida y vuelta TCP ni codificar/decodificar JSON. En modo "http" hace el POST
+# a la ruta equivalente de la API.
+async def llamar_extractor(modulo: str, endpoint: str,
+                           extractores: Dict[str, Callable],
+                           conexion_params: ConexionParams,
+                           solo_archivo: bool = False) -> Any:
+    if SERVICES_TRANSPORT == "local":
+        return await ejecutar_con_cache(conexion_params,
+                                        extractores[endpoint],
+                                        solo_archivo=solo_archivo)
+
+    base_url = get_module_api_url(modulo)
+    url = f"{base_url}/{endpoint}"
+    payload = conexion_params.model_dump()
+
+    response = await get_http_client().post(
+        url, json=payload,
+        params={"solo_archivo": "true"} if solo_archivo else None,
+        timeout=timeout_para(endpoint))
+    response.raise_for_status()
+    return response.json()
+
+
+# Una página del extractor (filas visibles de la tabla de "Visualizar
+# datos" y total), ordenada y filtrada en el servidor
+async def llamar_pagina(modulo: str, endpoint: str,
+                        extractores: Dict[str, Callable],
+                        conexion_params: ConexionParams,
+                        pagina: PaginaParams) -> Dict[str, Any]:
+    if SERVICES_TRANSPORT == "local":
+        return await ejecutar_pagina(conexion_params, extractores[endpoint],
+                                     pagina)
+
+    base_url = get_module_api_url(modulo)
+    response = await get_http_client().post(
+        f"{base_url}/{endpoint}/pagina", json=conexion_params.model_dump(),
+        params=pagina.model_dump(exclude_none=True))
+    response.raise_for_status()
+    return response.json()
+
+
+# Vacia la cache de resultados de la conexion actual, en este proceso o en el
+# servidor de la API segun el transporte
+async def invalidar_resultados(conexion_params: ConexionParams) -> int:
+    if SERVICES_TRANSPORT == "local":
+        return invalidar_cache(conexion_params.host, conexion_params.database)
+
+    base_url = get_settings().API_BASE_URL.rstrip("/")
+    response = await get_http_client().post(
+        f"{base_url}/cache/invalidate",
+        params={"host": conexion_params.host,
+                "database": conexion_params.database})
+    response.raise_for_status()
+    return response.json()["invalidadas"]
@@ -0,0 +1,59 @@
+# tests/conftest.py
+# las pruebas corren sobre el backend "sqlite" con la base sintética de
+# db/fixtures. La configuración se lee al importar config.py, así que las
+# variables se fijan antes de importar nada de la aplicación.
+
+import asyncio
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="siscont_tests_")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_TMP, "siscont.sqlite")
+os.environ["SQLITE_SEED_TRABAJADORES"] = "200"
+os.environ["EXPORT_FORMAT"] = "json"
+os.environ["JSON_SHARD_ROWS"] = "0"
+os.environ["EXPORT_PARTITIONS"] = "1"
+
+import pytest  # noqa: E402
+
+from db.backends import SqliteBackend  # noqa: E402
+from db.db_connection import DatabaseManager, get_pool_stats  # noqa: E402
+from db.db_manager import ConexionParams  # noqa: E402
+from db.fixtures.seed import create_database  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    """Cada prueba escribe sus archivos en su propio directorio."""
+    path = tmp_path / "salida"
+    path.mkdir()
+    monkeypatch.setenv("JSON_OUTPUT_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def params():
+    return ConexionParams(host="pruebas", database="siscont", password="p")
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """
+    Base SQLite propia de la prueba (para las que insertan filas), abierta
+    con el DatabaseManager de la aplicación y sin pool.
+    """
+    path = str(tmp_path / "propia.sqlite")
+    create_database(path, trabajadores=50, meses=2)
+    db = DatabaseManager(host="pruebas", password="", database=path,
+                         port="", user="sa", backend=SqliteBackend(path, 0))
+    with db:
+        yield db
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def pool_in_use() -> int:
+    return sum(stats["in_use"] for stats in get_pool_stats().values())
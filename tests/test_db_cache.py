@@ -0,0 +1,66 @@
+# tests/test_db_cache.py
+import os
+
+import pytest
+
+from db.db_cache import clave_cache, ejecutar_con_cache, result_cache
+from db.db_manager import ConexionParams
+from db.db_nomina import get_departamentos
+from tests.conftest import run
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    result_cache.invalidate()
+    yield
+    result_cache.invalidate()
+
+
+def contar_llamadas(extractor):
+    llamadas = []
+
+    def contado(db, **kwargs):
+        llamadas.append(kwargs)
+        return extractor(db, **kwargs)
+
+    contado.__qualname__ = f"contado_{extractor.__name__}"
+    return contado, llamadas
+
+
+def test_clave_distingue_la_contrasena(params):
+    otra = ConexionParams(host=params.host, database=params.database,
+                          password="otra")
+    assert clave_cache(params, get_departamentos, (), {}) == \
+        clave_cache(params.model_copy(), get_departamentos, (), {})
+    assert clave_cache(params, get_departamentos, (), {}) != \
+        clave_cache(otra, get_departamentos, (), {})
+
+
+def test_la_contrasena_no_se_salta_con_la_cache(params):
+    extractor, llamadas = contar_llamadas(get_departamentos)
+    filas = run(ejecutar_con_cache(params, extractor))
+    assert run(ejecutar_con_cache(params, extractor)) == filas
+    assert len(llamadas) == 1
+
+    # Otra contraseña no recibe lo guardado: vuelve a conectar
+    otra = ConexionParams(host=params.host, database=params.database,
+                          password="incorrecta")
+    run(ejecutar_con_cache(otra, extractor))
+    assert len(llamadas) == 2
+
+
+def test_solo_archivo_comprueba_el_archivo(params):
+    extractor, llamadas = contar_llamadas(get_departamentos)
+    run(ejecutar_con_cache(params, extractor))
+
+    resumen = run(ejecutar_con_cache(params, extractor, solo_archivo=True))
+    assert resumen["desde_cache"] is True
+    assert len(llamadas) == 1
+
+    # Otra exportación reemplazó el archivo: se vuelve a consultar
+    with open(resumen["archivo"], "ab") as f:
+        f.write(b"\n")
+    resumen = run(ejecutar_con_cache(params, extractor, solo_archivo=True))
+    assert "desde_cache" not in resumen
+    assert len(llamadas) == 2
+    assert os.path.exists(resumen["archivo"])
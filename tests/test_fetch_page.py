@@ -0,0 +1,69 @@
+# tests/test_fetch_page.py
+import pytest
+
+from db.db_connection import create_db_manager
+from db.db_manager import PaginaParams
+from db.db_nomina import (get_departamentos,
+                          get_submayor_salarios_no_reclamados,
+                          get_submayor_vacaciones, get_trabajadores)
+from utils.jsons_utils import KEYSET_ALIAS
+
+
+@pytest.fixture
+def db(params):
+    with create_db_manager(params) as db:
+        yield db
+
+
+def todas_las_paginas(db, extractor, size=7, **orden):
+    filas, total, page = [], None, 1
+    while True:
+        pagina = extractor(db, pagina=PaginaParams(page=page, size=size,
+                                                   **orden))
+        total = pagina["total"]
+        if not pagina["rows"]:
+            return filas, total
+        filas.extend(pagina["rows"])
+        page += 1
+
+
+def clave(fila):
+    return tuple(sorted(fila.items()))
+
+
+# Vacaciones (sin keyset, con merge_key), reintegros (keyset), trabajadores
+# y departamentos (export_table_to_json, sin clave: todas las columnas)
+@pytest.mark.parametrize("extractor,sort", [
+    (get_submayor_vacaciones, None),
+    (get_submayor_vacaciones, "initial_balance_in_days"),
+    (get_submayor_salarios_no_reclamados, None),
+    (get_submayor_salarios_no_reclamados, "reimbursement_date"),
+    (get_trabajadores, "gender"),
+    (get_departamentos, None),
+])
+@pytest.mark.parametrize("descending", [False, True])
+def test_cada_fila_sale_una_vez(db, extractor, sort, descending):
+    filas, total = todas_las_paginas(db, extractor, sort=sort,
+                                     descending=descending)
+    assert len(filas) == total
+    assert len({clave(f) for f in filas}) == total
+
+
+def test_orden_estable_entre_peticiones(db):
+    pagina = PaginaParams(page=3, size=5, sort="amount")
+    primera = get_submayor_salarios_no_reclamados(db, pagina=pagina)
+    segunda = get_submayor_salarios_no_reclamados(db, pagina=pagina)
+    assert primera["rows"] == segunda["rows"]
+
+
+def test_clave_keyset_no_sale_en_las_filas(db):
+    pagina = get_submayor_salarios_no_reclamados(
+        db, pagina=PaginaParams(size=3))
+    assert pagina["rows"]
+    assert all(KEYSET_ALIAS not in fila for fila in pagina["rows"])
+    assert pagina["columnas"] == list(pagina["rows"][0])
+
+
+def test_orden_por_columna_desconocida(db):
+    with pytest.raises(ValueError):
+        get_submayor_vacaciones(db, pagina=PaginaParams(sort="x; DROP"))
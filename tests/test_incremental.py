@@ -0,0 +1,92 @@
+# tests/test_incremental.py
+import pytest
+
+from db.db_nomina import (get_submayor_salarios_no_reclamados,
+                          get_submayor_vacaciones)
+from utils.jsons_utils import load_exported_rows
+
+
+def incremental(db, extractor):
+    return extractor(db, incremental=True, collect=False, formato="json")
+
+
+def insertar(db, query, *params):
+    conn = db.connect()
+    conn.execute(query, params)
+    conn.commit()
+
+
+def test_anade_solo_las_filas_nuevas(fresh_db):
+    primera = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert primera["incremental"] is False
+    total = primera["total_registros"]
+    assert total == len(load_exported_rows(primera["archivo"]))
+
+    insertar(fresh_db, "INSERT INTO SNOSMREINTEGRONR "
+                       "VALUES (1000, '00000001', 77, '2024-01-01', 0, NULL)")
+    segunda = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert segunda["incremental"] is True
+    assert segunda["nuevos_registros"] == 1
+    assert segunda["total_registros"] == total + 1
+
+    filas = load_exported_rows(segunda["archivo"])
+    assert len(filas) == total + 1
+    assert filas[-1]["amount"] == 77
+
+    tercera = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert tercera["nuevos_registros"] == 0
+    assert tercera["total_registros"] == total + 1
+
+
+def test_reemplaza_por_merge_key(fresh_db):
+    primera = incremental(fresh_db, get_submayor_vacaciones)
+    total = primera["total_registros"]
+
+    # Un movimiento posterior de un trabajador ya exportado lo sustituye
+    insertar(fresh_db, "INSERT INTO SNOSMVACACIONES "
+                       "VALUES (1000, '00000005', 9999, 10, '')")
+    segunda = incremental(fresh_db, get_submayor_vacaciones)
+    assert segunda["nuevos_registros"] == 1
+    assert segunda["total_registros"] == total
+
+    filas = load_exported_rows(segunda["archivo"])
+    actualizadas = [f for f in filas if f["SMVacId"] == 1000]
+    assert len(filas) == total
+    assert len(actualizadas) == 1
+    assert actualizadas[0]["initial_balance_in_amount"] == 9999
+
+
+def test_archivo_reemplazado_vuelve_a_exportar_todo(fresh_db):
+    primera = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+
+    # Una exportación completa reescribe el archivo: la marca ya no vale
+    get_submayor_salarios_no_reclamados(fresh_db, collect=False)
+    segunda = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert segunda["incremental"] is False
+    assert segunda["nuevos_registros"] == primera["total_registros"]
+
+    # Lo mismo si el archivo se modificó a mano
+    with open(segunda["archivo"], "ab") as f:
+        f.write(b"\n")
+    tercera = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert tercera["incremental"] is False
+
+
+def test_incremental_en_json_con_otro_export_format(fresh_db, monkeypatch):
+    monkeypatch.setattr("utils.jsons_utils.EXPORT_FORMAT", "csv")
+    primera = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert primera["archivo"].endswith(".json")
+
+    insertar(fresh_db, "INSERT INTO SNOSMREINTEGRONR "
+                       "VALUES (1000, '00000001', 77, '2024-01-01', 0, NULL)")
+    segunda = incremental(fresh_db, get_submayor_salarios_no_reclamados)
+    assert segunda["incremental"] is True
+    assert segunda["archivo"].endswith(".json")
+    assert len(load_exported_rows(segunda["archivo"])) == \
+        primera["total_registros"] + 1
+
+
+def test_extractor_sin_marca_de_agua(fresh_db):
+    from db.db_nomina import get_corte_sc408
+    with pytest.raises(ValueError):
+        incremental(fresh_db, get_corte_sc408)
@@ -0,0 +1,124 @@
+# tests/test_jobs.py
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import api_jobs
+from services.jobs import (COMPLETADO, ERROR, INTERRUMPIDO, JOBS_DIR,
+                           ArchivosModificados, JobManager, detener_jobs,
+                           iniciar_jobs)
+from tests.conftest import run
+
+ENDPOINTS = ["departamentos", "colectivos"]
+
+
+async def ejecutar_trabajo(manager, params, endpoints=ENDPOINTS):
+    job = await manager.submit(params, "nomina", endpoints)
+    await manager._queue.join()
+    return job
+
+
+def test_trabajo_completo_y_persistido(params, output_dir):
+    async def probar():
+        manager = JobManager(max_workers=1, max_history=10)
+        await manager.start()
+        try:
+            job = await ejecutar_trabajo(manager, params)
+            return job, await manager.files(job["id"])
+        finally:
+            await manager.stop()
+
+    job, files = run(probar())
+    assert job["estado"] == COMPLETADO
+    assert len(files) == len(ENDPOINTS)
+    for tarea in job["tareas"]:
+        firma = tarea["firmas"][tarea["archivo"]]
+        assert firma["tamano"] == os.path.getsize(tarea["archivo"])
+
+    # Otro arranque lo recupera del disco, con las firmas
+    async def recargar():
+        manager = JobManager(max_workers=1, max_history=10)
+        await manager.start()
+        try:
+            return manager.get(job["id"])
+        finally:
+            await manager.stop()
+
+    recargado = run(recargar())
+    assert recargado["estado"] == COMPLETADO
+    assert recargado["tareas"] == job["tareas"]
+    assert os.listdir(output_dir / JOBS_DIR) == [f"{job['id']}.json"]
+
+
+def test_archivo_cambiado_no_se_entrega(params):
+    async def probar():
+        manager = JobManager(max_workers=1, max_history=10)
+        await manager.start()
+        try:
+            job = await ejecutar_trabajo(manager, params)
+            # Otra exportación del mismo extractor reescribe su archivo
+            with open(job["tareas"][0]["archivo"], "ab") as f:
+                f.write(b"\n")
+            with pytest.raises(ArchivosModificados):
+                await manager.files(job["id"])
+            with pytest.raises(ArchivosModificados):
+                await manager.archive(job["id"])
+        finally:
+            await manager.stop()
+
+    run(probar())
+
+
+def test_trabajo_a_medias_queda_interrumpido(params, output_dir):
+    from utils.json_encoder import file_encoder
+
+    os.makedirs(output_dir / JOBS_DIR)
+    with open(output_dir / JOBS_DIR / "abc.json", "wb") as f:
+        f.write(file_encoder.dumps({
+            "id": "abc", "estado": "ejecutando", "creado": "2026-01-01",
+            "terminado": None, "tareas": []}))
+
+    async def probar():
+        manager = JobManager(max_workers=1, max_history=10)
+        await manager.start()
+        await manager.stop()
+        return manager.get("abc")
+
+    assert run(probar())["estado"] == INTERRUMPIDO
+
+
+# Solo las rutas de trabajos: main.py además apaga el executor de base de
+# datos al cerrar, y lo necesitan las demás pruebas
+def app_jobs() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_jobs.router, prefix="/api/jobs")
+    app.add_event_handler("startup", iniciar_jobs)
+    app.add_event_handler("shutdown", detener_jobs)
+    return app
+
+
+def test_descarga_por_la_api(params):
+    with TestClient(app_jobs()) as client:
+        respuesta = client.post("/api/jobs", json={
+            "params": params.model_dump(), "modulo": "nomina",
+            "endpoints": ENDPOINTS})
+        assert respuesta.status_code == 202
+        job_id = respuesta.json()["job_id"]
+
+        for _ in range(100):
+            job = client.get(f"/api/jobs/{job_id}").json()
+            if job["estado"] in (COMPLETADO, ERROR):
+                break
+            time.sleep(0.05)
+        assert job["estado"] == COMPLETADO
+
+        descarga = client.get(f"/api/jobs/{job_id}/download")
+        assert descarga.status_code == 200
+        assert descarga.headers["content-type"] == "application/zip"
+
+        os.remove(job["tareas"][1]["archivo"])
+        descarga = client.get(f"/api/jobs/{job_id}/download")
+        assert descarga.status_code == 409
@@ -0,0 +1,79 @@
+# tests/test_ndjson.py
+import asyncio
+import threading
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from api.api_utils import respuesta_ndjson
+from db.db_nomina import get_trabajadores
+from tests.conftest import pool_in_use, run
+
+ASGI_SCOPE = {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+
+async def recibir():
+    return {"type": "http.disconnect"}
+
+
+def test_consumo_completo(params):
+    async def probar():
+        respuesta = await respuesta_ndjson(params, get_trabajadores)
+        cuerpo = []
+
+        async def enviar(mensaje):
+            cuerpo.append(mensaje.get("body", b""))
+
+        await respuesta(ASGI_SCOPE, recibir, enviar)
+        return b"".join(cuerpo)
+
+    lineas = run(probar()).splitlines()
+    assert lineas and all(linea.startswith(b"{") for linea in lineas)
+    assert pool_in_use() == 0
+
+
+def test_desconexion_antes_de_empezar(params):
+    async def probar():
+        respuesta = await respuesta_ndjson(params, get_trabajadores)
+        assert pool_in_use() == 1
+
+        async def enviar(mensaje):
+            raise OSError("el cliente se fue")
+
+        with pytest.raises(ClientDisconnect):
+            await respuesta(ASGI_SCOPE, recibir, enviar)
+        # Ya devuelta, no al cerrar el loop (shutdown_asyncgens)
+        assert pool_in_use() == 0
+
+    run(probar())
+
+
+def test_cancelar_con_una_lectura_en_curso(params):
+    empezada = threading.Event()
+    seguir = threading.Event()
+    cerrada = []
+
+    # Bloquea el hilo del executor dentro de next() hasta que se cancela
+    def extractor_lento(db, stream=False):
+        try:
+            empezada.set()
+            seguir.wait(5)
+            with db.cursor() as cursor:
+                cursor.execute("SELECT 1 AS uno")
+                yield [{"uno": cursor.fetchone()[0]}]
+        finally:
+            cerrada.append(True)
+
+    async def probar():
+        tarea = asyncio.create_task(
+            respuesta_ndjson(params, extractor_lento))
+        await asyncio.to_thread(empezada.wait, 5)
+        tarea.cancel()
+        await asyncio.sleep(0.05)
+        seguir.set()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+    run(probar())
+    assert cerrada == [True]
+    assert pool_in_use() == 0
@@ -0,0 +1,73 @@
+# tests/test_sinks.py
+import os
+
+import pytest
+
+from utils.sinks import CsvSink
+
+CAMPOS = [("id", "integer"), ("nombre", "string")]
+
+
+class CsvSinkRoto(CsvSink):
+    def _close(self):
+        super()._close()
+        raise OSError("disco lleno")
+
+
+def exportar(sink_class, path, filas):
+    with sink_class("Prueba", path, CAMPOS) as sink:
+        sink.write_rows(filas)
+    return sink
+
+
+def test_publica_al_cerrar_bien(output_dir):
+    path = str(output_dir / "t.csv")
+    sink = exportar(CsvSink, path, [{"id": 1, "nombre": "a"}])
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["id,nombre", "1,a"]
+    assert sink.bytes_written == os.path.getsize(path)
+    assert os.listdir(output_dir) == ["t.csv"]
+
+
+def test_fallo_al_cerrar_no_publica(output_dir):
+    path = str(output_dir / "t.csv")
+    exportar(CsvSink, path, [{"id": 1, "nombre": "a"}])
+    with open(path, "rb") as f:
+        anterior = f.read()
+
+    with pytest.raises(OSError):
+        exportar(CsvSinkRoto, path, [{"id": 2, "nombre": "b"}])
+    with open(path, "rb") as f:
+        assert f.read() == anterior
+    assert os.listdir(output_dir) == ["t.csv"]
+
+
+def test_fallo_en_el_flush_de_parquet_no_publica(output_dir):
+    pytest.importorskip("pyarrow")
+    from utils.sinks import ParquetSink
+
+    class ParquetSinkRoto(ParquetSink):
+        def flush(self):
+            if self._pending:
+                raise OSError("disco lleno")
+
+    path = str(output_dir / "t.parquet")
+    exportar(ParquetSink, path, [{"id": 1, "nombre": "a"}])
+    with open(path, "rb") as f:
+        anterior = f.read()
+
+    # Las filas quedan pendientes hasta el flush final del cierre
+    with pytest.raises(OSError):
+        exportar(ParquetSinkRoto, path, [{"id": 2, "nombre": "b"}])
+    with open(path, "rb") as f:
+        assert f.read() == anterior
+    assert os.listdir(output_dir) == ["t.parquet"]
+
+
+def test_error_al_escribir_descarta_el_temporal(output_dir):
+    path = str(output_dir / "t.csv")
+    with pytest.raises(RuntimeError):
+        with CsvSink("Prueba", path, CAMPOS) as sink:
+            sink.write_rows([{"id": 1, "nombre": "a"}])
+            raise RuntimeError("consulta cortada")
+    assert os.listdir(output_dir) == []
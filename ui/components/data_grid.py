@@ -0,0 +1,69 @@
+# ui/components/data_grid.py
+from nicegui import ui
+
+from config import GRID_MAX_PAGE_SIZE
+from db.db_manager import PaginaParams
+
+ROWS_PER_PAGE_OPTIONS = [10, 25, 50, 100]
+
+
+# Ventana modal con los datos de una tabla, paginada en el servidor: el
+# navegador solo recibe la página visible. Al cambiar de página, ordenar por
+# una columna o buscar, la tabla de Quasar emite "request" y se pide esa
+# página con obtener_pagina(nombre_logico, PaginaParams)
+async def mostrar_tabla_paginada(nombre_logico: str, obtener_pagina):
+    pagina = PaginaParams()
+    resultado = await obtener_pagina(nombre_logico, pagina)
+    ui.notify(f"{nombre_logico} consultado correctamente.")
+
+    if not resultado["total"]:
+        ui.notify("No se encontraron datos para mostrar.", type="info")
+        return
+
+    columns = [{"name": key, "label": key, "field": key, "align": "left",
+                "sortable": True}
+               for key in resultado["columnas"]]
+
+    # Determinar ancho según cantidad de columnas
+    card_classes = "w-full h-full max-h-screen "
+    if len(columns) > 8:
+        card_classes += "min-w-[90vw] max-w-none"
+    else:
+        card_classes += "max-w-screen-xl"
+
+    with ui.dialog() as dialog:
+        with ui.card().classes(card_classes):
+            ui.label(f"Datos de {nombre_logico}").classes("text-lg font-bold")
+            buscar = ui.input("Buscar").props("clearable dense debounce=400")
+
+            # rowsNumber hace que la tabla no ordene ni pagine por su cuenta
+            table = ui.table(
+                columns=columns,
+                rows=resultado["rows"],
+                pagination={"page": 1, "rowsPerPage": pagina.size,
+                            "sortBy": None, "descending": False,
+                            "rowsNumber": resultado["total"]},
+            ).classes("w-full h-full overflow-x-auto")
+            table.props(f":rows-per-page-options={ROWS_PER_PAGE_OPTIONS}")
+            buscar.bind_value_to(table, "filter")
+
+            async def cargar_pagina(e):
+                pedida = e.args["pagination"]
+                try:
+                    datos = await obtener_pagina(nombre_logico, PaginaParams(
+                        page=pedida["page"],
+                        size=pedida["rowsPerPage"] or GRID_MAX_PAGE_SIZE,
+                        sort=pedida.get("sortBy"),
+                        descending=pedida.get("descending", False),
+                        filtro=e.args.get("filter") or None))
+                except Exception as ex:
+                    ui.notify(f"Error al consultar {nombre_logico}: {ex}",
+                              type="negative")
+                    return
+                table.rows = datos["rows"]
+                table.pagination = {**pedida, "rowsNumber": datos["total"]}
+
+            table.on("request", cargar_pagina, ["pagination", "filter"])
+
+            ui.button("Cerrar", on_click=dialog.close)
+    dialog.open()
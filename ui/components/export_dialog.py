@@ -0,0 +1,62 @@
+# ui/components/export_dialog.py
+from nicegui import ui
+
+from services.bulk_export import exportar_tablas
+from state.store import store
+
+
+# Dialogo de "Exportar todas las tablas": lanza las exportaciones en paralelo
+# y muestra el avance y el resultado de cada tabla
+async def exportar_todas_tablas(tablas, obtener_datos_tabla):
+    tablas = list(tablas)
+
+    with ui.dialog().props("persistent") as dialog, ui.card().classes(
+            "min-w-[28rem]"):
+        titulo = ui.label("Exportando todas las tablas...").classes(
+            "text-lg font-semibold")
+        progreso = ui.linear_progress(value=0, show_value=False).classes(
+            "w-full")
+        contador = ui.label(f"0 de {len(tablas)} tablas").classes("text-sm")
+
+        estados = {}
+        with ui.column().classes("w-full gap-1"):
+            for nombre in tablas:
+                with ui.row().classes("w-full items-center justify-between"):
+                    ui.label(nombre).classes("text-sm")
+                    estados[nombre] = ui.label("⏳").classes("text-sm")
+
+        cerrar = ui.button("Cerrar", on_click=dialog.close)
+        cerrar.set_visibility(False)
+
+    dialog.open()
+
+    def on_progress(informe, terminadas, total):
+        if informe["ok"]:
+            estados[informe["tabla"]].text = (
+                f"✅ {informe['registros']} registros "
+                f"({informe['segundos']} s)")
+        else:
+            estados[informe["tabla"]].text = "❌ Error"
+            estados[informe["tabla"]].tooltip(informe["error"])
+        progreso.value = terminadas / total
+        contador.text = f"{terminadas} de {total} tablas"
+
+    informes = await exportar_tablas(
+        tablas,
+        lambda nombre: obtener_datos_tabla(nombre, solo_archivo=True),
+        host=store.db_params.host if store.db_params else "",
+        on_progress=on_progress,
+    )
+
+    fallidas = [informe for informe in informes if not informe["ok"]]
+    if fallidas:
+        titulo.text = (f"Exportación terminada con {len(fallidas)} "
+                       f"error(es)")
+        ui.notify(f"❌ {len(fallidas)} tabla(s) no se pudieron exportar",
+                  type="negative")
+    else:
+        titulo.text = "Exportación terminada"
+        ui.notify("✅ Todas las tablas fueron exportadas exitosamente",
+                  type="positive")
+    cerrar.set_visibility(True)
+    return informes
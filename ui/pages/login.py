@@ -49,9 +49,9 @@ def connection_form(request):
                     # dict
                     store.db_params = params # guardando como instancia de
                     # ConexionParams
-                    db_manager = create_db_manager(params)
-
-                    with db_manager.cursor() as cursor:
+                    # La conexión de prueba vuelve al pool al salir del with
+                    with create_db_manager(params) as db_manager, \
+                            db_manager.cursor() as cursor:
                         cursor.execute("SELECT 1")
                         if cursor.fetchone()[0] == 1:
                             store.connected = True
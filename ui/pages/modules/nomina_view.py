@@ -1,52 +1,19 @@
 # ui/pages/modules/nomina_view.py
-import asyncio
+import os
 
 from nicegui import ui
 
-from services.nomina_client import TABLAS_NOMINA, obtener_datos_tabla
+from services.nomina_client import (TABLAS_NOMINA, obtener_datos_tabla,
+                                    obtener_pagina_tabla, refrescar_datos)
+from ui.components.data_grid import mostrar_tabla_paginada
+from ui.components.export_dialog import exportar_todas_tablas
 
 
-# Muestra ventana modal con los datos de la tabla especificada
+# Muestra ventana modal con los datos de la tabla especificada, paginada en
+# el servidor (solo la página visible llega al navegador)
 async def mostrar_tabla(nombre_logico: str):
     try:
-        data = await obtener_datos_tabla(nombre_logico)
-        ui.notify(f"{nombre_logico} consultado correctamente.")
-
-        if not data:
-            ui.notify("No se encontraron datos para mostrar.", type="info")
-            return
-
-        columns = [{"name": key, "label": key, "field": key, "align": "left"}
-                   for key in data[0].keys()]
-
-        # Configuración de paginación dinámica
-        data_length = len(data)
-        pagination = {
-            "rows_per_page": min(10, data_length)
-        } if data_length > 10 else {"rows_per_page": data_length}
-
-        # Determinar ancho según cantidad de columnas
-        column_count = len(columns)
-        card_classes = "w-full h-full max-h-screen "
-        if column_count > 8:
-            card_classes += "min-w-[90vw] max-w-none"
-        else:
-            card_classes += "max-w-screen-xl"
-
-        with ui.dialog() as dialog:
-            with ui.card().classes(card_classes):
-                ui.label(f"Datos de {nombre_logico}").classes(
-                    "text-lg font-bold")
-
-                ui.table(
-                    columns=columns,
-                    rows=data,
-                    pagination=pagination
-                ).classes("w-full h-full overflow-x-auto")
-
-                ui.button("Cerrar", on_click=dialog.close)
-        dialog.open()
-
+        await mostrar_tabla_paginada(nombre_logico, obtener_pagina_tabla)
     except Exception as e:
         ui.notify(f"Error al consultar {nombre_logico}: {e}", type="negative")
         print(f"Error al consultar {nombre_logico}: {e}")
@@ -55,18 +22,22 @@ async def mostrar_tabla(nombre_logico: str):
 async def procesar_tabla_individual(nombre_logico: str):
     try:
         ui.notify(f"Preparando exportación de {nombre_logico}...")
-        data = await obtener_datos_tabla(nombre_logico)
+        resumen = await obtener_datos_tabla(nombre_logico, solo_archivo=True)
 
-        if not data:
+        if not resumen or not resumen.get("total_registros"):
             ui.notify(f"No hay datos para exportar en {nombre_logico}.",
                       type="warning")
             return
 
-        file_name = f"{nombre_logico.replace(' ', '_').lower()}.json"  #
+        file_name = os.path.basename(resumen["archivo"])
+        if resumen.get("partes"):
+            # Exportación por partes: el archivo es el manifest.json
+            carpeta = os.path.basename(os.path.dirname(resumen["archivo"]))
+            file_name = f"{carpeta}/ ({resumen['partes']} partes)"
 
         ui.notify(
-            f"Datos de {nombre_logico} exportados a '{file_name}' "
-            f"correctamente.",
+            f"{resumen['total_registros']} registros de {nombre_logico} "
+            f"exportados a '{file_name}' correctamente.",
             type="positive")
 
     except Exception as e:
@@ -75,26 +46,19 @@ async def procesar_tabla_individual(nombre_logico: str):
         print(f"Error al exportar {nombre_logico}: {e}")
 
 
-async def procesar_todas_tablas():
-    with ui.dialog() as dialog, ui.card():
-        ui.label("Exportando todas las tablas...").classes(
-            "text-lg font-semibold")
-        ui.spinner(size='lg', color='green')
-
-    dialog.open()
-
+# Limpia la cache para ver los cambios hechos en la base de datos antes de
+# que caduquen las entradas
+async def refrescar_cache():
     try:
-        for nombre_logico in TABLAS_NOMINA.keys():
-            await procesar_tabla_individual(
-                nombre_logico)  # suponiendo que exportar_json es async
-            await asyncio.sleep(0.1)  # pequeña pausa para permitir feedback UI
-
-        dialog.close()
-        ui.notify("✅ Todas las tablas fueron exportadas exitosamente",
-                  type="positive")
+        invalidadas = await refrescar_datos()
+        ui.notify(f"Caché limpiada ({invalidadas} consultas descartadas).",
+                  type="info")
     except Exception as e:
-        dialog.close()
-        ui.notify(f"❌ Error al exportar: {str(e)}", type="negative")
+        ui.notify(f"Error al limpiar la caché: {e}", type="negative")
+
+
+async def procesar_todas_tablas():
+    await exportar_todas_tablas(TABLAS_NOMINA.keys(), obtener_datos_tabla)
 
 
 def show():
@@ -110,6 +74,11 @@ def show():
         # ¡Aquí pasas TABLAS_NOMINA!
     ).props("color=blue size=md icon=cloud_download").classes("mt-4 mb-6")
 
+    ui.button(
+        "Refrescar datos",
+        on_click=lambda: refrescar_cache()
+    ).props("color=grey outline size=md icon=refresh").classes("mb-6")
+
     # Display table names and buttons
     with ui.column().classes("mt-6 gap-2 w-full"):  # Use w-full for full width
         for nombre_logico in TABLAS_NOMINA.keys():
@@ -0,0 +1,144 @@
+# utils/compression.py
+# compresion de los archivos exportados: gzip (stdlib) o zstd si esta
+# instalado el paquete zstandard. Se comprime mientras se escribe, lote a
+# lote, y los lectores eligen el descompresor por la extension del archivo.
+
+import gzip
+import logging
+import os
+import uuid
+from functools import lru_cache
+from typing import BinaryIO, Optional
+
+from config import JSON_COMPRESSION, JSON_COMPRESSION_LEVEL
+
+try:
+    import zstandard
+except ImportError:  # opcional: sin él solo se ofrece gzip
+    zstandard = None
+
+
+class Codec:
+    """
+    Formato de compresión de los archivos de salida. ``extension`` se añade
+    al nombre (``tabla.json.gz``) y ``content_encoding`` es el valor de la
+    cabecera HTTP con que se sirve el archivo sin descomprimirlo.
+    """
+
+    name = "none"
+    extension = ""
+    content_encoding: Optional[str] = None
+
+    def open_write(self, path: str) -> BinaryIO:
+        return open(path, "wb")
+
+    def open_read(self, path: str) -> BinaryIO:
+        return open(path, "rb")
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    extension = ".gz"
+    content_encoding = "gzip"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = 6 if level is None else level
+
+    def open_write(self, path: str) -> BinaryIO:
+        # mtime=0: el mismo contenido produce los mismos bytes
+        return gzip.GzipFile(path, "wb", compresslevel=self.level, mtime=0)
+
+    def open_read(self, path: str) -> BinaryIO:
+        return gzip.open(path, "rb")
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    extension = ".zst"
+    content_encoding = "zstd"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = 3 if level is None else level
+
+    def open_write(self, path: str) -> BinaryIO:
+        compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor.stream_writer(open(path, "wb"), closefd=True)
+
+    def open_read(self, path: str) -> BinaryIO:
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True)
+
+
+NO_COMPRESSION = Codec()
+_CODECS = {"none": Codec, "gzip": GzipCodec, "zstd": ZstdCodec}
+# Para reconocer archivos ya escritos aunque se cambie la configuración
+_BY_EXTENSION = {".gz": GzipCodec(), ".zst": ZstdCodec()}
+
+
+# Codec configurado en JSON_COMPRESSION ("none", "gzip" o "zstd"). Si se pide
+# zstd sin el paquete zstandard instalado se usa gzip.
+@lru_cache(maxsize=None)
+def get_codec(name: str = None) -> Codec:
+    name = (name or JSON_COMPRESSION or "none").lower()
+    if name not in _CODECS:
+        raise ValueError(f"Compresión no soportada: {name}")
+    if name == "zstd" and zstandard is None:
+        logging.warning("zstandard no está instalado; se comprime con gzip")
+        name = "gzip"
+    if name == "none":
+        return NO_COMPRESSION
+    return _CODECS[name](JSON_COMPRESSION_LEVEL)
+
+
+# Codec con el que se escribió un archivo, según su extensión
+def codec_for_path(path: str) -> Codec:
+    return _BY_EXTENSION.get(os.path.splitext(path)[1], NO_COMPRESSION)
+
+
+# Abre un archivo exportado para leerlo ya descomprimido
+def open_output_file(path: str) -> BinaryIO:
+    codec = codec_for_path(path)
+    if codec.name == "zstd" and zstandard is None:
+        raise RuntimeError(f"Hace falta zstandard para leer {path}")
+    return codec.open_read(path)
+
+
+def read_output_file(path: str) -> bytes:
+    with open_output_file(path) as f:
+        return f.read()
+
+
+# Rutas posibles de un archivo según la compresión (sin comprimir, .gz, .zst)
+def output_variants(base_path: str):
+    yield base_path
+    for extension in _BY_EXTENSION:
+        yield base_path + extension
+
+
+# Archivo existente para ``base_path`` (p. ej. ``tabla.json``) con cualquier
+# compresión, dando preferencia al formato configurado. None si no hay.
+def find_output_file(base_path: str) -> Optional[str]:
+    preferred = base_path + get_codec().extension
+    if os.path.exists(preferred):
+        return preferred
+    for path in output_variants(base_path):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# Borra las copias del archivo ``keep`` con otra compresión, para que no
+# queden versiones viejas al cambiar JSON_COMPRESSION
+def remove_stale_variants(keep: str):
+    extension = codec_for_path(keep).extension
+    base_path = keep[:-len(extension)] if extension else keep
+    for path in output_variants(base_path):
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+# Temporal único junto a ``path`` (mismo directorio, para que os.replace sea
+# atómico): dos exportaciones de la misma tabla a la vez no comparten
+# temporal ni se pisan al publicar
+def unique_tmp_path(path: str) -> str:
+    return f"{path}.{uuid.uuid4().hex}.tmp"
@@ -0,0 +1,109 @@
+# utils/json_encoder.py
+# capa de codificacion JSON usada por los archivos exportados y las
+# respuestas de la API. Por defecto orjson; json de la stdlib como respaldo.
+# Los dos producen el mismo JSON pero no los mismos bytes: en modo pretty
+# orjson sangra con 2 espacios y la stdlib con 4 (como los archivos de antes
+# de esta capa), y algunos float se escriben distinto (1e-7 frente a 1e-07).
+# Cambiar JSON_ENCODER cambia por tanto el tamaño y la suma de todos los
+# archivos exportados: para comparar dos exportaciones byte a byte, o con
+# archivos antiguos, hay que usar el mismo codificador (JSON_ENCODER=json
+# reproduce el formato anterior).
+
+import abc
+import datetime
+import decimal
+import json
+from typing import Any, Callable, Dict, Optional
+
+from config import JSON_ENCODER, JSON_OUTPUT_MODE
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+
+
+def _default(value):
+    # Tipos que pueden llegar sin pasar por los conversores de field_mapping
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+class JsonEncoder(abc.ABC):
+    """
+    Codificador JSON intercambiable. ``indent`` es la sangría que produce en
+    modo pretty (None en modo compacto); JsonStreamWriter la usa para armar
+    el sobre ``{"doctype", "data"}`` con el mismo formato que las filas.
+    """
+
+    name = "base"
+    indent: Optional[int] = None
+
+    @abc.abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        ...
+
+
+class OrjsonEncoder(JsonEncoder):
+    name = "orjson"
+
+    def __init__(self, pretty: bool):
+        # orjson solo sabe sangrar con 2 espacios: la salida pretty no es
+        # byte a byte la de StdlibEncoder (ver la cabecera del módulo)
+        self.indent = 2 if pretty else None
+        self._option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            self._option |= orjson.OPT_INDENT_2
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=self._option)
+
+
+class StdlibEncoder(JsonEncoder):
+    name = "json"
+
+    def __init__(self, pretty: bool):
+        self.indent = 4 if pretty else None
+        self._separators = None if pretty else (",", ":")
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, indent=self.indent, ensure_ascii=False,
+                          separators=self._separators,
+                          default=_default).encode("utf-8")
+
+
+ENCODERS: Dict[str, Callable[[bool], JsonEncoder]] = {
+    "orjson": OrjsonEncoder,
+    "json": StdlibEncoder,
+}
+
+
+def get_encoder(name: str = None, mode: str = None) -> JsonEncoder:
+    name = name or JSON_ENCODER
+    if name == "orjson" and orjson is None:
+        name = "json"
+    if name not in ENCODERS:
+        raise ValueError(f"Codificador JSON desconocido: {name}")
+    return ENCODERS[name]((mode or JSON_OUTPUT_MODE) == "pretty")
+
+
+# Codificador de los archivos (pretty o compacto según JSON_OUTPUT_MODE) y
+# de las respuestas de la API (siempre compacto)
+file_encoder = get_encoder()
+response_encoder = get_encoder(mode="compact")
+
+
+def dumps(obj: Any) -> bytes:
+    return response_encoder.dumps(obj)
+
+
+# Lectura de JSON (p. ej. un archivo exportado que se va a completar)
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
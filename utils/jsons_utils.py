@@ -1,42 +1,406 @@
 # db/jsons_utils.py
 # helpers
+import contextlib
 import datetime
 import decimal
+import hashlib
+import itertools
 import json
 import logging
 import math
 import os
-from collections import OrderedDict
-from typing import List, Dict, Tuple, Any
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from config import get_output_dir, PAGINATION_THRESHOLD, \
-    DEFAULT_PAGE_SIZE
+    DEFAULT_PAGE_SIZE, FETCH_BATCH_SIZE, JSON_SHARD_ROWS, EXPORT_FORMAT, \
+    EXPORT_PARTITIONS, DB_POOL_MAX_SIZE
+from utils.compression import get_codec, output_variants, \
+    read_output_file, remove_stale_variants, unique_tmp_path
+from utils.json_encoder import JsonEncoder, dumps, file_encoder, loads
+from utils.sinks import FORMATOS, SINKS
+from utils.timings import ExportTimings
+from utils.watermarks import get_watermark, set_watermark, watermark_key
 
+# Alias de las columnas auxiliares: clave de paginación keyset, total de
+# registros de la primera página y marca de agua de las exportaciones
+# incrementales. No se incluyen en los datos exportados.
+KEYSET_ALIAS = "_keyset_key"
+TOTAL_ALIAS = "_total_rows"
+WATERMARK_ALIAS = "_watermark"
+AUX_COLUMNS = frozenset((KEYSET_ALIAS, TOTAL_ALIAS, WATERMARK_ALIAS))
 
-# funcion para salvar el archivo json
-def save_json_file(
-        doctype_name: str, data: list, module_name: str = None,
-        sqlserver_name: str = None
-) -> str:
-    try:
-        output_dir = get_output_dir()
-        if not output_dir:
-            raise ValueError("get_output_dir() devolvió una ruta vacía o nula")
+# Índice de las partes en las exportaciones por partes
+MANIFEST_NAME = "manifest.json"
+
+
+# Extensión del archivo de salida según el formato y la compresión
+# configurada (.json, .json.gz, .csv.zst, .parquet, ...)
+def output_extension(formato: str = "json") -> str:
+    if formato == "json":
+        return f".json{get_codec().extension}"
+    sink = SINKS[formato]
+    return sink.extension + (get_codec().extension if sink.compressible
+                             else "")
+
+
+# Formato de salida pedido o el de la configuración (EXPORT_FORMAT)
+def resolve_formato(formato: Optional[str] = None) -> str:
+    formato = (formato or EXPORT_FORMAT).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de salida no soportado: {formato} "
+                         f"(use {', '.join(FORMATOS)})")
+    return formato
+
+
+# Ruta del archivo de salida de una tabla dentro de get_output_dir(), por
+# defecto JSON con la extensión de la compresión (tabla.json.gz, ...)
+def get_output_path(sqlserver_name: str, extension: str = None) -> str:
+    output_dir = get_output_dir()
+    if not output_dir:
+        raise ValueError("get_output_dir() devolvió una ruta vacía o nula")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not sqlserver_name:
+        raise ValueError("sqlserver_name no puede ser None")
+
+    extension = output_extension() if extension is None else extension
+    return os.path.join(output_dir, f"{sqlserver_name}{extension}")
+
+
+# Directorio de las partes de una tabla exportada por partes
+def get_shard_dir(sqlserver_name: str) -> str:
+    return os.path.join(os.path.dirname(get_output_path(sqlserver_name)),
+                        sqlserver_name)
+
+
+# Borra lo que quedara de la tabla en ese formato escrito en el otro modo
+# (archivo único o directorio de partes), para que no convivan dos versiones
+def _remove_other_layout(sqlserver_name: str, formato: str, sharded: bool):
+    if sharded:
+        extension = ".json" if formato == "json" else SINKS[formato].extension
+        base_path = os.path.join(get_output_dir(),
+                                 f"{sqlserver_name}{extension}")
+        for path in output_variants(base_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return
+
+    shard_dir = get_shard_dir(sqlserver_name)
+    manifest_path = os.path.join(shard_dir, MANIFEST_NAME)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "rb") as f:
+            manifest_formato = loads(f.read()).get("formato", "json")
+        if manifest_formato == formato:
+            shutil.rmtree(shard_dir)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JsonStreamWriter:
+    """
+    Escribe ``{"doctype": ..., "data": [...]}`` fila a fila, con el mismo
+    formato que el codificador daría al documento completo, sin tener todos
+    los datos en memoria.
+
+    Se escribe a un archivo temporal que reemplaza al definitivo solo si la
+    exportación termina bien; si falla, el JSON anterior queda intacto. Con
+    JSON_COMPRESSION cada lote se comprime según se escribe, y al terminar se
+    borra la copia de la tabla que hubiera con otra compresión.
+    """
+
+    formato = "json"
+
+    def __init__(self, doctype_name: str, sqlserver_name: str = None,
+                 encoder: JsonEncoder = None, output_path: str = None):
+        self.doctype_name = doctype_name
+        self.output_path = output_path or get_output_path(sqlserver_name)
+        self.encoder = encoder or file_encoder
+        self.codec = get_codec()
+        self.total_rows = 0
+        self.bytes_written = 0
+        self._tmp_path = unique_tmp_path(self.output_path)
+        self._file = None
+
+        indent = self.encoder.indent
+        if indent:
+            pad = b" " * indent
+            self._header = (b'{\n' + pad + b'"doctype": %s,\n' + pad
+                            + b'"data": [')
+            self._row_indent = b"\n" + pad * 2
+            self._footer = b"\n" + pad + b"]\n}"
+        else:
+            self._header = b'{"doctype":%s,"data":['
+            self._row_indent = b""
+            self._footer = b"]}"
+
+    def __enter__(self):
+        self._file = self.codec.open_write(self._tmp_path)
+        self._file.write(
+            self._header % self.encoder.dumps(self.doctype_name))
+        return self
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        dumps = self.encoder.dumps
+        row_indent = self._row_indent
+        if row_indent:
+            parts = [row_indent + dumps(row).replace(b"\n", row_indent)
+                     for row in rows]
+        else:
+            parts = [dumps(row) for row in rows]
+        if self.total_rows:
+            self._file.write(b",")
+        self._file.write(b",".join(parts))
+        self.total_rows += len(rows)
+
+    def flush(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                empty = not self.total_rows and self.encoder.indent
+                self._file.write(b"]\n}" if empty else self._footer)
+        finally:
+            self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.output_path)
+            self.bytes_written = os.path.getsize(self.output_path)
+            remove_stale_variants(self.output_path)
+        elif os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "doctype": self.doctype_name,
+            "archivo": self.output_path,
+            "total_registros": self.total_rows,
+        }
+
+
+class ShardedWriter:
+    """
+    Escribe la exportación en partes de como mucho ``shard_rows`` filas:
+    ``<tabla>/part-0000.json``, ``part-0001.json``... Cada parte es un
+    archivo completo (en JSON, un documento ``{"doctype", "data"}``) que se
+    puede importar por separado, y ``manifest.json`` lista las filas, bytes
+    y sha256 de cada una. ``open_part(ruta)`` crea el writer de cada parte
+    (JsonStreamWriter o un sink de utils/sinks.py).
+
+    Las partes se cierran a medida que llegan los lotes. Se escribe en un
+    directorio temporal que reemplaza al anterior solo si la exportación
+    termina bien, igual que JsonStreamWriter con el archivo único.
+    """
+
+    def __init__(self, doctype_name: str, sqlserver_name: str,
+                 shard_rows: int, open_part: Callable[[str], Any],
+                 extension: str, formato: str = "json"):
+        if shard_rows <= 0:
+            raise ValueError("shard_rows debe ser mayor que 0")
+        self.doctype_name = doctype_name
+        self.sqlserver_name = sqlserver_name
+        self.shard_rows = shard_rows
+        self.open_part = open_part
+        self.extension = extension
+        self.formato = formato
+        self.codec = get_codec()
+        self.output_dir = get_shard_dir(sqlserver_name)
+        self.output_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.total_rows = 0
+        self.bytes_written = 0
+        self.shards: List[Dict[str, Any]] = []
+        # Propio de este writer: otra exportación de la misma tabla usa otro
+        self._tmp_dir = unique_tmp_path(self.output_dir)
+        self._current = None
+
+    def __enter__(self):
+        os.makedirs(self._tmp_dir)
+        return self
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        start = 0
+        while start < len(rows):
+            if self._current is None:
+                self._open_shard()
+            room = self.shard_rows - self._current.total_rows
+            self._current.write_rows(rows[start:start + room])
+            start += room
+            if self._current.total_rows >= self.shard_rows:
+                self._close_shard()
+        self.total_rows += len(rows)
+
+    def flush(self):
+        if self._current is not None:
+            self._current.flush()
+
+    def _open_shard(self):
+        name = f"part-{len(self.shards):04d}{self.extension}"
+        self._current = self.open_part(os.path.join(self._tmp_dir, name))
+        self._current.__enter__()
+
+    def _close_shard(self):
+        writer, self._current = self._current, None
+        writer.__exit__(None, None, None)
+        self.shards.append({
+            "archivo": os.path.basename(writer.output_path),
+            "registros": writer.total_rows,
+            "bytes": writer.bytes_written,
+            "sha256": _sha256(writer.output_path),
+        })
+
+    def _write_manifest(self):
+        manifest = {
+            "doctype": self.doctype_name,
+            "tabla": self.sqlserver_name,
+            "formato": self.formato,
+            "total_registros": self.total_rows,
+            "filas_por_parte": self.shard_rows,
+            "compresion": self.codec.name,
+            "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+            "partes": self.shards,
+        }
+        with open(os.path.join(self._tmp_dir, MANIFEST_NAME), "wb") as f:
+            f.write(file_encoder.dumps(manifest))
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                # Una exportación vacía deja una parte vacía
+                if self._current is not None or not self.shards:
+                    if self._current is None:
+                        self._open_shard()
+                    self._close_shard()
+                self._write_manifest()
+        except BaseException:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            raise
+        if exc_type is not None:
+            if self._current is not None:
+                self._current.__exit__(exc_type, exc_val, exc_tb)
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            return
+
+        self._publish()
+        self.bytes_written = sum(shard["bytes"] for shard in self.shards)
 
-        os.makedirs(output_dir, exist_ok=True)
+    # Un directorio no se puede reemplazar de forma atómica si existe: el
+    # anterior se aparta a un nombre único y se pone el nuevo en su lugar.
+    # Si entre medias otra exportación publicó el suyo, se aparta también.
+    def _publish(self):
+        old_dirs = []
+        try:
+            while True:
+                if os.path.exists(self.output_dir):
+                    old_dir = unique_tmp_path(self.output_dir)
+                    try:
+                        os.replace(self.output_dir, old_dir)
+                        old_dirs.append(old_dir)
+                    except FileNotFoundError:
+                        pass
+                try:
+                    os.replace(self._tmp_dir, self.output_dir)
+                    return
+                except OSError:
+                    if not os.path.isdir(self.output_dir):
+                        raise
+        finally:
+            for old_dir in old_dirs:
+                shutil.rmtree(old_dir, ignore_errors=True)
 
-        if not sqlserver_name:
-            raise ValueError("sqlserver_name no puede ser None")
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "doctype": self.doctype_name,
+            "archivo": self.output_path,
+            "total_registros": self.total_rows,
+            "formato": self.formato,
+            "partes": len(self.shards),
+        }
 
-        output_path = os.path.join(output_dir, f"{sqlserver_name}.json")
 
-        content = OrderedDict()
-        content["doctype"] = doctype_name
-        content["data"] = data
+# Writer de la exportación: JSON o un sink de utils/sinks.py según
+# ``formato`` (None = EXPORT_FORMAT), en un archivo único o por partes según
+# ``shard_rows`` (None = JSON_SHARD_ROWS, 0 = archivo único). Los sinks
+# tipan las columnas con el field_mapping del extractor.
+def open_writer(doctype_name: str, sqlserver_name: str,
+                shard_rows: Optional[int] = None, formato: str = None,
+                field_mapping: List[Tuple[str, Tuple[str, str]]] = None):
+    formato = resolve_formato(formato)
+    if formato == "json":
+        def open_part(path):
+            return JsonStreamWriter(doctype_name, output_path=path)
+    else:
+        if field_mapping is None:
+            raise ValueError(f"El formato {formato} necesita el field_mapping "
+                             f"de {doctype_name}")
+        sink = SINKS[formato]
+        field_types = [(alias, field_type)
+                       for alias, (_, field_type) in field_mapping]
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)
+        def open_part(path):
+            return sink(doctype_name, path, field_types, get_codec())
 
+    extension = output_extension(formato)
+    shard_rows = JSON_SHARD_ROWS if shard_rows is None else shard_rows
+    if shard_rows:
+        return ShardedWriter(doctype_name, sqlserver_name, shard_rows,
+                             open_part, extension, formato)
+    return open_part(get_output_path(sqlserver_name, extension))
+
+
+# Tras escribir: quita la versión de la tabla en el otro modo (único/partes)
+def _finish_writer(writer, sqlserver_name: str):
+    _remove_other_layout(sqlserver_name, writer.formato,
+                         sharded=isinstance(writer, ShardedWriter))
+
+
+# Ruta de lo exportado de una tabla: el archivo único o el manifest.json de
+# sus partes
+def exported_path(sqlserver_name: str,
+                  shard_rows: Optional[int] = None) -> str:
+    shard_rows = JSON_SHARD_ROWS if shard_rows is None else shard_rows
+    if shard_rows:
+        return os.path.join(get_shard_dir(sqlserver_name), MANIFEST_NAME)
+    return get_output_path(sqlserver_name)
+
+
+# Filas de una exportación ya escrita (archivo único o todas sus partes)
+def load_exported_rows(path: str) -> List[Dict[str, Any]]:
+    if os.path.basename(path) != MANIFEST_NAME:
+        return loads(read_output_file(path))["data"]
+    with open(path, "rb") as f:
+        manifest = loads(f.read())
+    directory = os.path.dirname(path)
+    rows = []
+    for shard in manifest["partes"]:
+        rows.extend(loads(read_output_file(
+            os.path.join(directory, shard["archivo"])))["data"])
+    return rows
+
+
+# funcion para salvar el archivo json
+def save_json_file(
+        doctype_name: str, data: list, module_name: str = None,
+        sqlserver_name: str = None, shard_rows: int = None
+) -> str:
+    try:
+        with open_writer(doctype_name, sqlserver_name, shard_rows,
+                         "json") as writer:
+            writer.write_rows(data)
+        _finish_writer(writer, sqlserver_name)
+
+        output_path = writer.output_path
         print(f"✅ JSON guardado en: {output_path}")  # Para depuración directa
         return output_path
 
@@ -104,6 +468,128 @@ def _serialize_date(value):
     return str(value)
 
 
+# --- Planes de conversión por columna ---------------------------------------
+# serialize_value decide por tipo en cada celda. Para exportar se compila una
+# vez por consulta un conversor especializado por columna: resuelve los casos
+# habituales (str, int, float, Decimal, fechas) sin recorrer la cadena de
+# if/elif y delega el resto en serialize_value, así el resultado es idéntico.
+
+def _convert_string(value):
+    if value.__class__ is str:
+        return value if value.strip() else None
+    if value is None:
+        return None
+    return serialize_value(value, 'string')
+
+
+def _convert_float(value):
+    cls = value.__class__
+    if cls is float:
+        return value
+    if cls is int or cls is decimal.Decimal:
+        return float(value)
+    if value is None:
+        return None
+    return serialize_value(value, 'float')
+
+
+def _convert_integer(value):
+    cls = value.__class__
+    if cls is int:
+        return value
+    if cls is decimal.Decimal:
+        return int(value)
+    if value is None:
+        return None
+    return serialize_value(value, 'integer')
+
+
+def _convert_numeric(value):
+    cls = value.__class__
+    if cls is int or cls is float:
+        return value
+    if cls is decimal.Decimal:
+        return float(value)
+    if value is None:
+        return None
+    return serialize_value(value, 'numeric')
+
+
+def _convert_date(value):
+    cls = value.__class__
+    if cls is datetime.datetime or cls is datetime.date:
+        return value.isoformat()
+    if value is None:
+        return None
+    return serialize_value(value, 'date')
+
+
+def _convert_boolean(value):
+    cls = value.__class__
+    if cls is bool:
+        return value
+    if cls is int:
+        return value == 1
+    if value is None:
+        return None
+    return serialize_value(value, 'boolean')
+
+
+def _convert_auto(value):
+    # 'auto' solo convierte Decimal; cualquier otro valor termina en None
+    if value.__class__ is decimal.Decimal:
+        return float(value)
+    return None
+
+
+_CONVERTERS = {
+    'string': _convert_string,
+    'float': _convert_float,
+    'integer': _convert_integer,
+    'numeric': _convert_numeric,
+    'date': _convert_date,
+    'boolean': _convert_boolean,
+    'auto': _convert_auto,
+}
+
+
+def _converter_for(field_type: str):
+    converter = _CONVERTERS.get(field_type)
+    if converter is None:
+        def converter(value):
+            return serialize_value(value, field_type)
+    return converter
+
+
+# Compila el field_mapping de un extractor: alias -> conversor
+def compile_field_converters(
+        field_mapping: List[Tuple[str, Tuple[str, str]]]
+) -> Dict[str, Any]:
+    return {alias: _converter_for(field_type)
+            for alias, (_, field_type) in field_mapping}
+
+
+# Plan posicional para las columnas que devolvió el cursor: una función que
+# convierte un lote de filas en diccionarios sin despacho por celda
+def compile_row_plan(columns: List[str], converters: Dict[str, Any]):
+    positions = [index for index, key in enumerate(columns)
+                 if key not in AUX_COLUMNS]
+    keys = tuple(columns[index] for index in positions)
+    plan = tuple(converters.get(key, _convert_auto) for key in keys)
+
+    if len(positions) == len(columns):
+        def convert_rows(rows):
+            return [{key: convert(value)
+                     for key, convert, value in zip(keys, plan, row)}
+                    for row in rows]
+    else:
+        def convert_rows(rows):
+            return [{key: convert(row[index])
+                     for key, convert, index in zip(keys, plan, positions)}
+                    for row in rows]
+    return convert_rows
+
+
 def is_serializable(value):
     try:
         json.dumps(value)
@@ -112,36 +598,591 @@ def is_serializable(value):
         return False
 
 
+class ExportProgress:
+    """
+    Avance de una exportación: filas procesadas y total esperado (None si no
+    se conoce). ``callback(hechas, total)`` se llama después de cada lote.
+    """
+
+    def __init__(self, callback: Callable[[int, Optional[int]], None] = None):
+        self.total: Optional[int] = None
+        self.done = 0
+        self._callback = callback
+
+    def advance(self, rows: int):
+        self.done += rows
+        if self._callback:
+            self._callback(self.done, self.total)
+
+
+# Lee el resultado ya ejecutado en el cursor por lotes con fetchmany
+def _iter_serialized_batches(cursor, converters: Dict[str, Any]):
+    convert_rows = compile_row_plan(
+        [col[0] for col in cursor.description], converters)
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        yield convert_rows(rows)
+
+
+# Escribe los lotes al archivo a medida que llegan. Con collect=True además
+# devuelve la lista completa (lo que espera la API); con collect=False solo
+# un resumen, y la memoria no crece con el tamaño de la tabla. ``formato`` y
+# ``shard_rows`` eligen el writer (ver open_writer).
+def _write_batches(doctype_name: str, sqlserver_name: str, batches,
+                   collect: bool = True, progress: ExportProgress = None,
+                   on_saved: Callable[[Dict[str, Any]], None] = None,
+                   timings: ExportTimings = None,
+                   shard_rows: Optional[int] = None, formato: str = None,
+                   field_mapping=None):
+    progress = progress or ExportProgress()
+    timings = timings or ExportTimings()
+    result = [] if collect else None
+    with open_writer(doctype_name, sqlserver_name, shard_rows, formato,
+                     field_mapping) as writer:
+        for batch in batches:
+            with timings.measure("write"):
+                writer.write_rows(batch)
+            if collect:
+                result.extend(batch)
+            progress.advance(len(batch))
+        with timings.measure("write"):
+            writer.flush()
+    _finish_writer(writer, sqlserver_name)
+
+    timings.bytes = writer.bytes_written
+    logging.info(f"{doctype_name} guardado correctamente en "
+                 f"{writer.output_path} ({writer.total_rows} registros)")
+    timings.log(doctype_name)
+    if on_saved:
+        on_saved(writer.summary())
+    return result if collect else writer.summary()
+
+
+# Convierte un lote de filas ya serializadas en líneas NDJSON
+def rows_to_ndjson(rows: List[Dict[str, Any]]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+# Patrón LIKE que busca ``text`` literal (con ESCAPE '\')
+def _like_pattern(text: str) -> str:
+    for char in ("\\", "%", "_", "["):
+        text = text.replace(char, "\\" + char)
+    return f"%{text}%"
+
+
+def fetch_page(db, select_query: str,
+               field_mapping: List[Tuple[str, Tuple[str, str]]],
+               converters: Dict[str, Any], pagina,
+               unique_column: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Una página de la consulta para la tabla de "Visualizar datos", sin leer
+    el resto: la consulta se envuelve en una tabla derivada que se filtra
+    (texto en las columnas 'string'), se ordena por un alias del
+    field_mapping y se recorta con OFFSET/FETCH. El total de filas que
+    cumplen el filtro sale de ``COUNT(*) OVER()`` en la misma consulta.
+
+    OFFSET/FETCH solo da páginas estables si el orden es total: se desempata
+    por ``unique_column`` (columna de ``select_query`` única por fila, que
+    también es el orden por defecto) o, sin ella, por todas las columnas.
+
+    :param pagina: PaginaParams (page, size, sort, descending, filtro)
+    :param unique_column: Columna única de la consulta para desempatar
+    :return: {"rows", "total", "page", "size", "columnas"}
+    """
+    # Algunas consultas terminan en ';', que no cabe dentro de la subconsulta
+    select_query = select_query.strip().rstrip(";")
+    aliases = [alias for alias, _ in field_mapping]
+    if pagina.sort and pagina.sort not in aliases:
+        raise ValueError(f"No se puede ordenar por {pagina.sort}")
+    sort = pagina.sort or unique_column or aliases[0]
+    tiebreak = [unique_column] if unique_column else aliases
+    order_by = ", ".join(
+        [f"q.{sort} {'DESC' if pagina.descending else 'ASC'}"]
+        + [f"q.{column}" for column in tiebreak if column != sort])
+
+    where, params = "", []
+    text_columns = [alias for alias, (_, field_type) in field_mapping
+                    if field_type == "string"]
+    if pagina.filtro and text_columns:
+        where = "WHERE " + " OR ".join(f"q.{alias} LIKE ? ESCAPE '\\'"
+                                       for alias in text_columns)
+        params = [_like_pattern(pagina.filtro)] * len(text_columns)
+
+    offset = (pagina.page - 1) * pagina.size
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"SELECT q.*, COUNT(*) OVER() AS {TOTAL_ALIAS} "
+            f"FROM ({select_query}) AS q {where} ORDER BY {order_by} "
+            f"OFFSET {offset} ROWS FETCH NEXT {pagina.size} ROWS ONLY",
+            *params)
+        columns = [col[0] for col in cursor.description]
+        raw_rows = cursor.fetchall()
+        if raw_rows:
+            total = raw_rows[0][columns.index(TOTAL_ALIAS)]
+        elif offset:
+            # Página más allá del final: el total se cuenta aparte
+            cursor.execute(f"SELECT COUNT(*) FROM ({select_query}) AS q "
+                           f"{where}", *params)
+            total = cursor.fetchone()[0]
+        else:
+            total = 0
+
+    return {
+        "rows": compile_row_plan(columns, converters)(raw_rows),
+        "total": total,
+        "page": pagina.page,
+        "size": pagina.size,
+        "columnas": aliases,
+    }
+
+
+def _stream_query_batches(db, table_query: str,
+                          converters: Dict[str, Any]):
+    with db.cursor() as cursor:
+        cursor.execute(table_query)
+        yield from _iter_serialized_batches(cursor, converters)
+
+
 # Ejecuta consulta SQL, serializa los datos según tipo y guarda un archivo JSON.
+# Con stream=True no escribe archivo: devuelve un generador de lotes de filas
+# serializadas que se van leyendo del cursor a medida que se consumen.
+# ``timings`` (ExportTimings) recoge la duración de cada fase; ``formato``
+# ("json", "csv", "arrow", "parquet") y ``shard_rows``, el archivo a escribir.
+# Con ``pagina`` (PaginaParams) solo devuelve esa página (ver fetch_page).
 def export_table_to_json(db, doctype_name, sqlserver_name, module_name,
-                         field_mapping, table_query) -> list:
-    field_type_map = {alias: field_type for alias, (_, field_type) in
-                      field_mapping}
+                         field_mapping, table_query, collect=True,
+                         stream=False, on_progress=None, on_saved=None,
+                         timings=None, shard_rows=None, formato=None,
+                         pagina=None):
+    converters = compile_field_converters(field_mapping)
+    if pagina is not None:
+        return fetch_page(db, table_query, field_mapping, converters, pagina)
+    if stream:
+        return _stream_query_batches(db, table_query, converters)
+    timings = timings or ExportTimings()
     try:
-        with db.cursor() as cursor:
+        with db.cursor() as raw_cursor:
+            cursor = timings.cursor(raw_cursor)
             cursor.execute(table_query)
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-
-            result = [
-                {
-                    key: serialize_value(value, field_type_map.get(key, 'auto'))
-                    for key, value in zip(columns, row)
-                }
-                for row in rows
-            ]
-
-            output_path = save_json_file(doctype_name, result, module_name,
-                                         sqlserver_name)
-            logging.info(
-                f"{doctype_name}.json guardado correctamente en {output_path}")
-            return result
+            return _write_batches(
+                doctype_name, sqlserver_name,
+                timings.timed_batches(
+                    _iter_serialized_batches(cursor, converters)),
+                collect, ExportProgress(on_progress), on_saved, timings,
+                shard_rows, formato, field_mapping)
 
     except Exception as e:
         logging.error(f"Error exportando {doctype_name}: {e}")
         raise
 
 
+# Construye la consulta de una página keyset (seek). La consulta original se
+# envuelve en una tabla derivada para poder filtrar por la clave aunque tenga
+# GROUP BY; SQL Server empuja el filtro dentro cuando la clave es una columna
+# (o la columna del GROUP BY). Sin page_size devuelve todo el resto.
+def _keyset_page_query(select_clause: str, base_query_from: str,
+                       keyset_column: str, page_size: Optional[int],
+                       first_page: bool) -> str:
+    top_clause = f"TOP ({page_size}) " if page_size else ""
+    where_clause = "" if first_page else f"WHERE sub.{KEYSET_ALIAS} > ?"
+    return (f"SELECT {top_clause}* FROM ("
+            f"{select_clause}, {keyset_column} AS {KEYSET_ALIAS} "
+            f"{base_query_from}) AS sub {where_clause} "
+            f"ORDER BY sub.{KEYSET_ALIAS}")
+
+
+# Páginas keyset: cada página empieza en la última clave vista
+def _iter_keyset_pages(cursor, select_clause: str, base_query_from: str,
+                       keyset_column: str, converters: Dict[str, Any],
+                       last_key=None):
+    while True:
+        if last_key is None:
+            cursor.execute(_keyset_page_query(
+                select_clause, base_query_from, keyset_column,
+                DEFAULT_PAGE_SIZE, first_page=True))
+        else:
+            cursor.execute(_keyset_page_query(
+                select_clause, base_query_from, keyset_column,
+                DEFAULT_PAGE_SIZE, first_page=False), last_key)
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_key = rows[-1][columns.index(KEYSET_ALIAS)]
+        yield compile_row_plan(columns, converters)(rows)
+        if len(rows) < DEFAULT_PAGE_SIZE:
+            break
+
+
+# Páginas OFFSET/FETCH sobre la consulta ordenada
+def _iter_offset_pages(cursor, select_query: str, total_items: int,
+                       converters: Dict[str, Any], first_page: int = 0):
+    total_pages = math.ceil(total_items / DEFAULT_PAGE_SIZE)
+    for page_num in range(first_page, total_pages):
+        offset = page_num * DEFAULT_PAGE_SIZE
+        paginated_query = (f"{select_query} OFFSET {offset} R"
+                           f"OWS FETCH NEXT {DEFAULT_PAGE_SIZE} "
+                           f"ROWS ONLY")
+        cursor.execute(paginated_query)
+        columns = [col[0] for col in cursor.description]
+        yield compile_row_plan(columns, converters)(cursor.fetchall())
+
+
+# Pide la primera página con COUNT(*) OVER() para conocer el total en la
+# misma consulta (sin un SELECT COUNT(*) aparte que repita los GROUP BY) y a
+# partir de ahí decide cómo traer el resto.
+def _iter_paginated_batches(cursor, doctype_name: str, select_clause: str,
+                            base_query_from: str, order_clause: str,
+                            keyset_column: str,
+                            converters: Dict[str, Any],
+                            progress: ExportProgress):
+    select_query = f"{select_clause} {base_query_from} {order_clause}"
+    counted_clause = f"{select_clause}, COUNT(*) OVER() AS {TOTAL_ALIAS}"
+
+    if keyset_column:
+        cursor.execute(_keyset_page_query(
+            counted_clause, base_query_from, keyset_column,
+            DEFAULT_PAGE_SIZE, first_page=True))
+    else:
+        cursor.execute(f"{counted_clause} {base_query_from} {order_clause} "
+                       f"OFFSET 0 ROWS FETCH NEXT {DEFAULT_PAGE_SIZE} "
+                       f"ROWS ONLY")
+    columns = [col[0] for col in cursor.description]
+    rows = cursor.fetchall()
+
+    if not rows:
+        logging.warning(f"No hay registros para {doctype_name}")
+        return
+
+    total_items = rows[0][columns.index(TOTAL_ALIAS)]
+    progress.total = total_items
+    logging.warning(f"Total de registros: {total_items}")
+
+    last_key = (rows[-1][columns.index(KEYSET_ALIAS)]
+                if keyset_column else None)
+    yield compile_row_plan(columns, converters)(rows)
+
+    if len(rows) >= total_items:
+        return
+
+    if total_items <= PAGINATION_THRESHOLD:
+        # Pocos registros: el resto en una sola consulta
+        if keyset_column:
+            cursor.execute(_keyset_page_query(
+                select_clause, base_query_from, keyset_column, None,
+                first_page=False), last_key)
+        else:
+            cursor.execute(f"{select_query} OFFSET {len(rows)} ROWS")
+        yield from _iter_serialized_batches(cursor, converters)
+    elif keyset_column:
+        logging.warning(
+            f"Paginar {total_items} registros por {keyset_column}.")
+        yield from _iter_keyset_pages(
+            cursor, select_clause, base_query_from, keyset_column,
+            converters, last_key=last_key)
+    else:
+        logging.warning(
+            f"Paginar {total_items} registros en "
+            f"{math.ceil(total_items / DEFAULT_PAGE_SIZE)} páginas."
+        )
+        yield from _iter_offset_pages(cursor, select_query, total_items,
+                                      converters, first_page=1)
+
+
+# --- Lectura particionada -----------------------------------------------------
+# Las tablas grandes con clave keyset se pueden leer por rangos de la clave,
+# cada rango por su propia conexión del pool y en su propio hilo. Los límites
+# salen de NTILE sobre la clave: los rangos tienen casi las mismas filas.
+
+# (clave mínima, clave máxima, filas) de cada rango, en orden de clave
+def _partition_bounds(cursor, base_query_from: str, keyset_column: str,
+                      partitions: int) -> List[Tuple[Any, Any, int]]:
+    cursor.execute(
+        f"SELECT MIN(t.{KEYSET_ALIAS}), MAX(t.{KEYSET_ALIAS}), COUNT(*) "
+        f"FROM (SELECT sub.{KEYSET_ALIAS}, NTILE({partitions}) OVER ("
+        f"ORDER BY sub.{KEYSET_ALIAS}) AS _tile FROM ("
+        f"SELECT {keyset_column} AS {KEYSET_ALIAS} {base_query_from}) AS sub"
+        f") AS t GROUP BY t._tile ORDER BY t._tile")
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _partition_query(select_clause: str, base_query_from: str,
+                     keyset_column: str) -> str:
+    return (f"SELECT * FROM ("
+            f"{select_clause}, {keyset_column} AS {KEYSET_ALIAS} "
+            f"{base_query_from}) AS sub "
+            f"WHERE sub.{KEYSET_ALIAS} >= ? AND sub.{KEYSET_ALIAS} <= ? "
+            f"ORDER BY sub.{KEYSET_ALIAS}")
+
+
+# Conexiones para los rangos, tomadas del pool sin esperar: si otras
+# exportaciones tienen ocupado el pool se leen menos rangos. Esperar a que
+# se liberen podría agotar DB_POOL_ACQUIRE_TIMEOUT mientras los rangos ya
+# abiertos retienen las suyas.
+def _reserve_siblings(db, partitions: int) -> List[Any]:
+    siblings = []
+    try:
+        while len(siblings) < partitions:
+            sibling = db.try_sibling()
+            if sibling is None:
+                break
+            siblings.append(sibling)
+    except Exception as e:
+        logging.warning(f"No se pudo abrir otra conexión: {e}")
+    return siblings
+
+
+# Lee un rango por la conexión ``partition_db`` y guarda sus lotes ya
+# convertidos en ``spill_path`` (un lote JSON por línea), para no retenerlos
+# en memoria mientras se escriben los rangos anteriores
+def _spill_partition(partition_db, query: str, low, high,
+                     converters: Dict[str, Any], spill_path: str,
+                     timings: ExportTimings, cancelled: threading.Event):
+    with partition_db, partition_db.cursor() as raw_cursor, \
+            open(spill_path, "wb") as spill:
+        cursor = timings.cursor(raw_cursor)
+        cursor.execute(query, low, high)
+        for batch in timings.timed_batches(
+                _iter_serialized_batches(cursor, converters)):
+            if cancelled.is_set():
+                return
+            spill.write(dumps(batch) + b"\n")
+
+
+def _iter_partitioned_batches(db, doctype_name: str, select_clause: str,
+                              base_query_from: str, order_clause: str,
+                              keyset_column: str,
+                              converters: Dict[str, Any],
+                              progress: ExportProgress,
+                              timings: ExportTimings, partitions: int):
+    """
+    Lotes de la consulta en orden de ``keyset_column``, leídos por rangos en
+    paralelo con hasta ``partitions`` conexiones (las que el pool tenga
+    libres). Cada rango se vuelca a un temporal y los rangos se entregan en
+    orden en cuanto terminan los anteriores. Si hay pocas filas se lee todo
+    por la conexión de ``db``, y si el pool no da al menos dos conexiones,
+    con la paginación keyset de siempre.
+    """
+    siblings = _reserve_siblings(db, partitions)
+    try:
+        if len(siblings) < 2:
+            logging.warning(f"{doctype_name}: pool ocupado, se lee por una "
+                            f"sola conexión")
+            with db.cursor() as raw_cursor:
+                yield from timings.timed_batches(_iter_paginated_batches(
+                    timings.cursor(raw_cursor), doctype_name, select_clause,
+                    base_query_from, order_clause, keyset_column, converters,
+                    progress))
+            return
+        yield from _iter_partition_ranges(
+            db, siblings, doctype_name, select_clause, base_query_from,
+            keyset_column, converters, progress, timings)
+    finally:
+        # Las que no llegaron a usarse (o no se cerraron) vuelven al pool
+        for sibling in siblings:
+            sibling.close()
+
+
+def _iter_partition_ranges(db, siblings: List[Any], doctype_name: str,
+                           select_clause: str, base_query_from: str,
+                           keyset_column: str, converters: Dict[str, Any],
+                           progress: ExportProgress, timings: ExportTimings):
+    with db.cursor() as raw_cursor:
+        bounds = _partition_bounds(timings.cursor(raw_cursor),
+                                   base_query_from, keyset_column,
+                                   len(siblings))
+    total_items = sum(rows for _, _, rows in bounds)
+    if not total_items:
+        logging.warning(f"No hay registros para {doctype_name}")
+        return
+    progress.total = total_items
+    logging.warning(f"Total de registros: {total_items}")
+
+    query = _partition_query(select_clause, base_query_from, keyset_column)
+    if total_items <= PAGINATION_THRESHOLD or len(bounds) == 1:
+        # No compensa usar más conexiones: un solo rango con todo
+        with db.cursor() as raw_cursor:
+            cursor = timings.cursor(raw_cursor)
+            cursor.execute(query, bounds[0][0], bounds[-1][1])
+            yield from timings.timed_batches(
+                _iter_serialized_batches(cursor, converters))
+        return
+
+    logging.warning(f"Leer {total_items} registros en {len(bounds)} "
+                    f"particiones por {keyset_column}.")
+    # Los tiempos de cada hilo por separado; luego se suman a ``timings``
+    partition_timings = [ExportTimings() for _ in bounds]
+    cancelled = threading.Event()
+    with tempfile.TemporaryDirectory(prefix="particiones-") as spill_dir, \
+            ThreadPoolExecutor(max_workers=len(bounds),
+                               thread_name_prefix="db-partition") as executor:
+        spill_paths = [os.path.join(spill_dir, f"{i:04d}.ndjson")
+                       for i in range(len(bounds))]
+        futures = [
+            executor.submit(_spill_partition, partition_db, query, low, high,
+                            converters, spill_path, partition_timing,
+                            cancelled)
+            for (low, high, _), partition_db, spill_path, partition_timing
+            in zip(bounds, siblings, spill_paths, partition_timings)
+        ]
+        try:
+            for future, spill_path in zip(futures, spill_paths):
+                future.result()
+                with open(spill_path, "rb") as spill:
+                    for line in spill:
+                        yield loads(line)
+        finally:
+            # Si falla un rango (o se deja de leer) los demás paran
+            cancelled.set()
+
+    for partition_timing in partition_timings:
+        for phase in ("sql", "fetch", "serialize"):
+            timings.add(phase, partition_timing.phases[phase])
+        timings.rows += partition_timing.rows
+
+
+# En streaming no hace falta el total ni paginar: una sola consulta que se
+# va leyendo con fetchmany mientras el cliente consume
+def _stream_paginated_batches(db, select_query: str,
+                              converters: Dict[str, Any]):
+    with db.cursor() as cursor:
+        cursor.execute(select_query)
+        yield from _iter_serialized_batches(cursor, converters)
+
+
+# Lee solo las filas cuya marca de agua supera la última exportada,
+# ordenadas por ella, o todas (sin marca) en el orden del extractor
+# (``order_clause``); deja en ``state["marca"]`` la mayor leída. Como en
+# keyset, la consulta con marca va en una tabla derivada para poder filtrar
+# también por agregados de consultas con GROUP BY.
+def _iter_watermark_batches(cursor, select_clause: str, base_query_from: str,
+                            watermark_column: str,
+                            converters: Dict[str, Any], state: Dict[str, Any],
+                            order_clause: str = ""):
+    if state["marca"] is None:
+        cursor.execute(f"{select_clause}, {watermark_column} AS "
+                       f"{WATERMARK_ALIAS} {base_query_from} {order_clause}")
+    else:
+        cursor.execute(
+            f"SELECT * FROM ("
+            f"{select_clause}, {watermark_column} AS {WATERMARK_ALIAS} "
+            f"{base_query_from}) AS sub WHERE sub.{WATERMARK_ALIAS} > ? "
+            f"ORDER BY sub.{WATERMARK_ALIAS}", state["marca"])
+
+    columns = [col[0] for col in cursor.description]
+    mark_index = columns.index(WATERMARK_ALIAS)
+    convert_rows = compile_row_plan(columns, converters)
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        marks = [row[mark_index] for row in rows
+                 if row[mark_index] is not None]
+        if marks and (state["marca"] is None or max(marks) > state["marca"]):
+            state["marca"] = max(marks)
+        yield convert_rows(rows)
+
+
+# Incorpora las filas nuevas a las ya exportadas. Con merge_key una fila
+# nueva reemplaza a la existente con la misma clave (en su posición); sin
+# ella, o si la clave no existía, se añade al final.
+def _merge_rows(existing: List[Dict[str, Any]], new_rows: List[Dict[str, Any]],
+                merge_key: Optional[str]) -> List[Dict[str, Any]]:
+    if not merge_key:
+        return existing + new_rows
+    merged = list(existing)
+    positions = {row.get(merge_key): i for i, row in enumerate(merged)}
+    for row in new_rows:
+        position = positions.get(row.get(merge_key))
+        if position is None:
+            positions[row.get(merge_key)] = len(merged)
+            merged.append(row)
+        else:
+            merged[position] = row
+    return merged
+
+
+def _export_incremental(db, doctype_name: str, sqlserver_name: str,
+                        select_clause: str, base_query_from: str,
+                        watermark_column: str, merge_key: Optional[str],
+                        converters: Dict[str, Any], collect: bool,
+                        progress: ExportProgress, on_saved=None,
+                        timings: ExportTimings = None,
+                        shard_rows: Optional[int] = None,
+                        order_clause: str = ""):
+    # Siempre JSON, aunque EXPORT_FORMAT sea otro: la siguiente incremental
+    # relee este archivo con load_exported_rows
+    output_path = exported_path(sqlserver_name, shard_rows)
+    key = watermark_key(db.host, db.database, sqlserver_name)
+    last_mark = get_watermark(key, output_path)
+    state = {"marca": last_mark}
+
+    with db.cursor() as raw_cursor:
+        batches = timings.timed_batches(_iter_watermark_batches(
+            timings.cursor(raw_cursor), select_clause, base_query_from,
+            watermark_column, converters, state, order_clause))
+
+        if last_mark is None:
+            # Primera vez (o el archivo no es el de la última incremental):
+            # exportación completa, escribiendo los lotes según llegan
+            logging.info(f"{doctype_name}: sin marca de agua, exportación "
+                         f"completa por {watermark_column}")
+            result = _write_batches(doctype_name, sqlserver_name, batches,
+                                    collect, progress, on_saved, timings,
+                                    shard_rows, formato="json")
+            new_rows_count = progress.done
+            existing_count = 0
+        else:
+            new_rows = [row for batch in batches for row in batch]
+            new_rows_count = len(new_rows)
+            existing = load_exported_rows(output_path)
+            existing_count = len(existing)
+
+            if new_rows:
+                merged = _merge_rows(existing, new_rows, merge_key)
+                progress.total = len(merged)
+                result = _write_batches(doctype_name, sqlserver_name,
+                                        [merged], collect, progress, on_saved,
+                                        timings, shard_rows, formato="json")
+            else:
+                # Nada nuevo: el archivo se queda como estaba
+                summary = {"doctype": doctype_name, "archivo": output_path,
+                           "total_registros": existing_count}
+                if on_saved:
+                    on_saved(summary)
+                result = existing if collect else summary
+
+    if state["marca"] is not None:
+        set_watermark(key, state["marca"], output_path)
+    logging.info(f"{doctype_name}: {new_rows_count} registros nuevos o "
+                 f"modificados sobre {existing_count} ya exportados")
+
+    if collect:
+        return result
+    return {**result, "incremental": last_mark is not None,
+            "nuevos_registros": new_rows_count}
+
+
+# Escribe los lotes de una exportación paginada; si no hay ninguno no se
+# crea archivo
+def _write_paginated(doctype_name: str, sqlserver_name: str, batches,
+                     collect: bool, progress: ExportProgress, on_saved,
+                     timings: ExportTimings, shard_rows: Optional[int],
+                     formato: str, field_mapping):
+    first_batch = next(batches, None)
+    if first_batch is None:
+        return [] if collect else {"doctype": doctype_name,
+                                   "archivo": None,
+                                   "total_registros": 0}
+
+    return _write_batches(doctype_name, sqlserver_name,
+                          itertools.chain([first_batch], batches),
+                          collect, progress, on_saved, timings,
+                          shard_rows, formato, field_mapping)
+
+
 def export_table_to_json_paginated(
         db,
         doctype_name: str,
@@ -149,11 +1190,65 @@ def export_table_to_json_paginated(
         module_name: str,
         field_mapping: List[Tuple[str, Tuple[str, str]]],
         base_query_from: str,
-        order_clause: str = ""
-) -> List[Dict[str, Any]]:
+        order_clause: str = "",
+        keyset_column: str = None,
+        watermark_column: str = None,
+        merge_key: str = None,
+        incremental: bool = False,
+        collect: bool = True,
+        stream: bool = False,
+        on_progress: Callable[[int, Optional[int]], None] = None,
+        on_saved: Callable[[Dict[str, Any]], None] = None,
+        timings: ExportTimings = None,
+        shard_rows: Optional[int] = None,
+        formato: str = None,
+        pagina=None,
+        particiones: Optional[int] = None
+):
     """
     Exporta los resultados paginados de una tabla a un archivo JSON.
 
+    El total de registros sale de la primera página (``COUNT(*) OVER()``),
+    sin una consulta de conteo aparte. Si no supera PAGINATION_THRESHOLD el
+    resto se lee en una sola consulta; si lo supera se pagina.
+
+    Si se indica ``keyset_column`` las páginas se piden con
+    ``WHERE clave > ultima_clave`` (paginación keyset) y el orden de salida es
+    el de esa clave. La clave debe ser única y no nula en el resultado: una
+    columna identidad, o la columna del GROUP BY en consultas agrupadas. Sin
+    ``keyset_column`` (p. ej. consultas agrupadas que ordenan por un agregado,
+    como el submayor de vacaciones) se usa OFFSET/FETCH con ``order_clause``.
+
+    Cada página se escribe al archivo en cuanto llega; con ``collect=False``
+    no se acumulan las filas y se devuelve solo un resumen de la exportación.
+    Con ``stream=True`` no se escribe archivo ni se calcula el total: se
+    devuelve un generador de lotes de filas serializadas (para NDJSON). Con
+    ``shard_rows`` (por defecto JSON_SHARD_ROWS) el archivo se divide en
+    partes de ese número de filas con un manifest.json (ShardedWriter), y
+    ``formato`` (por defecto EXPORT_FORMAT) escribe CSV, Arrow o Parquet en
+    lugar de JSON, con las columnas tipadas según ``field_mapping``. Con
+    ``pagina`` no se escribe archivo: se devuelve solo esa página de la
+    consulta, ordenada y filtrada en el servidor (fetch_page).
+
+    Con ``particiones`` > 1 (por defecto EXPORT_PARTITIONS) y
+    ``keyset_column``, la clave se divide en rangos con NTILE y cada rango se
+    lee y convierte en paralelo por otra conexión del pool; el archivo sale
+    en el mismo orden de la clave (_iter_partitioned_batches). Las
+    conexiones se toman sin esperar: con el pool ocupado se leen menos
+    rangos, o todo por una sola conexión. Dentro de
+    DatabaseManager.snapshot() se lee por una sola conexión, porque las
+    demás no compartirían la vista de la transacción.
+
+    Con ``incremental=True`` solo se leen las filas cuya ``watermark_column``
+    (identidad, rowversion o fecha; en consultas agrupadas un agregado como
+    ``MAX(id)``) supera la marca de agua guardada de la exportación anterior,
+    y se incorporan al JSON existente (reemplazando por ``merge_key`` si se
+    indica). Las filas borradas o que dejan de cumplir el WHERE no se
+    detectan: una exportación completa vuelve a partir de cero. La primera
+    exportación incremental (sin marca) escribe en el orden de
+    ``order_clause``, como la completa; las filas nuevas de las siguientes
+    se añaden al final en orden de la marca de agua.
+
     :param db: Conexión activa a la base de datos
     :param doctype_name: Nombre del tipo de documento
     :param sqlserver_name: Nombre de la tabla origen
@@ -161,71 +1256,84 @@ def export_table_to_json_paginated(
     :param field_mapping: Lista de mapeos de campos (alias, (sql_field, tipo))
     :param base_query_from: FROM ... WHERE ... GROUP BY ...
     :param order_clause: ORDER BY ...
-    :return: Lista de diccionarios con los datos serializados
+    :param keyset_column: Expresión SQL de la clave para paginación keyset
+    :param watermark_column: Expresión SQL de la marca de agua incremental
+    :param merge_key: Alias del campo que identifica una fila al combinar
+    :param incremental: Si es True exporta solo lo nuevo desde la última vez
+    :param collect: Si es False devuelve un resumen en lugar de las filas
+    :param stream: Si es True devuelve un generador de lotes sin escribir
+    :param on_progress: Función (filas_hechas, total) llamada tras cada lote
+    :param on_saved: Función que recibe el resumen una vez escrito el archivo
+    :param timings: ExportTimings donde se acumulan los tiempos por fase
+    :param shard_rows: Filas por parte (0 = un solo archivo)
+    :param formato: Formato del archivo: json, csv, arrow o parquet
+    :param pagina: PaginaParams para devolver una sola página
+    :param particiones: Conexiones para leer por rangos de la clave keyset
+    :return: Lista de diccionarios con los datos serializados (o resumen)
     """
+    select_clauses = [
+        f"{sql_field} AS {alias}" for alias, (sql_field, _) in field_mapping
+    ]
+    select_clause = f"SELECT {', '.join(select_clauses)}"
+    # OFFSET/FETCH exige un ORDER BY
+    order_clause = order_clause or "ORDER BY (SELECT NULL)"
+
+    converters = compile_field_converters(field_mapping)
+
+    if pagina is not None:
+        # La clave keyset (o merge_key) identifica cada fila: desempata las
+        # páginas y es el orden por defecto, el mismo de la exportación
+        if keyset_column:
+            return fetch_page(
+                db, f"{select_clause}, {keyset_column} AS {KEYSET_ALIAS} "
+                    f"{base_query_from}",
+                field_mapping, converters, pagina, KEYSET_ALIAS)
+        return fetch_page(db, f"{select_clause} {base_query_from}",
+                          field_mapping, converters, pagina, merge_key)
+
+    if stream:
+        order_by = (f"ORDER BY {keyset_column}" if keyset_column
+                    else order_clause)
+        return _stream_paginated_batches(
+            db, f"{select_clause} {base_query_from} {order_by}", converters)
+
+    if incremental and not watermark_column:
+        raise ValueError(f"{doctype_name} no admite exportación incremental")
+    if incremental and resolve_formato(formato) != "json":
+        raise ValueError("La exportación incremental solo se hace en JSON")
+
+    timings = timings or ExportTimings()
     try:
-        select_clauses = [
-            f"{sql_field} AS {alias}" for alias, (sql_field, _) in field_mapping
-        ]
-        select_clause = f"SELECT {', '.join(select_clauses)}"
-
-        select_query = f"{select_clause} {base_query_from} {order_clause}"
-        # ❗ IMPORTANTE: Eliminar ORDER BY de la subconsulta del conteo
-        count_query = (f"SELECT COUNT(*) FROM ({select_clause} "
-                       f"{base_query_from}) AS sub")
-
-        field_type_map = {alias: field_type for alias, (_, field_type) in
-                          field_mapping}
-
-        with db.cursor() as cursor:
-            cursor.execute(count_query)
-            total_items = cursor.fetchone()[0]
-            logging.warning(f"Total de registros: {total_items}")
-
-            if total_items == 0:
-                logging.warning(f"No hay registros para {doctype_name}")
-                return []
-
-            all_results = []
-
-            if total_items > PAGINATION_THRESHOLD:
-                total_pages = math.ceil(total_items / DEFAULT_PAGE_SIZE)
-                logging.warning(
-                    f"Paginar {total_items} registros en {total_pages} páginas."
-                )
-                for page_num in range(total_pages):
-                    offset = page_num * DEFAULT_PAGE_SIZE
-                    paginated_query = (f"{select_query} OFFSET {offset} R"
-                                       f"OWS FETCH NEXT {DEFAULT_PAGE_SIZE} "
-                                       f"ROWS ONLY")
-                    cursor.execute(paginated_query)
-                    columns = [col[0] for col in cursor.description]
-                    rows = cursor.fetchall()
-                    page_results = [
-                        {
-                            key: serialize_value(value, field_type_map[key])
-                            for key, value in zip(columns, row)
-                        }
-                        for row in rows
-                    ]
-                    all_results.extend(page_results)
-            else:
-                cursor.execute(select_query)
-                columns = [col[0] for col in cursor.description]
-                rows = cursor.fetchall()
-                all_results = [
-                    {
-                        key: serialize_value(value, field_type_map[key])
-                        for key, value in zip(columns, row)
-                    }
-                    for row in rows
-                ]
-
-            output_path = save_json_file(
-                doctype_name, all_results, module_name, sqlserver_name
-            )
-            logging.warning(f"{doctype_name}.json guardado en {output_path}")
-            return all_results
+        progress = ExportProgress(on_progress)
+        if incremental:
+            return _export_incremental(
+                db, doctype_name, sqlserver_name, select_clause,
+                base_query_from, watermark_column, merge_key, converters,
+                collect, progress, on_saved, timings, shard_rows,
+                order_clause)
+
+        particiones = (EXPORT_PARTITIONS if particiones is None
+                       else particiones)
+        # La conexión de ``db`` sigue prestada mientras leen las demás; si
+        # el pool está ocupado se usan menos (_reserve_siblings)
+        particiones = min(particiones, DB_POOL_MAX_SIZE - 1)
+        if keyset_column and particiones > 1 and not db.in_snapshot:
+            with contextlib.closing(_iter_partitioned_batches(
+                    db, doctype_name, select_clause, base_query_from,
+                    order_clause, keyset_column, converters, progress,
+                    timings, particiones)) as batches:
+                return _write_paginated(
+                    doctype_name, sqlserver_name, batches, collect, progress,
+                    on_saved, timings, shard_rows, formato, field_mapping)
+
+        with db.cursor() as raw_cursor:
+            batches = timings.timed_batches(_iter_paginated_batches(
+                timings.cursor(raw_cursor), doctype_name, select_clause,
+                base_query_from, order_clause, keyset_column, converters,
+                progress))
+            return _write_paginated(
+                doctype_name, sqlserver_name, batches, collect, progress,
+                on_saved, timings, shard_rows, formato, field_mapping)
 
     except Exception as e:
         logging.error(f"❌ Error al exportar {doctype_name}: {e}")
@@ -0,0 +1,260 @@
+# utils/sinks.py
+# formatos de salida ademas del JSON: CSV (stdlib) y Arrow IPC / Parquet
+# (requieren pyarrow, opcional). Reciben los lotes de filas ya convertidas
+# por los conversores del field_mapping y usan sus tipos para las columnas.
+
+import abc
+import csv
+import datetime
+import io
+import os
+from typing import Any, Dict, List, Tuple
+
+from utils.compression import (NO_COMPRESSION, Codec, remove_stale_variants,
+                               unique_tmp_path)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # opcional: sin él solo hay JSON y CSV
+    pa = None
+    pq = None
+
+# Filas que se acumulan antes de escribir un row group de Parquet (los lotes
+# del cursor son pequeños y un row group por lote penaliza la lectura)
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+
+
+class TabularSink(abc.ABC):
+    """
+    Writer de filas a un archivo con las columnas del field_mapping, con la
+    misma interfaz que JsonStreamWriter: contexto, ``write_rows``,
+    ``total_rows``, ``bytes_written`` y ``summary()``. Se escribe a un
+    temporal que reemplaza al archivo definitivo solo si todo termina bien.
+
+    ``compressible`` indica si al archivo se le aplica JSON_COMPRESSION
+    (.gz/.zst); los formatos columnares comprimen por dentro.
+    """
+
+    formato = "base"
+    extension = ""
+    media_type = "application/octet-stream"
+    compressible = False
+
+    def __init__(self, doctype_name: str, output_path: str,
+                 field_types: List[Tuple[str, str]],
+                 codec: Codec = NO_COMPRESSION):
+        self.doctype_name = doctype_name
+        self.output_path = output_path
+        self.field_types = field_types
+        self.columns = [alias for alias, _ in field_types]
+        self.codec = codec
+        self.total_rows = 0
+        self.bytes_written = 0
+        self._tmp_path = unique_tmp_path(output_path)
+
+    def __enter__(self):
+        self._open(self._tmp_path)
+        return self
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        self._write(rows)
+        self.total_rows += len(rows)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # El cierre escribe lo último (el flush de Parquet, el pie de Arrow,
+        # el final del codec): si falla, el temporal está incompleto y no
+        # debe sustituir a la exportación anterior
+        try:
+            self._close()
+        except BaseException:
+            self._discard_tmp()
+            raise
+        if exc_type is not None:
+            self._discard_tmp()
+            return
+        os.replace(self._tmp_path, self.output_path)
+        self.bytes_written = os.path.getsize(self.output_path)
+        remove_stale_variants(self.output_path)
+
+    def _discard_tmp(self):
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    # Escribe lo que el sink tenga acumulado (se llama antes de cerrar)
+    def flush(self):
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "doctype": self.doctype_name,
+            "archivo": self.output_path,
+            "total_registros": self.total_rows,
+            "formato": self.formato,
+        }
+
+    @abc.abstractmethod
+    def _open(self, path: str):
+        ...
+
+    @abc.abstractmethod
+    def _write(self, rows: List[Dict[str, Any]]):
+        ...
+
+    @abc.abstractmethod
+    def _close(self):
+        ...
+
+
+def _csv_value(value):
+    # Vacío para NULL y 1/0 para booleanos, como los espera el importador
+    if value is None:
+        return ""
+    if value is True:
+        return 1
+    if value is False:
+        return 0
+    return value
+
+
+class CsvSink(TabularSink):
+    """CSV con cabecera (los alias del field_mapping), en UTF-8."""
+
+    formato = "csv"
+    extension = ".csv"
+    media_type = "text/csv"
+    compressible = True
+
+    def _open(self, path: str):
+        self._file = io.TextIOWrapper(self.codec.open_write(path),
+                                      encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        columns = self.columns
+        self._writer.writerows([[_csv_value(row.get(column))
+                                 for column in columns] for row in rows])
+
+    def _close(self):
+        self._file.close()
+
+
+# --- Arrow / Parquet ---------------------------------------------------------
+# Tipo de columna según el tipo declarado en el field_mapping. Las fechas
+# llegan de los conversores como texto ISO y se guardan como timestamp.
+
+def _parse_datetime(value):
+    if value is None or value.__class__ is datetime.datetime:
+        return value
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _arrow_column(field_type: str):
+    # (tipo arrow, preparación del valor o None si ya viene bien)
+    if field_type == "string":
+        return pa.string(), _to_str
+    if field_type == "integer":
+        return pa.int64(), None
+    if field_type == "boolean":
+        return pa.bool_(), None
+    if field_type == "date":
+        return pa.timestamp("ms"), _parse_datetime
+    if field_type in ("float", "numeric", "decimal", "auto"):
+        return pa.float64(), _to_float
+    return pa.string(), _to_str
+
+
+class _ArrowSink(TabularSink):
+    def __init__(self, doctype_name: str, output_path: str,
+                 field_types: List[Tuple[str, str]],
+                 codec: Codec = NO_COMPRESSION):
+        if pa is None:
+            raise RuntimeError(f"El formato {self.formato} requiere pyarrow")
+        super().__init__(doctype_name, output_path, field_types, codec)
+        columns = [_arrow_column(field_type) for _, field_type in field_types]
+        self.schema = pa.schema([(alias, arrow_type) for alias, (arrow_type, _)
+                                 in zip(self.columns, columns)])
+        self._plan = [(alias, arrow_type, prepare) for alias,
+                      (arrow_type, prepare) in zip(self.columns, columns)]
+
+    def _record_batch(self, rows: List[Dict[str, Any]]):
+        arrays = []
+        for alias, arrow_type, prepare in self._plan:
+            values = [row.get(alias) for row in rows]
+            if prepare is not None:
+                values = [prepare(value) for value in values]
+            arrays.append(pa.array(values, type=arrow_type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+class ArrowSink(_ArrowSink):
+    """Arrow IPC (formato de archivo, .arrow / Feather v2)."""
+
+    formato = "arrow"
+    extension = ".arrow"
+    media_type = "application/vnd.apache.arrow.file"
+
+    def _open(self, path: str):
+        # IPC solo admite lz4 o zstd: se usa zstd si se pidió compresión
+        options = pa.ipc.IpcWriteOptions(
+            compression="zstd" if self.codec.content_encoding else None)
+        self._writer = pa.ipc.new_file(path, self.schema, options=options)
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        self._writer.write_batch(self._record_batch(rows))
+
+    def _close(self):
+        self._writer.close()
+
+
+class ParquetSink(_ArrowSink):
+    """Parquet, con row groups de PARQUET_ROW_GROUP_ROWS filas."""
+
+    formato = "parquet"
+    extension = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def _open(self, path: str):
+        compression = {"gzip": "gzip", "zstd": "zstd"}.get(self.codec.name,
+                                                           "snappy")
+        self._writer = pq.ParquetWriter(path, self.schema,
+                                        compression=compression)
+        self._pending: List[Dict[str, Any]] = []
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        self._pending.extend(rows)
+        if len(self._pending) >= PARQUET_ROW_GROUP_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._writer.write_batch(self._record_batch(self._pending))
+            self._pending = []
+
+    def _close(self):
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+
+
+SINKS = {sink.formato: sink for sink in (CsvSink, ArrowSink, ParquetSink)}
+FORMATOS = ("json",) + tuple(SINKS)
+
+# Extensión de archivo -> tipo MIME, para servir los archivos exportados
+MEDIA_TYPES = {".json": "application/json",
+               **{sink.extension: sink.media_type for sink in SINKS.values()}}
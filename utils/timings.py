@@ -0,0 +1,115 @@
+# utils/timings.py
+# tiempos por fase de una exportacion (SQL, lectura, conversion, escritura)
+# y filas/bytes producidos, para la cabecera Server-Timing y el log
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+
+from utils.json_encoder import dumps
+
+PHASES = ("sql", "fetch", "serialize", "write")
+
+
+class TimedCursor:
+    """Cursor que suma a ``timings`` el tiempo de execute y de los fetch."""
+
+    def __init__(self, cursor, timings: "ExportTimings"):
+        self._cursor = cursor
+        self._timings = timings
+
+    def execute(self, *args):
+        with self._timings.measure("sql"):
+            return self._cursor.execute(*args)
+
+    def fetchone(self):
+        with self._timings.measure("fetch"):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        with self._timings.measure("fetch"):
+            return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        with self._timings.measure("fetch"):
+            return self._cursor.fetchall()
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class ExportTimings:
+    """
+    Acumula la duración de cada fase de una exportación:
+
+    - ``sql``: ``cursor.execute`` (incluye la espera del servidor)
+    - ``fetch``: ``fetchmany``/``fetchall``
+    - ``serialize``: conversión de filas según ``field_mapping``
+    - ``write``: codificación JSON y escritura a disco
+
+    Se pasa a los extractores como opción ``timings`` y la rellenan las
+    funciones de utils/jsons_utils.py.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.rows = 0
+        self.bytes = 0
+        self.cache_hit = False
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] += seconds
+
+    @contextmanager
+    def measure(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] += time.perf_counter() - start
+
+    def cursor(self, cursor) -> TimedCursor:
+        return TimedCursor(cursor, self)
+
+    def timed_batches(self, batches: Iterable[List[Dict[str, Any]]]
+                      ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre los lotes de un generador de jsons_utils. Lo que tarda cada
+        lote en llegar, descontado el SQL y los fetch ya medidos por el
+        cursor, es el tiempo de conversión.
+        """
+        iterator = iter(batches)
+        while True:
+            measured = self.phases["sql"] + self.phases["fetch"]
+            start = time.perf_counter()
+            batch = next(iterator, None)
+            elapsed = time.perf_counter() - start
+            if batch is None:
+                break
+            self.phases["serialize"] += max(
+                elapsed - (self.phases["sql"] + self.phases["fetch"]
+                           - measured), 0.0)
+            self.rows += len(batch)
+            yield batch
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {f"{phase}_ms": round(seconds * 1000, 1)
+                  for phase, seconds in self.phases.items()}
+        result.update(rows=self.rows, bytes=self.bytes,
+                      cache_hit=self.cache_hit)
+        return result
+
+    def header(self) -> str:
+        """Valor de la cabecera Server-Timing."""
+        if self.cache_hit:
+            return 'cache;desc="hit"'
+        metrics = [f"{phase};dur={seconds * 1000:.1f}"
+                   for phase, seconds in self.phases.items()]
+        metrics.append(f'rows;desc="{self.rows}"')
+        metrics.append(f'bytes;desc="{self.bytes}"')
+        return ", ".join(metrics)
+
+    def log(self, doctype_name: str):
+        logging.info("export_timings %s", dumps(
+            {"doctype": doctype_name, **self.as_dict()}).decode())
@@ -0,0 +1,101 @@
+# utils/watermarks.py
+# marcas de agua de las exportaciones incrementales: el ultimo valor de la
+# columna de control (identidad, rowversion o fecha) exportado para cada
+# (host, base de datos, tabla), guardado junto a los JSON en get_output_dir()
+
+import datetime
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from config import get_output_dir
+from utils.json_encoder import file_encoder, loads
+
+WATERMARKS_FILE = "_watermarks.json"
+
+_lock = threading.Lock()
+
+
+def _watermarks_path() -> str:
+    return os.path.join(get_output_dir(), WATERMARKS_FILE)
+
+
+def watermark_key(host: str, database: str, sqlserver_name: str) -> str:
+    return f"{host}/{database}/{sqlserver_name}"
+
+
+# El valor se guarda con su tipo para volver a pasarlo como parámetro con el
+# mismo tipo de SQL Server (int, datetime, binary de un rowversion...)
+def _encode_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, datetime.datetime):
+        return {"tipo": "datetime", "valor": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"tipo": "date", "valor": value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"tipo": "bytes", "valor": bytes(value).hex()}
+    if isinstance(value, int):
+        return {"tipo": "int", "valor": value}
+    return {"tipo": "str", "valor": str(value)}
+
+
+def _decode_value(entry: Dict[str, Any]) -> Any:
+    tipo, valor = entry["tipo"], entry["valor"]
+    if tipo == "datetime":
+        return datetime.datetime.fromisoformat(valor)
+    if tipo == "date":
+        return datetime.date.fromisoformat(valor)
+    if tipo == "bytes":
+        return bytes.fromhex(valor)
+    return valor
+
+
+def _load_all() -> Dict[str, Any]:
+    path = _watermarks_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def _save_all(watermarks: Dict[str, Any]):
+    path = _watermarks_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(file_encoder.dumps(watermarks))
+    os.replace(tmp_path, path)
+
+
+# Tamaño y fecha de modificación de un archivo exportado, para saber si
+# otra exportación lo reemplazó (None si no existe)
+def file_signature(path: str) -> Optional[Dict[str, int]]:
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"tamano": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def get_watermark(key: str, output_path: str) -> Optional[Any]:
+    """
+    Devuelve la marca de agua de ``key`` solo si el archivo de salida sigue
+    siendo el que escribió la última exportación incremental. Si otra
+    exportación completa (u otra base de datos) lo reemplazó, o ya no existe,
+    devuelve None y la siguiente exportación vuelve a leer todo.
+    """
+    with _lock:
+        entry = _load_all().get(key)
+    if not entry or entry.get("archivo") != file_signature(output_path):
+        return None
+    return _decode_value(entry["marca"])
+
+
+def set_watermark(key: str, value: Any, output_path: str):
+    with _lock:
+        watermarks = _load_all()
+        watermarks[key] = {
+            "marca": _encode_value(value),
+            "archivo": file_signature(output_path),
+            "actualizado": datetime.datetime.now().isoformat(
+                timespec="seconds"),
+        }
+        _save_all(watermarks)
+